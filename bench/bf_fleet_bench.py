@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Offline benchmark for bf_fleet.
+
+The fleet flow runs in-process against FakeTransport, so no DPUs, ssh or
+installed tools are needed. Each scenario checks the host results and the
+summary, and the limits the Fleet enforces: global and per-host
+concurrency from the recorded call intervals, the start rate, rolling
+waves that stop after failures, timeouts, transport errors and parsing
+of the network_admin (JSON) and bfb_tool (Python dict) output.
+"""
+
+import os
+import sys
+import argparse
+import asyncio
+import json
+import math
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import bf_fleet
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+BFB_TOOL = ['bfb_tool', '--op', 'fw_activate_bfb', '--bfb', '/tmp/new.bfb']
+NETWORK_ADMIN = ['network_admin', '--op', 'ipconfig', '--action', 'show', '--port', '0']
+
+
+def max_overlap(calls, key=None):
+    """
+    Return the maximum number of calls in flight at the same time
+    """
+    events = []
+    for host, argv, start, end in calls:
+        if key is None or key == host:
+            events += [(start, 1), (end, -1)]
+    current = peak = 0
+    for stamp, delta in sorted(events):
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def run_scenario(transport, hosts, argv, **kwargs):
+    """
+    Run the fleet like run_fleet does and return records, summary and calls
+    """
+    wave_size = kwargs.pop('wave_size', 0)
+    max_failures = kwargs.pop('max_failures', 0)
+
+    async def flow():
+        fleet = bf_fleet.Fleet(transport, **kwargs)
+        start = time.monotonic()
+        if wave_size:
+            await fleet.run_waves(hosts, argv, wave_size, max_failures)
+        else:
+            await fleet.run(hosts, argv)
+        return fleet.results, fleet.summary(time.monotonic() - start)
+
+    records, summary = asyncio.run(flow())
+    return records, summary, transport.calls
+
+
+def scenario_concurrency(args):
+    hosts = ["dpu{}".format(num) for num in range(args.hosts)]
+    transport = bf_fleet.FakeTransport(latency=args.latency)
+    records, summary, calls = run_scenario(transport, hosts, bf_fleet.tool_command(NETWORK_ADMIN),
+                                           concurrency=args.concurrency)
+    expected = math.ceil(args.hosts / args.concurrency) * args.latency
+    return summary, {
+        'all_hosts': sorted(record['host'] for record in records) == sorted(hosts),
+        'succeeded': summary['succeeded'] == args.hosts and summary['failed'] == 0,
+        'concurrency': max_overlap(calls) == min(args.concurrency, args.hosts),
+        'elapsed': expected <= summary['elapsed'] < expected * 2 + 1,
+        'result': all(record['result'] == {"success": True, "output": "fake"} for record in records),
+    }
+
+
+def scenario_per_host(args):
+    hosts = ["dpu{}".format(num) for num in range(4)] * 3
+    transport = bf_fleet.FakeTransport(latency=args.latency)
+    records, summary, calls = run_scenario(transport, hosts, NETWORK_ADMIN, concurrency=args.concurrency, per_host=1)
+    return summary, {
+        'succeeded': summary['succeeded'] == len(hosts),
+        'per_host': all(max_overlap(calls, host) == 1 for host in set(hosts)),
+        'parallel_hosts': max_overlap(calls) == 4,
+    }
+
+
+def scenario_rate(args):
+    hosts = ["dpu{}".format(num) for num in range(10)]
+    rate = 50.0
+    transport = bf_fleet.FakeTransport()
+    records, summary, calls = run_scenario(transport, hosts, NETWORK_ADMIN, concurrency=args.concurrency, rate=rate)
+    starts = sorted(call[2] for call in calls)
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    return summary, {
+        'succeeded': summary['succeeded'] == len(hosts),
+        'rate': min(gaps) >= 1.0 / rate * 0.9,
+    }
+
+
+def scenario_waves(args):
+    hosts = ["dpu{}".format(num) for num in range(20)]
+    transport = bf_fleet.FakeTransport(latency=args.latency, fail_hosts=['dpu12'])
+    records, summary, calls = run_scenario(transport, hosts, bf_fleet.tool_command(BFB_TOOL),
+                                           concurrency=args.concurrency, wave_size=5, max_failures=0)
+    waves = {}
+    for host, argv, start, end in calls:
+        waves.setdefault(int(host[3:]) // 5, []).append((start, end))
+    ordered = all(max(end for start, end in waves[num]) <= min(start for start, end in waves[num + 1])
+                  for num in range(len(waves) - 1))
+    return summary, {
+        'started': len(calls) == 15,
+        'skipped': summary['skipped'] == 5 and all(record.get('wave') == 3 for record in records if record.get('skipped')),
+        'failed': summary['failed'] == 1 and summary['succeeded'] == 14,
+        'ordered': ordered,
+        'op': all(record['op'] == 'fw_activate_bfb' for record in records),
+    }
+
+
+def scenario_errors(args):
+    hosts = ['timeout', 'error', 'bfb_tool', 'bfb_fail', 'text']
+
+    def handler(host, argv):
+        if host == 'error':
+            raise OSError("connection reset")
+        if host == 'bfb_tool':
+            return 0, "Running command\n{'success': True, 'output': 'activated'}\n"
+        if host == 'bfb_fail':
+            return 0, "{'success': False, 'output': 'no bfb'}\n", "ERR: no bfb\n"
+        return 0, "plain output\n"
+
+    transport = bf_fleet.FakeTransport(handler=handler)
+    timeouts = bf_fleet.FakeTransport(latency=1.0)
+    records, summary, calls = run_scenario(transport, hosts[1:], BFB_TOOL, concurrency=args.concurrency, timeout=0.5)
+    timeout_records, timeout_summary, timeout_calls = run_scenario(timeouts, hosts[:1], BFB_TOOL, timeout=0.2)
+    records = dict((record['host'], record) for record in records + timeout_records)
+    return summary, {
+        'timeout': records['timeout']['rc'] == bf_fleet.TIMEOUT_RC and not records['timeout']['success'],
+        'timeout_elapsed': timeout_summary['elapsed'] < 0.5,
+        'transport_error': records['error']['rc'] == 255 and 'OSError' in records['error']['error'],
+        'bfb_tool_output': records['bfb_tool']['success'] and records['bfb_tool']['result'] == {'success': True, 'output': 'activated'},
+        'bfb_tool_failure': not records['bfb_fail']['success'] and records['bfb_fail']['error'] == "ERR: no bfb",
+        'text_output': records['text']['success'] and records['text']['result'] == "plain output",
+    }
+
+
+SCENARIOS = [
+    ('concurrency', scenario_concurrency),
+    ('per_host', scenario_per_host),
+    ('rate', scenario_rate),
+    ('waves', scenario_waves),
+    ('errors', scenario_errors),
+]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='bf_fleet benchmark with the fake transport')
+    parser.add_argument('--hosts', type=int, help="Number of hosts in the concurrency scenario", default=200)
+    parser.add_argument('--concurrency', type=int, help="Maximum number of hosts processed in parallel", default=32)
+    parser.add_argument('--latency', type=float, help="Fake operation latency in seconds", default=0.05)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON", default=False)
+
+    args = parser.parse_args()
+
+    results = []
+    for name, scenario in SCENARIOS:
+        summary, checks = scenario(args)
+        results.append({'scenario': name, 'summary': summary, 'checks': checks})
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        for result in results:
+            summary = result['summary']
+            print("{:<12} hosts {:>4}  succeeded {:>4}  failed {:>3}  skipped {:>3}  elapsed {:>7.3f}s  checks: {}".format(
+                result['scenario'], summary['hosts'], summary['succeeded'], summary['failed'], summary['skipped'],
+                summary['elapsed'], ' '.join("{}={}".format(name, 'ok' if ok else 'FAIL') for name, ok in result['checks'].items())))
+
+    sys.exit(0 if all(all(result['checks'].values()) for result in results) else 1)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Benchmark for bf_xz.
+
+A synthetic rootfs tar is compressed with xz in blocks, like a multi
+threaded xz compression, and as a single block, like a plain 'xz' or
+'tar cJf'. Each archive is extracted with 'tar xJf' twice: with the
+system xz and with bf_xz installed as xz first in PATH. The extraction
+time, the bf_xz mode and throughput and the extracted files are compared.
+bf_xz runs the system xz when it does not decode the blocks in parallel,
+then it records no statistics.
+"""
+
+import os
+import sys
+import argparse
+import json
+import random
+import subprocess
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.dont_write_bytecode = True
+import bf_xz
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+BF_XZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf_xz.py')
+
+
+def make_rootfs(directory, size_mb):
+    """
+    Text and binary files that compress about like a rootfs
+    """
+    rng = random.Random(1)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz_/.') for _ in range(rng.randint(3, 12))) for _ in range(4096)]
+    written = 0
+    index = 0
+    while written < size_mb << 20:
+        path = os.path.join(directory, 'usr', 'lib', 'd{}'.format(index % 64), 'f{}'.format(index))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if index % 4:
+            data = ' '.join(rng.choice(words) for _ in range(rng.randint(2000, 40000))).encode()
+        else:
+            data = bytes(rng.getrandbits(8) for _ in range(rng.randint(1000, 60000))) * 4
+        with open(path, 'wb') as stream:
+            stream.write(data)
+        written += len(data)
+        index += 1
+    os.makedirs(os.path.join(directory, 'etc'), exist_ok=True)
+    with open(os.path.join(directory, 'etc', 'bfb_version.json'), 'w') as stream:
+        json.dump({'version': 'bench'}, stream)
+    return index + 1
+
+
+def extract(name, archive, directory, env):
+    target = os.path.join(directory, name)
+    os.makedirs(target)
+    start = time.monotonic()
+    subprocess.run(['tar', '-C', target, '-xJf', archive], env=env, check=True)
+    elapsed = time.monotonic() - start
+    listing = subprocess.run('cd {} && find . -type f | sort | xargs md5sum'.format(target), shell=True,
+                             stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+    return elapsed, listing
+
+
+def run_archive(name, archive, directory, env, shim_env, stats):
+    if os.path.exists(stats):
+        os.unlink(stats)
+    system_s, system_files = extract(name + '-system', archive, directory, env)
+    bf_xz_s, bf_xz_files = extract(name + '-bf_xz', archive, directory, shim_env)
+    return {
+        'archive': name,
+        'xz_bytes': os.path.getsize(archive),
+        'system_xz_s': round(system_s, 3),
+        'bf_xz_s': round(bf_xz_s, 3),
+        'bf_xz': bf_xz.read_stats(stats),
+        'checks': {'files': system_files == bf_xz_files},
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='bf_xz benchmark')
+    parser.add_argument('--size', type=int, help="Rootfs size in MB", default=128)
+    parser.add_argument('--block_size', help="xz --block-size", default="8MiB")
+    parser.add_argument('--threads', type=int, help="bf_xz threads. 0 - number of CPUs", default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON", default=False)
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        rootfs = os.path.join(directory, 'rootfs')
+        files = make_rootfs(rootfs, args.size)
+        tarball = os.path.join(directory, 'image.tar')
+        subprocess.run(['tar', '-C', rootfs, '-cf', tarball, '.'], check=True)
+        archives = [
+            ('multi-block', ['-T0', '--block-size={}'.format(args.block_size)]),
+            ('single-block', ['-T1']),
+        ]
+        for name, options in archives:
+            with open(tarball, 'rb') as source, open(os.path.join(directory, name + '.tar.xz'), 'wb') as target:
+                subprocess.run(['xz', '-c'] + options, stdin=source, stdout=target, check=True)
+
+        bindir = os.path.join(directory, 'xz-bin')
+        os.mkdir(bindir)
+        os.symlink(os.path.abspath(BF_XZ), os.path.join(bindir, 'xz'))
+        stats = os.path.join(directory, 'xz.stats')
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+        shim_env = dict(env, PATH=bindir + os.pathsep + env['PATH'])
+        shim_env[bf_xz.STATS_ENV] = stats
+        if args.threads:
+            shim_env[bf_xz.THREADS_ENV] = str(args.threads)
+
+        tar_bytes = os.path.getsize(tarball)
+        results = [run_archive(name, os.path.join(directory, name + '.tar.xz'), directory, env, shim_env, stats)
+                   for name, options in archives]
+
+    if args.json:
+        print(json.dumps({'files': files, 'tar_bytes': tar_bytes, 'archives': results}, indent=4))
+    else:
+        print("{} files, tar {} MB, {} CPUs".format(files, tar_bytes >> 20, os.cpu_count()))
+        for result in results:
+            xz = result['bf_xz']
+            print("{}: xz {} MB".format(result['archive'], result['xz_bytes'] >> 20))
+            print("  tar xJf system xz  {:>8.3f}s".format(result['system_xz_s']))
+            if xz:
+                print("  tar xJf bf_xz      {:>8.3f}s  {} mode, {} threads, {} blocks, {} MB/s".format(
+                    result['bf_xz_s'], xz['mode'], xz['threads'], xz['blocks'], xz['mb_per_s']))
+            else:
+                print("  tar xJf bf_xz      {:>8.3f}s  system xz".format(result['bf_xz_s']))
+            print("  checks: " + ' '.join("{}={}".format(name, 'ok' if ok else 'FAIL') for name, ok in result['checks'].items()))
+
+    sys.exit(0 if all(all(result['checks'].values()) for result in results) else 1)
+
+
+if __name__ == '__main__':
+        main()
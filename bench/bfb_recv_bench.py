@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Benchmark for bfb_recv.
+
+A synthetic BFB is pushed through a named pipe in bursts. The receiver
+output and SHA-256 are checked against the source. The cases cover a
+complete BFB, a BFB followed by a configuration BFB after a pause shorter
+than the settle time, a truncated stream, data after the last image and a
+stream without BFB framing. The time of the cat loop in get_bfb is estimated
+from its idle timeouts.
+"""
+
+import os
+import sys
+import argparse
+import array
+import fcntl
+import hashlib
+import json
+import struct
+import tempfile
+import termios
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env'))
+sys.dont_write_bytecode = True
+import bfb_recv
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+# bf-upgrade defaults
+IDLE_MAX = 5
+DATA_RECEIVE_TIMEOUT = 40
+
+F_SETPIPE_SZ = 1031
+PIPE_SIZE = 1 << 20
+
+# BFB images: (image id, size in bytes)
+IMAGES = [(2, 1 << 10), (52, 13 << 20), (61, 331), (62, 50 << 20), (63, 2 << 20)]
+CONFIG_IMAGES = [(61, 1537)]
+
+
+def make_bfb(images, seed=0):
+    """
+    Build BFB with random image data
+    """
+    ids = [image_id for image_id, size in images]
+    data = bytearray()
+    rnd = bytes(range(256)) * 4096
+    for index, (image_id, size) in enumerate(images):
+        following = 0
+        for next_id in ids[index + 1:]:
+            following |= 1 << next_id
+        word0 = bfb_recv.BFB_MAGIC | (1 << 32) | (3 << 48)
+        word1 = size | (image_id << 32)
+        data += struct.pack('<QQQ', word0, word1, following)
+        body = (rnd * (size // len(rnd) + 1))[seed:seed + size]
+        data += body
+        data += b'\0' * (((size + 7) & ~7) - size)
+    return bytes(data)
+
+
+def produce(fifo, parts, burst, rate, gap, pause):
+    """
+    Write parts to the named pipe in bursts of burst bytes at rate MB/s
+    with gap seconds between bursts and pause seconds between parts
+    """
+    # A reader held open keeps the buffered data while the receiver
+    # reopens the pipe, like the boot FIFO does
+    keep = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+    fd = os.open(fifo, os.O_WRONLY)
+    fcntl.fcntl(fd, F_SETPIPE_SZ, PIPE_SIZE)
+    try:
+        for num, data in enumerate(parts):
+            if num and pause:
+                time.sleep(pause)
+            write_part(fd, data, burst, rate, gap)
+    finally:
+        os.close(fd)
+        # The pipe drops its buffer when the last reader closes
+        pending = array.array('i', [1])
+        while pending[0]:
+            fcntl.ioctl(keep, termios.FIONREAD, pending)
+            time.sleep(0.01)
+        os.close(keep)
+
+
+def write_part(fd, data, burst, rate, gap):
+    view = memoryview(data)
+    while view:
+        chunk = view[:burst]
+        start = time.monotonic()
+        while chunk:
+            written = os.write(fd, chunk)
+            chunk = chunk[written:]
+        view = view[burst:]
+        spent = time.monotonic() - start
+        if rate:
+            time.sleep(max(0, burst / (rate * 1e6) - spent))
+        if gap:
+            time.sleep(gap)
+
+
+def run_case(name, parts, pause, expect, args, directory):
+    data = b''.join(parts)
+    fifo = os.path.join(directory, name + '.fifo')
+    output = os.path.join(directory, name + '.bfb')
+    os.mkfifo(fifo)
+
+    producer = threading.Thread(target=produce, args=(fifo, parts, args.burst << 10, args.rate, args.gap, pause), daemon=True)
+    producer.start()
+    receiver = bfb_recv.Receiver(fifo, output, args.first_timeout, args.idle_timeout, args.settle)
+    stats = receiver.run()
+    producer.join(1)
+
+    with open(output, 'rb') as stream:
+        received = stream.read()
+    ok = received == data and stats['sha256'] == hashlib.sha256(data).hexdigest()
+    ok = ok and stats['end'] == expect
+    # The cat loop waits IDLE_MAX first and ends after DATA_RECEIVE_TIMEOUT idle
+    # seconds. Every byte is written to the temporary file and to the BFB.
+    legacy_s = max(stats['receive_s'], IDLE_MAX) + DATA_RECEIVE_TIMEOUT
+    os.unlink(output)
+    os.unlink(fifo)
+    return {
+        'case': name,
+        'ok': ok,
+        'end': stats['end'],
+        'expect': expect,
+        'bytes': stats['bytes'],
+        'containers': stats['containers'],
+        'images': stats['images'],
+        'error': stats['error'],
+        'receive_s': stats['receive_s'],
+        'total_s': stats['total_s'],
+        'mb_per_s': stats['mb_per_s'],
+        'reads': stats['reads'],
+        'legacy_total_s': round(legacy_s, 3),
+        'legacy_written': 2 * len(data),
+        'written': stats['bytes'],
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='bfb_recv benchmark')
+    parser.add_argument('--rate', type=float, help="Producer rate in MB/s. 0 - unlimited", default=0)
+    parser.add_argument('--burst', type=int, help="Producer burst in KB", default=256)
+    parser.add_argument('--gap', type=float, help="Pause between bursts in seconds", default=0)
+    parser.add_argument('--first_timeout', type=float, help="Receiver first data timeout", default=5)
+    parser.add_argument('--idle_timeout', type=float, help="Receiver idle timeout for streams without framing", default=3)
+    parser.add_argument('--settle', type=float, help="Receiver settle time after the last image", default=bfb_recv.SETTLE_TIMEOUT)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON", default=False)
+
+    args = parser.parse_args()
+
+    bfb = make_bfb(IMAGES)
+    config = make_bfb(CONFIG_IMAGES, seed=7)
+    cases = [
+        ('complete', [bfb], 0, 'framing'),
+        ('config', [bfb, config], args.settle / 2, 'framing'),
+        ('truncated', [bfb[:len(bfb) // 2 + 5]], 0, 'idle'),
+        ('trailing', [bfb, b'\xff' * 64], 0, 'idle'),
+        ('raw', [os.urandom(1 << 20)], 0, 'idle'),
+    ]
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, parts, pause, expect in cases:
+            results.append(run_case(name, parts, pause, expect, args, directory))
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        print("{:<10} {:>4} {:>8} {:>10} {:>5} {:>7} {:>10} {:>10} {:>8} {:>10}".format(
+            'case', 'ok', 'end', 'bytes', 'bfbs', 'images', 'receive_s', 'total_s', 'MB/s', 'legacy_s'))
+        for r in results:
+            print("{:<10} {:>4} {:>8} {:>10} {:>5} {:>7} {:>10} {:>10} {:>8} {:>10}".format(
+                r['case'], 'yes' if r['ok'] else 'NO', r['end'], r['bytes'], r['containers'], r['images'],
+                r['receive_s'], r['total_s'], r['mb_per_s'], r['legacy_total_s']))
+        print("legacy estimate: IDLE_MAX={} DATA_RECEIVE_TIMEOUT={}, every byte written twice".format(IDLE_MAX, DATA_RECEIVE_TIMEOUT))
+
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
+
+
+if __name__ == '__main__':
+        main()
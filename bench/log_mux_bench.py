@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Benchmark for log_mux.
+
+Two named pipes drained at the console baud rate stand in for /dev/ttyAMA0
+and /dev/hvc0. The same installer-like log (ilog lines and a firmware
+updater log dumped with log_file) is written by bash with the direct
+writes of bf-upgrade.env/common and through the log multiplexer. The time
+of the logging script and the log file contents are compared.
+"""
+
+import os
+import sys
+import argparse
+import fcntl
+import json
+import subprocess
+import tempfile
+import threading
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+ENV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env')
+
+F_SETPIPE_SZ = 1031
+# Room in the UART FIFO and the tty buffer
+CONSOLE_BUFFER = 4096
+
+# ilog of bf-upgrade.env/common with the consoles taken from LOG_MUX_CONSOLES
+DRIVER = r'''
+LOG=$WORK/install.log
+rshimlog=""
+ilog()
+{
+	printf -v msg '[%(%H:%M:%S)T] %s' -1 "$*"
+	if [ -n "$LOG_MUX_FD" ] && log_mux_write L "$msg"; then
+		return
+	fi
+	echo "$msg" >> $LOG
+	for console in $LOG_MUX_CONSOLES; do
+		echo "$msg" > $console
+	done
+}
+. $ENV_DIR/log-mux
+log_mux_start
+start=$EPOCHREALTIME
+for ((i = 0; i < LINES; i++)); do
+	ilog "INFO: Installing step $i of $LINES"
+	if [ $i -eq $((LINES / 2)) ]; then
+		log_file $WORK/mlnx_fw_update.log "mlnx_fw_update.log"
+	fi
+done
+end=$EPOCHREALTIME
+log_mux_stop
+echo "$start $end $EPOCHREALTIME"
+'''
+
+
+def console(path, rate, received):
+    """
+    Read the named pipe at rate bytes per second until the writers are gone
+    """
+    fd = os.open(path, os.O_RDONLY)
+    fcntl.fcntl(fd, F_SETPIPE_SZ, CONSOLE_BUFFER)
+    chunk = max(rate // 100, 1)
+    while True:
+        data = os.read(fd, chunk)
+        if not data:
+            # Writers reopen the console for every line
+            time.sleep(0.01)
+            if received.get('stop'):
+                break
+            continue
+        received[path] = received.get(path, 0) + len(data)
+        time.sleep(len(data) / rate)
+    os.close(fd)
+
+
+def run_flow(name, mux, args, directory):
+    work = os.path.join(directory, name)
+    os.makedirs(work)
+    with open(os.path.join(work, 'mlnx_fw_update.log'), 'w') as stream:
+        for index in range(args.fw_lines):
+            stream.write("-I- Burning image {} sector {:06x} ... OK\n".format(index, index * 4096))
+    consoles = []
+    received = {}
+    threads = []
+    for index in range(2):
+        path = os.path.join(work, 'console{}'.format(index))
+        os.mkfifo(path)
+        consoles.append(path)
+        thread = threading.Thread(target=console, args=(path, args.baud // 10, received), daemon=True)
+        thread.start()
+        threads.append(thread)
+    # The console readers keep the pipes open between the writes
+    keep = [os.open(path, os.O_WRONLY) for path in consoles]
+
+    env = dict(os.environ)
+    env.update({
+        'WORK': work,
+        'ENV_DIR': ENV_DIR,
+        'LINES': str(args.lines),
+        'BF_LOG_MUX': 'yes' if mux else 'no',
+        'LOG_MUX_CONSOLES': ' '.join(consoles),
+        'LOG_MUX_CONSOLE_RATE': str(args.baud // 10),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    proc = subprocess.run(['bash', '-c', DRIVER], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if proc.returncode:
+        raise RuntimeError("{} failed: {}".format(name, proc.stderr))
+    start, end, stopped = [float(value) for value in proc.stdout.split()]
+
+    received['stop'] = True
+    for fd in keep:
+        os.close(fd)
+    for thread in threads:
+        thread.join(5)
+
+    with open(os.path.join(work, 'install.log'), 'r') as stream:
+        lines = [line.split('] ', 1)[-1] for line in stream.read().splitlines()]
+    return {
+        'flow': name,
+        'log_s': round(end - start, 3),
+        'stop_s': round(stopped - end, 3),
+        'log_lines': len(lines),
+        'lines': lines,
+        'console_bytes': [received.get(path, 0) for path in consoles],
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='log_mux benchmark')
+    parser.add_argument('--lines', type=int, help="ilog lines", default=2000)
+    parser.add_argument('--fw_lines', type=int, help="Lines of the firmware updater log", default=2000)
+    parser.add_argument('--baud', type=int, help="Console baud rate", default=115200)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON", default=False)
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        direct = run_flow('direct', False, args, directory)
+        mux = run_flow('log_mux', True, args, directory)
+
+    checks = {
+        'log': direct['lines'] == mux['lines'],
+        'lines': mux['log_lines'] == args.lines + args.fw_lines,
+    }
+    for flow in [direct, mux]:
+        del flow['lines']
+
+    if args.json:
+        print(json.dumps({'direct': direct, 'log_mux': mux, 'checks': checks}, indent=4))
+    else:
+        for flow in [direct, mux]:
+            print("{:<8} logging {:>8.3f}s  stop {:>6.3f}s  log lines {:>6}  console bytes {}".format(
+                flow['flow'], flow['log_s'], flow['stop_s'], flow['log_lines'], flow['console_bytes']))
+        print("checks: " + ' '.join("{}={}".format(name, 'ok' if ok else 'FAIL') for name, ok in checks.items()))
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Benchmark for mlxfwreset_caps.
+
+fw_reset of bf-upgrade.env/nic-fw runs against a stub mlxfwreset that
+takes --query_time seconds per query and reports the driver as the owner
+of the reset sync --owner_after seconds after the first query. The shell
+flow with and without mlxfwreset_caps.py is compared in queries, time
+from the driver ownership to the reset and total time.
+"""
+
+import os
+import sys
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+ENV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env')
+
+STUB = r'''#!/bin/bash
+if [ "${@: -1}" == "q" ]; then
+	echo "q $EPOCHREALTIME" >> $WORK/calls
+	sleep $QUERY_TIME
+	first=$(head -1 $WORK/calls | awk '{print $2}')
+	owner="-Not Supported"
+	if awk -v f=$first -v n=$EPOCHREALTIME -v a=$OWNER_AFTER 'BEGIN {exit !(n - f >= a)}'; then
+		owner="-Supported     (default)"
+	fi
+	cat << EOF
+
+Reset-levels:
+0: Driver, PCI link, network link will remain up ("live-Patch")                -Not Supported
+1: Only ARM side will not remain up ("Immediate reset").                        -Not Supported
+3: Driver restart and PCI reset                                                 -Supported     (default)
+4: Warm Reboot                                                                  -Supported
+
+Reset-types (relevant only for reset-levels 1,3,4):
+0: Full chip reset                                                              -Supported     (default)
+
+Reset-sync (relevant only for reset-level 3):
+0: Tool is the owner                                                            -Supported
+1: Driver is the owner                                                          $owner
+EOF
+else
+	echo "r $EPOCHREALTIME" >> $WORK/calls
+fi
+'''
+
+DRIVER = r'''
+LOG=$WORK/log
+ilog() { echo "$*" >> $LOG; }
+log() { ilog "$*"; }
+sleep() { [ "$1" == "3" ] || command sleep "$@"; }
+. $ENV_DIR/nic-fw > /dev/null 2>&1
+running_nic_fw() { echo "$PROVIDED_NIC_FW_VERSION"; }
+is_nic_mode=0
+PROVIDED_NIC_FW_VERSION=1
+MLXFWRESET_TIMEOUT=$TIMEOUT
+start=$EPOCHREALTIME
+fw_reset
+echo "rc=$? start=$start end=$EPOCHREALTIME"
+'''
+
+
+def run_flow(name, caps, args, directory):
+    work = os.path.join(directory, name)
+    os.makedirs(os.path.join(work, 'bin'))
+    stub = os.path.join(work, 'bin', 'mlxfwreset')
+    with open(stub, 'w') as stream:
+        stream.write(STUB)
+    os.chmod(stub, 0o755)
+
+    env = dict(os.environ)
+    env.update({
+        'WORK': work,
+        'ENV_DIR': ENV_DIR,
+        'PATH': os.path.join(work, 'bin') + ':' + env['PATH'],
+        'QUERY_TIME': str(args.query_time),
+        'OWNER_AFTER': str(args.owner_after),
+        'TIMEOUT': str(args.timeout),
+        'MLXFWRESET_CAPS': caps,
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    proc = subprocess.run(['bash', '-c', DRIVER], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    result = dict(item.split('=') for item in proc.stdout.split())
+
+    queries = []
+    reset = None
+    with open(os.path.join(work, 'calls'), 'r') as stream:
+        for line in stream:
+            kind, stamp = line.split()
+            if kind == 'q':
+                queries.append(float(stamp))
+            elif reset is None:
+                reset = float(stamp)
+    owner = queries[0] + args.owner_after
+    with open(os.path.join(work, 'log'), 'r') as stream:
+        log = stream.read().splitlines()
+    return {
+        'flow': name,
+        'rc': int(result['rc']),
+        'queries': len(queries),
+        'reset_after_owner_s': round(reset - owner, 3) if reset else None,
+        'total_s': round(float(result['end']) - float(result['start']), 3),
+        'log': log,
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='mlxfwreset_caps benchmark')
+    parser.add_argument('--query_time', type=float, help="Seconds per mlxfwreset query", default=0.5)
+    parser.add_argument('--owner_after', type=float, help="Seconds until the driver owns the reset", default=4)
+    parser.add_argument('--timeout', type=int, help="MLXFWRESET_TIMEOUT", default=60)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON", default=False)
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        shell = run_flow('shell', '/nonexistent', args, directory)
+        caps = run_flow('caps', os.path.join(ENV_DIR, 'mlxfwreset_caps.py'), args, directory)
+
+    checks = {
+        'rc': shell['rc'] == caps['rc'] == 0,
+        'reset': shell['reset_after_owner_s'] is not None and caps['reset_after_owner_s'] is not None,
+    }
+
+    if args.json:
+        print(json.dumps({'shell': shell, 'caps': caps, 'checks': checks}, indent=4))
+    else:
+        for flow in [shell, caps]:
+            print("{:<6} rc {}  queries {:>3}  reset after ownership {:>7}s  total {:>7.3f}s".format(
+                flow['flow'], flow['rc'], flow['queries'], flow['reset_after_owner_s'], flow['total_s']))
+        print('\n'.join("  " + line for line in caps['log']))
+        print("checks: " + ' '.join("{}={}".format(name, 'ok' if ok else 'FAIL') for name, ok in checks.items()))
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+        main()
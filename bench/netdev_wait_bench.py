@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Benchmark for netdev_wait.
+
+ifb interfaces with the HBN names are created at fixed delays, the last
+one renamed like udev renames the representors. The same schedule is
+waited for with the HBN_IFNAME_WAIT_INTERVAL polling loop and with
+netdev_wait.py. The delay between the last interface and the return of
+the wait is compared. Needs CAP_NET_ADMIN.
+"""
+
+import os
+import sys
+import argparse
+import json
+import subprocess
+import tempfile
+import threading
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+NETDEV_WAIT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env', 'netdev_wait.py')
+
+# (name, seconds after the start of the wait)
+SCHEDULE = [('bnp0', 0.3), ('bnp1', 0.9), ('bnc1pf0', 1.6), ('bnc1pf1', 2.2), ('bnpf0dpu1', 3.1), ('bnpf0dpu3', 4.3)]
+
+# Fixed interval check of the HBN interfaces
+POLL_LOOP = r'''
+start=$SECONDS
+while [ $((SECONDS - start)) -lt $TIMEOUT ]; do
+	missing=0
+	for ifname in $NAMES; do
+		[ -e /sys/class/net/$ifname ] || missing=1
+	done
+	[ $missing -eq 0 ] && exit 0
+	sleep $INTERVAL
+done
+exit 1
+'''
+
+
+def ip(*args):
+    subprocess.run(['ip', 'link'] + list(args), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def cleanup():
+    for name, delay in SCHEDULE:
+        ip('del', name)
+    ip('del', 'bntmp')
+
+
+def create(schedule, start):
+    for index, (name, delay) in enumerate(schedule):
+        time.sleep(max(0, start + delay - time.monotonic()))
+        if index == len(schedule) - 1:
+            ip('add', 'bntmp', 'type', 'ifb')
+            ip('set', 'bntmp', 'name', name)
+        else:
+            ip('add', name, 'type', 'ifb')
+
+
+def run_flow(name, cmd, env):
+    cleanup()
+    start = time.monotonic()
+    creator = threading.Thread(target=create, args=(SCHEDULE, start))
+    creator.start()
+    proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    elapsed = time.monotonic() - start
+    creator.join()
+    cleanup()
+    last = SCHEDULE[-1][1]
+    return {
+        'flow': name,
+        'rc': proc.returncode,
+        'seconds': round(elapsed, 3),
+        'after_last': round(elapsed - last, 3),
+        'output': proc.stdout.splitlines(),
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='netdev_wait benchmark')
+    parser.add_argument('--interval', type=int, help="HBN_IFNAME_WAIT_INTERVAL", default=10)
+    parser.add_argument('--timeout', type=int, help="HBN_IFNAME_WAIT_TIMEOUT", default=300)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON", default=False)
+
+    args = parser.parse_args()
+
+    if os.geteuid() != 0:
+        sys.exit('root privileges are required to create the interfaces')
+
+    names = [name for name, delay in SCHEDULE]
+    with tempfile.TemporaryDirectory() as directory:
+        env_file = os.path.join(directory, 'sfc-hbn-deferred-install.env')
+        with open(env_file, 'w') as stream:
+            stream.write('BR_HBN_UPLINKS="{}"\nBR_HBN_REPS="{}"\nBR_HBN_SFS="{}"\nHBN_IFNAME_WAIT_TIMEOUT="{}"\n'.format(
+                ','.join(names[0:2]), ','.join(names[2:4]), ','.join(names[4:6]), args.timeout))
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', NAMES=' '.join(names),
+                   TIMEOUT=str(args.timeout), INTERVAL=str(args.interval))
+        poll = run_flow('poll', ['bash', '-c', POLL_LOOP], env)
+        netlink = run_flow('netlink', ['python3', NETDEV_WAIT, '--op', 'wait', '--env', env_file], env)
+
+    checks = {'rc': poll['rc'] == netlink['rc'] == 0}
+
+    if args.json:
+        print(json.dumps({'poll': poll, 'netlink': netlink, 'checks': checks}, indent=4))
+    else:
+        for flow in [poll, netlink]:
+            print("{:<8} rc {}  wait {:>7.3f}s  after the last interface {:>7.3f}s".format(
+                flow['flow'], flow['rc'], flow['seconds'], flow['after_last']))
+        print('\n'.join("  " + line for line in netlink['output']))
+        print("checks: " + ' '.join("{}={}".format(name, 'ok' if ok else 'FAIL') for name, ok in checks.items()))
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+import os
+import sys
+import argparse
+import json
+import tempfile
+import time
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import network_admin
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+
+def netplan_document(vlans):
+    """
+    Build netplan configuration similar to the one managed by network_admin
+    """
+    data = {'network': {'ethernets': {}, 'vlans': {}, 'renderer': 'networkd', 'version': 2}}
+    for port in ['p0', 'p1', 'pf0hpf', 'pf1hpf']:
+        data['network']['ethernets'][port] = {'dhcp4': 'true', 'mtu': '9216', 'addresses': ['192.168.{}.1/24'.format(len(data['network']['ethernets']))]}
+    for vid in range(1, vlans + 1):
+        data['network']['vlans']['vlan{}'.format(vid)] = {
+            'id': vid,
+            'link': 'p0' if vid % 2 else 'p1',
+            'addresses': ['10.{}.{}.1/24'.format(vid // 256, vid % 256)],
+            'mtu': '9000',
+        }
+    return data
+
+
+def measure(func, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def bench(path, vlans, iterations):
+    data = netplan_document(vlans)
+    with open(path, 'w') as stream:
+        yaml.dump(data, stream, sort_keys=False)
+
+    def pure_load():
+        with open(path, 'r') as stream:
+            yaml.safe_load(stream)
+
+    def pure_dump():
+        with open(path, 'w') as stream:
+            yaml.dump(data, stream, sort_keys=False)
+
+    def fast_dump():
+        with open(path, 'w') as stream:
+            yaml.dump(data, stream, Dumper=network_admin.SafeDumper, sort_keys=False)
+
+    result = {'vlans': vlans, 'size': os.path.getsize(path)}
+    result['pure_load_ms'] = measure(pure_load, iterations)
+    result['fast_load_ms'] = measure(lambda: network_admin.read_yaml(path), iterations)
+    network_admin.file_cache.clear()
+    network_admin.load_netplan(path)
+    result['cached_load_ms'] = measure(lambda: network_admin.load_netplan(path), iterations)
+    result['cached_copy_ms'] = measure(lambda: network_admin.load_netplan(path, copy=True), iterations)
+    result['pure_dump_ms'] = measure(pure_dump, iterations)
+    result['fast_dump_ms'] = measure(fast_dump, iterations)
+    return result
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark netplan YAML loading and dumping')
+    parser.add_argument('--vlans', type=int, nargs='+', help="Number of VLANs in generated configuration", default=[1, 100, 4000])
+    parser.add_argument('--iterations', type=int, help="Iterations per measurement", default=20)
+    parser.add_argument('--json', action='store_true', help="Print results in JSON format", default=False)
+
+    args = parser.parse_args()
+
+    libyaml = network_admin.SafeLoader is not yaml.SafeLoader
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for vlans in args.vlans:
+            results.append(bench(os.path.join(tmpdir, '50-cloud-init.yaml'), vlans, args.iterations))
+
+    if args.json:
+        print(json.dumps({'libyaml': libyaml, 'results': results}, indent=4))
+        return
+
+    print("libyaml: {}".format(libyaml))
+    columns = ['vlans', 'size', 'pure_load_ms', 'fast_load_ms', 'cached_load_ms', 'cached_copy_ms', 'pure_dump_ms', 'fast_dump_ms']
+    print(' '.join("{:>14}".format(c) for c in columns))
+    for result in results:
+        print(' '.join("{:>14}".format(result[c] if isinstance(result[c], int) else "{:.3f}".format(result[c])) for c in columns))
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Offline network_admin benchmark.
+
+Builds a fake root with sysfs/procfs for two ports and their SFs, netplan
+and resolv.conf files, and puts stub ip, netplan, mlnx_qos, mlxreg, lspci
+and logger binaries on PATH. Every op/action case runs in-process with
+cold caches. Forks are counted from the bf_trace 'exec' spans, the stubs
+record their invocations.
+
+Latencies are compared as multiples of a reference measured in the same
+run: one stub command and one netplan YAML load and dump, the operations
+the cases are made of. The gate does not depend on the speed of the host.
+
+Use --save to write a baseline and --baseline to fail on regressions.
+"""
+
+import os
+import sys
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import network_admin
+import bf_trace
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+# Allowed growth of the relative latency, plus slack in reference units
+LATENCY_TOLERANCE = 0.5
+LATENCY_SLACK = 0.5
+REFERENCE_SAMPLES = 3
+
+PORTS = [
+    # port, PCI device, representor, SF netdev, SF RDMA device
+    ('0', '0000:03:00.0', 'p0', 'en3f0pf0sf0', 'mlx5_2'),
+    ('1', '0000:03:00.1', 'p1', 'en3f1pf1sf0', 'mlx5_3'),
+]
+
+CASES = [
+    ('ipconfig_show', ['--op', 'ipconfig', '--action', 'show', '--port', '0']),
+    ('ipconfig_set', ['--op', 'ipconfig', '--action', 'set', '--port', '0', '--ipv4_addr', '10.0.0.2', '--ipv4_prefix', '24']),
+    ('ipconfig_set_dhcp', ['--op', 'ipconfig', '--action', 'set', '--port', '1', '--ipv4_addr', 'dhcp']),
+    ('ipconfig_show_vlan', ['--op', 'ipconfig', '--action', 'show', '--port', '0', '--vlan', '100']),
+    ('ipconfig_set_vlan', ['--op', 'ipconfig', '--action', 'set', '--port', '0', '--vlan', '200', '--ipv4_addr', '10.2.0.1', '--ipv4_prefix', '24']),
+    ('ipconfig_set_vlan_range', ['--op', 'ipconfig', '--action', 'set', '--port', '0', '--vlan', '300-399', '--ipv4_addr', 'dhcp']),
+    ('mtuconfig_show', ['--op', 'mtuconfig', '--action', 'show', '--port', '0']),
+    ('mtuconfig_set', ['--op', 'mtuconfig', '--action', 'set', '--port', '0', '--mtu', '9000']),
+    ('gwconfig_show', ['--op', 'gwconfig', '--action', 'show', '--port', '0']),
+    ('gwconfig_set', ['--op', 'gwconfig', '--action', 'set', '--port', '0', '--ipv4_gateway', '10.0.0.254']),
+    ('gwconfig_set_routes', ['--op', 'gwconfig', '--action', 'set', '--port', '0', '--routes', '{root}/routes']),
+    ('gwconfig_remove_route', ['--op', 'gwconfig', '--action', 'set', '--port', '0', '--ipv4_gateway', '10.0.0.254',
+                               '--metric', '100', '--routes_op', 'remove']),
+    ('dnsconfig_show', ['--op', 'dnsconfig', '--action', 'show']),
+    ('dnsconfig_set', ['--op', 'dnsconfig', '--action', 'set', '--ipv4_nameservers', '10.0.0.53']),
+    ('domainconfig_show', ['--op', 'domainconfig', '--action', 'show']),
+    ('domainconfig_set', ['--op', 'domainconfig', '--action', 'set', '--domains', 'lab.example.com']),
+    ('roceconfig_show', ['--op', 'roceconfig', '--action', 'show', '--port', '0']),
+    ('roceconfig_set', ['--op', 'roceconfig', '--action', 'set', '--port', '0', '--trust', 'dscp', '--ecn', '0,0,0,1,0,0,0,0', '--type', 'lossless']),
+    ('vlanconfig_show', ['--op', 'vlanconfig', '--action', 'show', '--port', '0', '--vlan', '100']),
+    ('vlanconfig_set', ['--op', 'vlanconfig', '--action', 'set', '--port', '0', '--vlan', '100', '--skprio_up_egress', '0,1,2,3,4,5,6,7']),
+    ('vlanconfig_list', ['--op', 'vlanconfig', '--action', 'list', '--port', '0']),
+    ('vlanconfig_remove', ['--op', 'vlanconfig', '--action', 'remove', '--port', '0', '--vlan', '100']),
+    ('all_show', ['--port', 'all', '--action', 'show']),
+]
+
+STUB = """#!/bin/sh
+echo "$(basename "$0") $*" >> "$NA_BENCH_LOG"
+"""
+
+STUBS = {
+    'ip': STUB + """case "$*" in
+    *"-json -details link show"*) echo '[{"linkinfo": {"info_data": {"egress_qos": [{"from": 1, "to": 3}]}}}]' ;;
+esac
+""",
+    'netplan': STUB,
+    'logger': STUB,
+    'lspci': STUB + """echo "$2.0 Ethernet controller: Mellanox Technologies MT43244 BlueField-3"
+echo "$2.1 Ethernet controller: Mellanox Technologies MT43244 BlueField-3"
+""",
+    'mlxreg': STUB + """case "$*" in
+    *--get*) printf 'roce_adp_retrans_en | 0x00000001\\nroce_tx_window_en | 0x00000001\\nroce_slow_restart_en | 0x00000001\\n' ;;
+esac
+""",
+    'mlnx_qos': STUB + """case "$*" in
+    *" -a"*) cat << EOF
+DCBX mode: OS controlled
+Priority trust state: dscp
+dscp2prio mapping:
+	prio:0 dscp:07,06,05,04,03,02,01,00,
+	prio:3 dscp:31,30,29,28,27,26,25,24,
+default priority:
+Receive buffer size (bytes): 130944,130944,0,0,0,0,0,0,
+Cable len: 7
+PFC configuration:
+	priority    0   1   2   3   4   5   6   7
+	enabled     0   0   0   1   0   0   0   0
+	buffer      0   0   0   1   0   0   0   0
+tc: 0 ratelimit: unlimited, tsa: vendor
+	 priority:  1
+tc: 1 ratelimit: unlimited, tsa: vendor
+	 priority:  0
+tc: 3 ratelimit: unlimited, tsa: ets, bw: 100%
+	 priority:  3
+EOF
+    ;;
+esac
+""",
+}
+
+
+def write_file(path, data, mode=0o644):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as stream:
+        stream.write(data)
+    os.chmod(path, mode)
+
+
+def netplan_document():
+    data = {'network': {'ethernets': {}, 'vlans': {}, 'renderer': 'networkd', 'version': 2}}
+    for port, pci, rep, sf, rdma in PORTS:
+        data['network']['ethernets'][sf] = {'addresses': ['10.{}.0.1/24'.format(port)], 'mtu': 1500,
+                                            'routes': [{'to': '10.{}.10.0/24'.format(port), 'via': '10.{}.0.254'.format(port)},
+                                                       {'to': '0.0.0.0/0', 'via': '10.{}.0.254'.format(port), 'metric': 100},
+                                                       {'to': '10.{}.11.0/24'.format(port), 'via': '10.{}.0.254'.format(port)}]}
+    data['network']['vlans']['en3f0pf0sf0.100'] = {'id': 100, 'link': 'en3f0pf0sf0', 'addresses': ['10.100.0.1/24']}
+    return yaml.dump(data, sort_keys=False)
+
+
+def build_root(root):
+    """
+    Create fake sysfs, procfs, configuration files and stub binaries
+    """
+    for port, pci, rep, sf, rdma in PORTS:
+        os.makedirs(os.path.join(root, 'sys/devices/pci0000:00', pci), exist_ok=True)
+        os.makedirs(os.path.join(root, 'sys/class/infiniband/mlx5_{}'.format(port)), exist_ok=True)
+        os.symlink(os.path.join(root, 'sys/devices/pci0000:00', pci),
+                   os.path.join(root, 'sys/class/infiniband/mlx5_{}/device'.format(port)))
+        os.makedirs(os.path.join(root, 'sys/class/net', sf, 'device/infiniband', rdma))
+        os.makedirs(os.path.join(root, 'sys/class/net', rep, 'smart_nic/pf'))
+        for dev in [sf, rep, 'pf{}hpf'.format(port)]:
+            write_file(os.path.join(root, 'sys/class/net', dev, 'mtu'), "1500\n")
+        for point in ['roce_np', 'roce_rp']:
+            for prio in range(8):
+                write_file(os.path.join(root, 'sys/class/net', rep, 'ecn', point, 'enable', str(prio)), "0\n")
+    write_file(os.path.join(root, 'sys/class/net/en3f0pf0sf0.100/mtu'), "1500\n")
+    write_file(os.path.join(root, 'proc/net/vlan/en3f0pf0sf0.100'),
+               "en3f0pf0sf0.100  VID: 100\t REORDER_HDR: 1  dev->priv_flags: 1021\n"
+               "INGRESS priority mappings: 0:0  1:0  2:0  3:0  4:0  5:0  6:0 7:0\n"
+               " EGRESS priority mappings: 1:3\n")
+    write_file(os.path.join(root, 'routes'), "10.0.20.0/24 via 10.0.0.254\n10.0.21.0/24 via 10.0.0.254 metric 100\n")
+    for name, script in STUBS.items():
+        write_file(os.path.join(root, 'bin', name), script, 0o755)
+
+
+def reset_root(root):
+    """
+    Restore configuration files and drop caches, as for a new process
+    """
+    netplan_dir = os.path.join(root, 'etc/netplan')
+    os.makedirs(netplan_dir, exist_ok=True)
+    for name in os.listdir(netplan_dir):
+        os.unlink(os.path.join(netplan_dir, name))
+    write_file(os.path.join(netplan_dir, '60-mlnx.yaml'), netplan_document(), 0o600)
+    write_file(os.path.join(root, 'etc/resolv.conf'), "search example.com\nnameserver 10.0.0.53\n")
+    for name in ['resolv.conf.orig']:
+        if os.path.exists(os.path.join(root, 'etc', name)):
+            os.unlink(os.path.join(root, 'etc', name))
+    open(os.environ['NA_BENCH_LOG'], 'w').close()
+    network_admin.file_cache.clear()
+    network_admin.vlan_index_cache = (None, None)
+    network_admin.route_index_cache = (None, None)
+
+
+def setup(root):
+    """
+    Point network_admin to the fake root
+    """
+    config = os.path.join(root, 'etc/netplan/60-mlnx.yaml')
+    network_admin.sysroot = root
+    network_admin.MLXREG = os.path.join(root, 'bin/mlxreg')
+    network_admin.network_config = config
+    network_admin.network_config_orig = config + ".orig"
+    network_admin.network_config_candidate = config + ".new"
+    network_admin.network_config_rollback = config + ".rollback"
+    network_admin.network_config_good = config + ".good"
+    network_admin.network_config_bad = config + ".bad"
+    network_admin.resolv_conf = os.path.join(root, 'etc/resolv.conf')
+    network_admin.resolv_conf_orig = os.path.join(root, 'etc/resolv.conf.orig')
+    network_admin.daemon_socket = os.path.join(root, 'network_admin.sock')
+    os.environ['PATH'] = os.path.join(root, 'bin') + ':' + os.environ['PATH']
+    os.environ['NA_BENCH_LOG'] = os.path.join(root, 'invocations.log')
+    bf_trace.enabled = True
+
+
+def run_case(root, argv):
+    reset_root(root)
+    argv = [arg.format(root=root) for arg in argv]
+    args = network_admin.get_parser(argv).parse_args(argv)
+    del bf_trace.events[:]
+    start = time.perf_counter()
+    rc, output = network_admin.execute(args)
+    duration = time.perf_counter() - start
+    forks = [event[0] for event in bf_trace.events if event[1] == 'exec']
+    with open(os.environ['NA_BENCH_LOG'], 'r') as stream:
+        invocations = stream.read().splitlines()
+    return rc, output, duration, forks, invocations
+
+
+def check_remove_route(root):
+    """
+    Only the named route is removed, the other routes of the device are kept
+    """
+    with open(network_admin.network_config, 'r') as stream:
+        data = yaml.load(stream, Loader=network_admin.SafeLoader)
+    routes = data['network']['ethernets']['en3f0pf0sf0'].get('routes', [])
+    expected = [{'to': '10.0.10.0/24', 'via': '10.0.0.254'}, {'to': '10.0.11.0/24', 'via': '10.0.0.254'}]
+    if routes != expected:
+        return "routes {} != {}".format(routes, expected)
+    return None
+
+
+# Result checks run on the fake root after the case
+CHECKS = {
+    'gwconfig_remove_route': check_remove_route,
+}
+
+
+def reference(root):
+    """
+    Time in seconds of one stub command and one netplan load and dump
+    """
+    start = time.perf_counter()
+    network_admin.get_status_output("logger -t {} reference".format(prog))
+    with open(network_admin.network_config, 'r') as stream:
+        data = yaml.load(stream, Loader=network_admin.SafeLoader)
+    yaml.dump(data, Dumper=network_admin.SafeDumper, sort_keys=False)
+    return time.perf_counter() - start
+
+
+def bench(root, iterations, cases):
+    """
+    The reference is measured before every iteration of a case, so both
+    see the same host load. The fastest iteration of each is used.
+    """
+    results = {}
+    references = []
+    for name, argv in CASES:
+        if cases and name not in cases:
+            continue
+        durations = []
+        case_references = []
+        check = None
+        for i in range(iterations):
+            reset_root(root)
+            case_references.append(min(reference(root) for j in range(REFERENCE_SAMPLES)))
+            rc, output, duration, forks, invocations = run_case(root, argv)
+            durations.append(duration)
+            if name in CHECKS and not rc:
+                check = check or CHECKS[name](root)
+        references += case_references
+        commands = {}
+        for fork in forks:
+            commands[fork] = commands.get(fork, 0) + 1
+        results[name] = {
+            'rc': rc,
+            'latency_ms': min(durations) * 1000,
+            'relative': min(durations) / min(case_references),
+            'forks': len(forks),
+            'commands': commands,
+            'stub_calls': len(invocations),
+        }
+        if rc:
+            results[name]['output'] = output
+        if check:
+            results[name]['check'] = check
+    return min(references) * 1000 if references else 0, results
+
+
+def compare(results, baseline, tolerance, slack):
+    """
+    Return list of regressions against the baseline. Latency is compared
+    relative to the reference of each run.
+    """
+    regressions = []
+    for name, result in results.items():
+        if result['rc']:
+            regressions.append("{}: failed with rc={}: {}".format(name, result['rc'], result.get('output', '')))
+        if result.get('check'):
+            regressions.append("{}: check failed: {}".format(name, result['check']))
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if result['forks'] > expected['forks']:
+            regressions.append("{}: forks {} > {} ({})".format(name, result['forks'], expected['forks'], result['commands']))
+        limit = expected['relative'] * (1 + tolerance) + slack
+        if result['relative'] > limit:
+            regressions.append("{}: latency {:.2f}x reference > {:.2f}x".format(name, result['relative'], limit))
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark network_admin operations on a fake root with stub tools')
+    parser.add_argument('--iterations', type=int, help="Iterations per case", default=5)
+    parser.add_argument('--case', action='append', help="Run only this case. Use multiple times")
+    parser.add_argument('--baseline', help="Fail if forks or latency regress against this baseline file")
+    parser.add_argument('--tolerance', type=float, help="Allowed growth of the relative latency", default=LATENCY_TOLERANCE)
+    parser.add_argument('--slack', type=float, help="Allowed latency growth in reference units", default=LATENCY_SLACK)
+    parser.add_argument('--save', help="Save results as the new baseline")
+    parser.add_argument('--keep', action='store_true', help="Keep the fake root", default=False)
+    parser.add_argument('--json', action='store_true', help="Print results in JSON format", default=False)
+
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='network_admin_bench.')
+    setup(root)
+    build_root(root)
+    try:
+        reference_ms, results = bench(root, args.iterations, args.case)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+        else:
+            print("Fake root: {}".format(root), file=sys.stderr)
+
+    if args.json:
+        print(json.dumps({'reference_ms': reference_ms, 'cases': results}, indent=4))
+    else:
+        columns = ['latency_ms', 'relative', 'forks', 'stub_calls']
+        print("reference {:.3f}ms".format(reference_ms))
+        print("{:<26} {}".format('case', ' '.join("{:>12}".format(c) for c in columns)))
+        for name, result in results.items():
+            print("{:<26} {:>12.3f} {:>12.2f} {:>12} {:>12}{}".format(name, result['latency_ms'], result['relative'], result['forks'],
+                                                                     result['stub_calls'], "  FAILED" if result['rc'] or result.get('check') else ""))
+
+    if args.save:
+        with open(args.save, 'w') as stream:
+            json.dump({name: {'relative': round(result['relative'], 3), 'forks': result['forks']}
+                       for name, result in results.items()}, stream, indent=4, sort_keys=True)
+            stream.write('\n')
+
+    if args.baseline:
+        with open(args.baseline, 'r') as stream:
+            baseline = json.load(stream)
+        regressions = compare(results, baseline, args.tolerance, args.slack)
+        for regression in regressions:
+            print("REGRESSION: {}".format(regression), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+    sys.exit(1 if any(result['rc'] or result.get('check') for result in results.values()) else 0)
+
+
+if __name__ == '__main__':
+        main()
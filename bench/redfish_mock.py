@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Mock Redfish BMC for bmc_redfish.
+
+Serves /login, the task collection, tasks progressing linearly over their
+duration and the ERoT background copy status. Sessions expire after
+--token_ttl seconds. By default each scenario creates a set of tasks and
+waits for them with redfish_wait_tasks of bf-upgrade.env/bmc, which runs
+bmc_redfish.py --op wait and evaluates its task_* output. The exit code
+and the task variables are checked and the requests are compared with the
+fixed 10 s polling of the shell flows. Use --serve to run the server only.
+
+Scenarios:
+  ok     all tasks complete
+  fail   the last task ends with Exception, the errors are counted
+  drop   the BMC drops all connections for --drop seconds while the tasks run
+"""
+
+import os
+import sys
+import argparse
+import base64
+import re
+import json
+import math
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env'))
+import bmc_redfish
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+USER = "root"
+PASSWORD = "0penBmc"
+# Interval of the shell polling loops
+SHELL_INTERVAL = 10
+SCENARIOS = ['ok', 'fail', 'drop']
+BMC_ENV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env', 'bmc')
+
+# redfish_client and redfish_wait_tasks from bf-upgrade.env/bmc. The rest of
+# the file is not sourced, it reads the BMC credentials from efivars.
+WAIT_SCRIPT = r'''
+ilog()
+{
+	echo "$*" >&2
+}
+eval "$(sed -n -e '/^redfish_client()/,/^}/p' -e '/^redfish_wait_tasks()/,/^}/p' "$BMC_ENV")"
+RC=0
+redfish_wait_tasks "$@"
+echo "RC=$RC task_id=$task_id task_state=$task_state task_status=$task_status"
+'''
+
+
+class MockBMC:
+    def __init__ (self, token_ttl=3600, copy_duration=0):
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.tasks = {}
+        self.token_ttl = token_ttl
+        self.copy_done = time.monotonic() + copy_duration
+        # Connections are closed without a reply until this time
+        self.down = (0, 0)
+        self.stats = {'connections': 0, 'requests': 0, 'logins': 0, 'unauthorized': 0, 'dropped': 0}
+
+    def add_task(self, duration, state='Completed', status='OK'):
+        """
+        Add task that reaches 100% after duration seconds and ends with
+        the given state
+        """
+        with self.lock:
+            task_id = "/redfish/v1/TaskService/Tasks/{}".format(len(self.tasks))
+            self.tasks[task_id] = {'start': time.monotonic(), 'duration': duration, 'state': state, 'status': status}
+        return task_id
+
+    def drop(self, start, duration):
+        """
+        Close connections without a reply from start for duration seconds
+        """
+        now = time.monotonic()
+        self.down = (now + start, now + start + duration)
+
+    def is_down(self):
+        return self.down[0] <= time.monotonic() < self.down[1]
+
+    def task(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        elapsed = time.monotonic() - task['start']
+        percent = min(100, int(elapsed / task['duration'] * 100)) if task['duration'] else 100
+        data = {'@odata.id': task_id, 'Id': task_id.split('/')[-1], 'PercentComplete': percent,
+                'TaskState': 'Running', 'TaskStatus': 'OK'}
+        if percent == 100:
+            data['TaskState'] = task['state']
+            data['TaskStatus'] = task['status']
+        elif task['state'] in ['Exception', 'Cancelled'] and elapsed > task['duration'] / 2:
+            data['TaskState'] = task['state']
+            data['TaskStatus'] = task['status']
+        return data
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.bmc.lock:
+            self.server.bmc.stats['connections'] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, data=None):
+        body = json.dumps(data).encode() if data is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        bmc = self.server.bmc
+        auth = self.headers.get('Authorization', '')
+        if auth.startswith('Basic '):
+            return base64.b64decode(auth[6:]).decode() == "{}:{}".format(USER, PASSWORD)
+        expires = bmc.tokens.get(self.headers.get('X-Auth-Token'))
+        return expires is not None and expires > time.monotonic()
+
+    def dropped(self):
+        if not self.server.bmc.is_down():
+            return False
+        with self.server.bmc.lock:
+            self.server.bmc.stats['dropped'] += 1
+        self.close_connection = True
+        return True
+
+    def do_POST(self):
+        bmc = self.server.bmc
+        if self.dropped():
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        with bmc.lock:
+            bmc.stats['requests'] += 1
+        if self.path == '/login':
+            with bmc.lock:
+                bmc.stats['logins'] += 1
+            if body.get('username') != USER or body.get('password') != PASSWORD:
+                self.reply(401, {'error': 'Unauthorized'})
+                return
+            token = uuid.uuid4().hex
+            with bmc.lock:
+                bmc.tokens[token] = time.monotonic() + bmc.token_ttl
+            self.reply(200, {'token': token})
+            return
+        self.reply(404, {'error': 'Not found'})
+
+    def do_GET(self):
+        bmc = self.server.bmc
+        if self.dropped():
+            return
+        with bmc.lock:
+            bmc.stats['requests'] += 1
+        if not self.authorized():
+            with bmc.lock:
+                bmc.stats['unauthorized'] += 1
+            self.reply(401, {'error': 'Unauthorized'})
+            return
+        with bmc.lock:
+            if self.path == bmc_redfish.TASKS_URI:
+                self.reply(200, {'Members': [{'@odata.id': task_id} for task_id in bmc.tasks],
+                                 'Members@odata.count': len(bmc.tasks)})
+            elif self.path == bmc_redfish.EROT_URI:
+                status = "Completed" if time.monotonic() >= bmc.copy_done else "InProgress"
+                self.reply(200, {'Oem': {'Nvidia': {'BackgroundCopyStatus': status}}})
+            elif self.path in bmc.tasks:
+                self.reply(200, bmc.task(self.path))
+            else:
+                self.reply(404, {'error': 'Not found'})
+
+
+def make_certificate(directory):
+    """
+    Create self-signed certificate. Return (cert, key) or None
+    """
+    if not shutil.which('openssl'):
+        return None
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    rc = subprocess.call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                          '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if rc:
+        return None
+    return cert, key
+
+
+def start_server(bmc, port=0, tls=True, directory=None):
+    """
+    Start mock BMC in a background thread. Return (server, scheme)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), RequestHandler)
+    server.daemon_threads = True
+    server.bmc = bmc
+    scheme = 'http'
+    certificate = make_certificate(directory) if tls and directory else None
+    if certificate:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*certificate)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, scheme
+
+
+def shell_model(durations):
+    """
+    Requests, logins and detection time of the shell loops: one login and
+    one GET per poll, each on a new connection, every SHELL_INTERVAL seconds
+    """
+    polls = sum(int(math.ceil(duration / SHELL_INTERVAL)) + 1 for duration in durations)
+    # Tasks are waited one after another
+    detected = sum(int(math.ceil(duration / SHELL_INTERVAL)) * SHELL_INTERVAL for duration in durations)
+    return {'requests': polls * 2 + len(durations) * 2, 'connections': polls * 2 + len(durations) * 2,
+            'logins': polls + len(durations), 'wall_s': detected}
+
+
+def run(args, directory, scenario):
+    bmc = MockBMC(args.token_ttl, args.copy)
+    server, scheme = start_server(bmc, 0, not args.no_tls, directory)
+    port = server.server_address[1]
+
+    durations = list(args.durations)
+    task_ids = [bmc.add_task(duration) for duration in durations]
+    if scenario == 'fail':
+        durations.append(args.fail)
+        task_ids.append(bmc.add_task(args.fail, 'Exception', 'Critical'))
+    elif scenario == 'drop':
+        bmc.drop(args.copy + 1, args.drop)
+
+    cmd = ['bash', '-c', WAIT_SCRIPT, 'redfish_wait_tasks', '--copy', '--scheme', scheme, '--token_cache', '',
+           '--min_interval', str(args.min_interval), '--max_interval', str(args.max_interval), '--verbose']
+    for task_id in task_ids:
+        cmd += ['--task', task_id]
+    env = dict(os.environ, BMC_ENV=BMC_ENV, BMC_REDFISH=bmc_redfish.__file__, BMC_IP='127.0.0.1', BMC_PORT=str(port),
+               BMC_TASK_TIMEOUT=str(args.timeout), BMC_USER=USER, BMC_PASSWORD=PASSWORD, LOG=os.path.join(directory, 'bfb.log'))
+    start = time.monotonic()
+    proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    wall = time.monotonic() - start
+    server.shutdown()
+
+    result = {'scenario': scenario, 'scheme': scheme, 'rc': proc.returncode, 'wall_s': round(wall, 3),
+              'server': bmc.stats, 'shell': shell_model(durations)}
+    match = re.search(r'^RC=(\d+) task_id=(\S*) task_state=(\S*) task_status=(\S*)$', proc.stdout, re.M)
+    if match:
+        result.update({'errors': int(match.group(1)), 'task_id': match.group(2),
+                       'task_state': match.group(3), 'task_status': match.group(4)})
+    match = re.search(r'requests=(\d+) connections=(\d+) logins=(\d+) polls=(\d+)', proc.stderr)
+    if match:
+        result['client'] = dict(zip(['requests', 'connections', 'logins', 'polls'], map(int, match.groups())))
+    if proc.returncode or not match:
+        result['output'] = proc.stderr.splitlines()
+
+    last = task_ids[-1]
+    if scenario == 'fail':
+        # The Exception is counted by the watcher and by the report
+        checks = {'errors': result.get('errors', 0) >= 1,
+                  'task': result.get('task_id') == last and result.get('task_state') == 'Exception'}
+    else:
+        checks = {'errors': result.get('errors') == 0,
+                  'task': result.get('task_id') == last and result.get('task_state') == 'Completed' and result.get('task_status') == 'OK'}
+    if scenario == 'drop':
+        checks['dropped'] = bmc.stats['dropped'] > 0
+    result['checks'] = checks
+    return result
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Mock Redfish BMC and TaskWatcher benchmark')
+    parser.add_argument('--serve', action='store_true', help="Only run the mock BMC", default=False)
+    parser.add_argument('--port', type=int, help="Port for --serve", default=8443)
+    parser.add_argument('--durations', type=float, nargs='+', help="Durations of the watched tasks in seconds", default=[4, 7, 12])
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append', help="Scenario to run. Use multiple times. Default: all")
+    parser.add_argument('--fail', type=float, help="Duration of the task that ends with Exception in the fail scenario", default=3)
+    parser.add_argument('--drop', type=float, help="Seconds the BMC drops connections in the drop scenario", default=4)
+    parser.add_argument('--copy', type=float, help="ERoT background copy duration in seconds", default=2)
+    parser.add_argument('--token_ttl', type=float, help="Session lifetime in seconds", default=5)
+    parser.add_argument('--timeout', type=int, help="Task timeout in seconds", default=60)
+    parser.add_argument('--min_interval', type=float, help="Minimal polling interval", default=bmc_redfish.MIN_INTERVAL)
+    parser.add_argument('--max_interval', type=float, help="Maximal polling interval", default=bmc_redfish.MAX_INTERVAL)
+    parser.add_argument('--no_tls', action='store_true', help="Use plain HTTP", default=False)
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.serve:
+            bmc = MockBMC(args.token_ttl, args.copy)
+            for duration in args.durations:
+                bmc.add_task(duration)
+            server, scheme = start_server(bmc, args.port, not args.no_tls, directory)
+            print("Mock BMC: {}://127.0.0.1:{} user {} password {}".format(scheme, args.port, USER, PASSWORD))
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                server.shutdown()
+            return
+
+        results = [run(args, directory, scenario) for scenario in args.scenario or SCENARIOS]
+
+    print(json.dumps(results, indent=4))
+    failed = ["{}:{}".format(result['scenario'], name) for result in results for name, ok in result['checks'].items() if not ok]
+    if failed:
+        print("Failed checks: {}".format(' '.join(failed)), file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+        main()
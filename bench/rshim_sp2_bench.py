@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Benchmark for rshim_sp2 on a fake efivars directory.
+
+The same progress sequence is sent through the shell functions of
+bf-upgrade.env/rshim, with and without the Python codec. Every write of
+RshimSP2W is captured, and the written bytes and read_SP2 results are
+compared.
+"""
+
+import os
+import sys
+import argparse
+import json
+import struct
+import subprocess
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env'))
+sys.dont_write_bytecode = True
+import rshim_sp2
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+ENV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'bf-upgrade.env')
+
+# Upgrade flow with unrelated low bits set
+SP2_VALUE = rshim_sp2.MODE_UPGRADE | 0x3 | (1 << 40)
+
+# cp and rm wrappers record the RshimSP2W contents before the flows delete it
+DRIVER = r'''
+LOG=$WORK/log
+ilog() { echo "$*" >> $LOG; }
+n=0
+capture() { [ -e "$write_RshimSP2_path" ] && command cp "$write_RshimSP2_path" $WORK/captured.$((n++)); }
+cp() { command cp "$@"; local rc=$?; capture; return $rc; }
+. $ENV_DIR/rshim
+read_RshimSP2_path=$EFIVARS/${read_RshimSP2_path##*/}
+write_RshimSP2_path=$EFIVARS/${write_RshimSP2_path##*/}
+echo "read_SP2=$(read_SP2)"
+for progress in $PROGRESS; do
+    set_upgrade_progress $progress 0
+done
+set_upgrade_progress 100 $FINAL_STATUS
+'''
+
+
+def make_efivars(directory):
+    os.makedirs(directory)
+    with open(os.path.join(directory, rshim_sp2.READ_NAME), 'wb') as stream:
+        stream.write(rshim_sp2.VARIABLE.pack(rshim_sp2.ATTRIBUTES, SP2_VALUE))
+
+
+def run_flow(name, codec, progress, final_status, directory):
+    work = os.path.join(directory, name)
+    efivars = os.path.join(work, 'efivars')
+    make_efivars(efivars)
+
+    env = dict(os.environ)
+    env.update({
+        'WORK': work,
+        'ENV_DIR': ENV_DIR,
+        'EFIVARS': efivars,
+        'PROGRESS': ' '.join(str(p) for p in progress),
+        'FINAL_STATUS': str(final_status),
+        'RSHIM_SP2_CODEC': codec,
+        'RSHIM_SP2_STATE': os.path.join(work, 'state.json'),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    start = time.monotonic()
+    proc = subprocess.run(['bash', '-c', DRIVER], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    elapsed = time.monotonic() - start
+    if proc.returncode:
+        raise RuntimeError("{} failed: {}".format(name, proc.stderr))
+
+    writes = []
+    # The Python codec does not use cp. Its writes are taken from the log.
+    for index in range(len(os.listdir(work))):
+        path = os.path.join(work, 'captured.{}'.format(index))
+        if not os.path.exists(path):
+            break
+        with open(path, 'rb') as stream:
+            writes.append(stream.read())
+    logged = []
+    with open(os.path.join(work, 'log'), 'r') as stream:
+        for line in stream:
+            if line.startswith('set_upgrade_progress: '):
+                logged.append(int(line.split()[-1]))
+    if not writes:
+        writes = [rshim_sp2.VARIABLE.pack(rshim_sp2.ATTRIBUTES, value) for value in logged]
+    leftover = os.path.exists(os.path.join(efivars, rshim_sp2.WRITE_NAME))
+
+    return {
+        'flow': name,
+        'read_SP2': int(proc.stdout.split('=')[1]),
+        'calls': len(progress) + 1,
+        'writes': len(writes),
+        'values': [struct.unpack('<IQ', data)[1] for data in writes],
+        'bytes': [data.hex() for data in writes],
+        'leftover': leftover,
+        'seconds': round(elapsed, 3),
+        'ms_per_call': round(elapsed * 1000 / (len(progress) + 1), 2),
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='rshim_sp2 benchmark')
+    parser.add_argument('--step', type=int, help="Progress step in percent", default=1)
+    parser.add_argument('--status', type=int, help="Final status", default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON", default=False)
+
+    args = parser.parse_args()
+
+    progress = list(range(0, 100, args.step))
+    with tempfile.TemporaryDirectory() as directory:
+        shell = run_flow('shell', '/nonexistent', progress, args.status, directory)
+        codec = run_flow('codec', os.path.join(ENV_DIR, 'rshim_sp2.py'), progress, args.status, directory)
+
+    # The codec writes the distinct consecutive values of the shell flow
+    expected = [value for index, value in enumerate(shell['values']) if index == 0 or value != shell['values'][index - 1]]
+    shell_bytes = dict(zip(shell['values'], shell['bytes']))
+    checks = {
+        'read_SP2': shell['read_SP2'] == codec['read_SP2'] == SP2_VALUE,
+        'values': codec['values'] == expected,
+        'bytes': all(shell_bytes[value] == data for value, data in zip(codec['values'], codec['bytes'])),
+        'removed': not shell['leftover'] and not codec['leftover'],
+    }
+
+    if args.json:
+        print(json.dumps({'shell': shell, 'codec': codec, 'checks': checks}, indent=4))
+    else:
+        for flow in [shell, codec]:
+            print("{:<6} calls {:>4}  writes {:>4}  total {:>7.3f}s  {:>7.2f} ms/call".format(
+                flow['flow'], flow['calls'], flow['writes'], flow['seconds'], flow['ms_per_call']))
+        print("checks: " + ' '.join("{}={}".format(name, 'ok' if ok else 'FAIL') for name, ok in checks.items()))
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+        main()
@@ -167,8 +167,14 @@ install -m 0644 src/lid.conf		%{buildroot}/etc/systemd/logind.conf.d/
 # mlnx-snap
 install -d %{buildroot}/opt/mellanox/mlnx_snap/exec_files
 install -m 0755	src/network_admin.py %{buildroot}/opt/mellanox/mlnx_snap/exec_files/network_admin.py
+install -m 0755	src/network_admin_daemon.py %{buildroot}/opt/mellanox/mlnx_snap/exec_files/network_admin_daemon.py
 install -m 0755	src/bfb_admin.py     %{buildroot}/opt/mellanox/mlnx_snap/exec_files/bfb_admin.py
 install -m 0755	src/bfb_tool.py      %{buildroot}/opt/mellanox/mlnx_snap/exec_files/bfb_tool.py
+install -m 0644	src/bf_trace.py      %{buildroot}/opt/mellanox/mlnx_snap/exec_files/bf_trace.py
+install -m 0755	src/bf_xz.py         %{buildroot}/opt/mellanox/mlnx_snap/exec_files/bf_xz.py
+install -m 0755	src/bf_fleet.py      %{buildroot}/opt/mellanox/mlnx_snap/exec_files/bf_fleet.py
+install -m 0755	src/bf_telemetry.py  %{buildroot}/opt/mellanox/mlnx_snap/exec_files/bf_telemetry.py
+install -m 0755	src/bf_info.py       %{buildroot}/opt/mellanox/mlnx_snap/exec_files/bf_info.py
 
 # K8s
 install -d %{buildroot}/var/lib/kubelet
@@ -181,6 +187,8 @@ install -d %{buildroot}/etc/containerd
 install -m 0644 src/config.toml      %{buildroot}/etc/containerd/config-mlnx.toml
 install -m 0644	src/90-containerd-mlnx-config.conf %{buildroot}/usr/lib/systemd/system/containerd.service.d/90-containerd-mlnx-config.conf
 install -m 0644	src/90-kubelet-bluefield.conf %{buildroot}/usr/lib/systemd/system/kubelet.service.d/90-kubelet-bluefield.conf
+install -m 0644	src/network-admin.service %{buildroot}/usr/lib/systemd/system/network-admin.service
+install -m 0644	src/bf-telemetry.service %{buildroot}/usr/lib/systemd/system/bf-telemetry.service
 install -m 0644	src/99-loopback.conf %{buildroot}/etc/cni/net.d/99-loopback.conf
 install -m 0644	src/crictl.yaml      %{buildroot}/etc/crictl.yaml
 install -m 0644	src/config.yaml      %{buildroot}/var/lib/kubelet/config.yaml
@@ -379,6 +387,8 @@ fi
 
 /usr/lib/systemd/system/kubelet.service.d/90-kubelet-bluefield.conf
 /usr/lib/systemd/system/containerd.service.d/90-containerd-mlnx-config.conf
+/usr/lib/systemd/system/network-admin.service
+/usr/lib/systemd/system/bf-telemetry.service
 
 %dir /etc/cni/net.d
 /etc/cni/net.d/99-loopback.conf
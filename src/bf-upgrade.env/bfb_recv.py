@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+BFB receiver for bf-upgrade.
+
+Reads the boot FIFO into a reusable buffer, writes it to the output file
+and updates the SHA-256 as data arrives. The BFB image headers are
+followed as the stream is read. Data after the last image that starts
+with the BFB magic is followed as the next concatenated BFB, e.g. a
+configuration BFB sent after the installation image. After the last
+image the receiver only waits --settle seconds for the next BFB instead
+of the full idle timeout, so a BFB that starts after a longer pause is
+not received. Other data after the last image and streams that are not
+BFBs fall back to the idle timeout.
+
+BFB image header, little-endian 64-bit words:
+  word 0: magic (31:0), major (35:32), minor (39:36), next_img_ver (43:40),
+          cur_img_ver (47:44), header length in 8-byte words (55:48)
+  word 1: image length (31:0), image id (39:32)
+  word 2: bitmap of the image ids following this image
+The image data is padded to 8 bytes.
+"""
+
+import os
+import sys
+import argparse
+import hashlib
+import json
+import struct
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+BFB_MAGIC = 0x13026642
+HEADER_SIZE = 24
+BUFFER_SIZE = 1 << 20
+MIN_POLL = 0.02
+MAX_POLL = 0.5
+# Defaults of bf-upgrade: IDLE_MAX + DATA_RECEIVE_TIMEOUT and DATA_RECEIVE_TIMEOUT
+FIRST_TIMEOUT = 45
+IDLE_TIMEOUT = 40
+SETTLE_TIMEOUT = 2
+
+verbose = False
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+class BfbFramer:
+    """
+    Incremental BFB image header parser
+    """
+    def __init__ (self):
+        self.header = bytearray()
+        self.header_len = HEADER_SIZE
+        self.skip = 0
+        self.last = False
+        self.done = False
+        self.chained = False
+        self.error = None
+        self.images = []
+        self.containers = 0
+
+    def __parse_header__(self):
+        word0, word1, word2 = struct.unpack_from('<QQQ', self.header)
+        image_len = word1 & 0xffffffff
+        image_id = (word1 >> 32) & 0xff
+        if self.chained or not self.images:
+            self.containers += 1
+        self.chained = False
+        self.images.append((image_id, image_len))
+        self.skip = (image_len + 7) & ~7
+        self.last = word2 == 0
+        self.header = bytearray()
+        self.header_len = HEADER_SIZE
+        if not self.skip and self.last:
+            self.done = True
+
+    def feed(self, data):
+        """
+        Parse data. Return number of bytes that belong to the BFB
+        """
+        pos = 0
+        size = len(data)
+        while pos < size and not self.error:
+            if self.skip:
+                step = min(self.skip, size - pos)
+                self.skip -= step
+                pos += step
+                if not self.skip and self.last:
+                    self.done = True
+                continue
+
+            if self.done:
+                # Data after the last image may only be the next concatenated BFB
+                self.done = False
+                self.chained = True
+
+            step = min(self.header_len - len(self.header), size - pos)
+            self.header += data[pos:pos + step]
+            pos += step
+            if len(self.header) == HEADER_SIZE:
+                word0 = struct.unpack_from('<Q', self.header)[0]
+                if word0 & 0xffffffff != BFB_MAGIC:
+                    if self.chained:
+                        self.error = "data after the last image"
+                    else:
+                        self.error = "bad magic 0x{:08x} in image {}".format(word0 & 0xffffffff, len(self.images))
+                    break
+                self.header_len = ((word0 >> 48) & 0xff) * 8
+                if self.header_len < HEADER_SIZE:
+                    self.error = "bad header length {} in image {}".format(self.header_len, len(self.images))
+                    break
+            if len(self.header) == self.header_len:
+                self.__parse_header__()
+        return pos
+
+
+class Receiver:
+    def __init__ (self, fifo, output, first_timeout=FIRST_TIMEOUT, idle_timeout=IDLE_TIMEOUT, settle=SETTLE_TIMEOUT):
+        self.fifo = fifo
+        self.output = output
+        self.first_timeout = first_timeout
+        self.idle_timeout = idle_timeout
+        self.settle = settle
+        self.buffer = bytearray(BUFFER_SIZE)
+        self.hasher = hashlib.sha256()
+        self.framer = BfbFramer()
+        self.size = 0
+        self.reads = 0
+        self.end = None
+
+    def __write__(self, fd, view):
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+
+    def __drain__(self, fd):
+        """
+        Read the FIFO until it is empty. Return number of bytes received
+        """
+        view = memoryview(self.buffer)
+        received = 0
+        # Non-blocking open lets a named pipe stand in for the boot FIFO
+        fifo = os.open(self.fifo, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            while True:
+                try:
+                    count = os.readv(fifo, [view])
+                except BlockingIOError:
+                    break
+                if not count:
+                    break
+                self.reads += 1
+                data = view[:count]
+                self.__write__(fd, data)
+                self.hasher.update(data)
+                if not self.framer.error:
+                    self.framer.feed(data)
+                received += count
+        finally:
+            os.close(fifo)
+        self.size += received
+        return received
+
+    def run(self):
+        fd = os.open(self.output, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        begin = time.monotonic()
+        first = None
+        last = begin
+        poll = MIN_POLL
+        try:
+            while True:
+                before = time.monotonic()
+                received = self.__drain__(fd)
+                now = time.monotonic()
+                if received:
+                    if first is None:
+                        first = before
+                    last = now
+                    poll = MIN_POLL
+                    continue
+
+                if first is None:
+                    if now - begin >= self.first_timeout:
+                        self.end = 'no data'
+                        break
+                elif self.framer.done and not self.framer.error:
+                    if now - last >= self.settle:
+                        self.end = 'framing'
+                        break
+                elif now - last >= self.idle_timeout:
+                    self.end = 'idle'
+                    break
+                time.sleep(poll)
+                poll = min(poll * 2, MAX_POLL)
+        finally:
+            os.close(fd)
+
+        if self.framer.chained and not self.framer.error:
+            # Less than a header after the last image
+            self.framer.error = "data after the last image"
+        return self.stats(begin, first, last)
+
+    def stats(self, begin, first, last):
+        seconds = (last - first) if first is not None else 0
+        return {
+            'bytes': self.size,
+            'images': len(self.framer.images),
+            'containers': self.framer.containers,
+            'end': self.end,
+            'complete': self.framer.done and not self.framer.error,
+            'error': self.framer.error,
+            'wait_s': round((first if first is not None else last) - begin, 3),
+            'receive_s': round(seconds, 3),
+            'total_s': round(time.monotonic() - begin, 3),
+            'mb_per_s': round(self.size / seconds / 1e6, 1) if seconds > 0 else 0,
+            'reads': self.reads,
+            'sha256': self.hasher.hexdigest(),
+        }
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='Receive BFB from the boot FIFO')
+    parser.add_argument('--fifo', required='--version' not in sys.argv, help="Boot FIFO")
+    parser.add_argument('--output', required='--version' not in sys.argv, help="Output file. Data is appended")
+    parser.add_argument('--first_timeout', type=float, help="Seconds to wait for the first data", default=FIRST_TIMEOUT)
+    parser.add_argument('--idle_timeout', type=float, help="Seconds without data that end a stream without BFB framing", default=IDLE_TIMEOUT)
+    parser.add_argument('--settle', type=float, help="Seconds without data after the last BFB image", default=SETTLE_TIMEOUT)
+    parser.add_argument('--sha256', help="Write SHA-256 of the received data to this file")
+    parser.add_argument('--json', action='store_true', help="Print statistics as JSON", default=False)
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    receiver = Receiver(args.fifo, args.output, args.first_timeout, args.idle_timeout, args.settle)
+    try:
+        stats = receiver.run()
+    except OSError as e:
+        log("ERR Failed to receive BFB: {}".format(e))
+        sys.exit(1)
+
+    if args.sha256:
+        with open(args.sha256, 'w') as stream:
+            stream.write(stats['sha256'])
+
+    if args.json:
+        print(json.dumps(stats, indent=4))
+    else:
+        log("Received {} bytes in {}s ({} MB/s), BFBs: {}, BFB images: {}, end: {}, sha256: {}".format(
+            stats['bytes'], stats['receive_s'], stats['mb_per_s'], stats['containers'], stats['images'],
+            stats['end'], stats['sha256']))
+        if stats['error']:
+            log("WARN BFB framing: {}".format(stats['error']))
+        elif stats['bytes'] and not stats['complete']:
+            log("ERR BFB is truncated")
+        if verbose:
+            log("Waited {}s for data, {} reads, total {}s".format(stats['wait_s'], stats['reads'], stats['total_s']))
+
+    sys.exit(0 if stats['bytes'] else 1)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Redfish client for the bf-upgrade BMC flows.
+
+Requests share keep-alive connections and the session token, which is also
+cached in /run between invocations. TaskWatcher follows several BMC tasks
+at once and adapts the polling interval to the PercentComplete progress.
+"""
+
+import os
+import sys
+import argparse
+import base64
+import http.client
+import json
+import shlex
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = "bmc_redfish"
+
+SUPPORTED_OPERATIONS = ['task_id', 'wait']
+TASKS_URI = "/redfish/v1/TaskService/Tasks"
+EROT_URI = "/redfish/v1/Chassis/Bluefield_ERoT"
+token_cache = "/run/bf-upgrade/bmc_token.json"
+
+POOL_SIZE = 4
+REQUEST_TIMEOUT = 30
+TASK_TIMEOUT = 1800
+MIN_INTERVAL = 1.0
+MAX_INTERVAL = 10.0
+# States that end the task even if PercentComplete is not 100
+FINAL_STATES = ['Completed', 'Exception', 'Cancelled', 'Killed']
+
+verbose = False
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+class RedfishError(Exception):
+    pass
+
+
+class RedfishTransportError(RedfishError):
+    """
+    The request did not get a reply, e.g. the BMC reset its connections
+    """
+    pass
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to the BMC
+    """
+    def __init__ (self, host, port, scheme='https', size=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.scheme = scheme
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.connections = 0
+        # Same as 'curl -k'
+        self.context = ssl._create_unverified_context()
+
+    def __connect__(self):
+        self.connections += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Return (status, body). A request on a reused connection is retried
+        once on a new connection if the BMC closed it.
+        """
+        for attempt in range(2):
+            with self.lock:
+                conn = self.idle.pop() if self.idle else None
+                reused = conn is not None
+                if conn is None:
+                    conn = self.__connect__()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError, OSError) as e:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise RedfishTransportError("{} {} failed: {}".format(method, path, e))
+
+            with self.lock:
+                if response.will_close or len(self.idle) >= self.size:
+                    conn.close()
+                else:
+                    self.idle.append(conn)
+            return response.status, data
+
+    def close(self):
+        with self.lock:
+            for conn in self.idle:
+                conn.close()
+            self.idle = []
+
+
+class RedfishClient:
+    """
+    Redfish requests authenticated with a cached session token.
+    Basic authentication is used for the endpoints the flows query with
+    user and password.
+    """
+    def __init__ (self, host, port=443, user="", password="", scheme='https', cache=None, pool_size=POOL_SIZE):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.cache = cache
+        self.pool = ConnectionPool(host, port, scheme, pool_size)
+        self.lock = threading.Lock()
+        self.token = None
+        self.logins = 0
+        self.requests = 0
+        self.__load_token__()
+
+    def __cache_key__(self):
+        return "{}@{}".format(self.user, self.host)
+
+    def __load_token__(self):
+        if not self.cache:
+            return
+        try:
+            with open(self.cache, 'r') as stream:
+                self.token = json.load(stream).get(self.__cache_key__())
+        except (OSError, ValueError):
+            pass
+
+    def __save_token__(self):
+        if not self.cache:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache), mode=0o700, exist_ok=True)
+            tmp = "{}.{}".format(self.cache, os.getpid())
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as stream:
+                json.dump({self.__cache_key__(): self.token}, stream)
+            os.replace(tmp, self.cache)
+        except OSError:
+            pass
+
+    def login(self, stale=None):
+        """
+        Get a new session token. Concurrent callers that saw the same
+        stale token share one login.
+        """
+        with self.lock:
+            if self.token and self.token != stale:
+                return self.token
+            self.logins += 1
+            body = json.dumps({'username': self.user, 'password': self.password})
+            status, data = self.pool.request('POST', '/login', body, {'Content-Type': 'application/json'})
+            try:
+                token = json.loads(data).get('token')
+            except (ValueError, AttributeError):
+                token = None
+            if status >= 400 or not token:
+                raise RedfishError("Failed to get BMC token. Check BMC user/password")
+            self.token = token
+            self.__save_token__()
+            return token
+
+    def request(self, method, path, body=None, auth='token'):
+        """
+        Return (status, decoded JSON or None)
+        """
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if auth == 'basic':
+            credentials = "{}:{}".format(self.user, self.password).encode()
+            headers['Authorization'] = "Basic " + base64.b64encode(credentials).decode()
+
+        for attempt in range(2):
+            if auth == 'token':
+                token = self.token or self.login()
+                headers['X-Auth-Token'] = token
+            self.requests += 1
+            status, data = self.pool.request(method, path, body, headers)
+            if status == 401 and auth == 'token' and attempt == 0:
+                self.login(stale=token)
+                continue
+            break
+
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def get(self, path, auth='token'):
+        return self.request('GET', path, auth=auth)[1]
+
+    def latest_task(self):
+        """
+        Last member of the task collection
+        """
+        tasks = self.get(TASKS_URI) or {}
+        members = tasks.get('Members') or []
+        if not members:
+            return ""
+        return members[-1].get('@odata.id', "")
+
+    def background_copy_status(self):
+        data = self.get(EROT_URI, auth='basic') or {}
+        return data.get('Oem', {}).get('Nvidia', {}).get('BackgroundCopyStatus')
+
+    def close(self):
+        self.pool.close()
+
+
+class TaskState:
+    def __init__ (self, task_id, interval):
+        self.task_id = task_id
+        self.interval = interval
+        self.due = 0
+        self.percent = None
+        self.changed = None
+        self.data = None
+        self.errors = 0
+        self.done = False
+
+
+class TaskWatcher:
+    """
+    Poll BMC tasks until they finish. The next poll of a task is scheduled
+    at a quarter of its estimated remaining time, within
+    [min_interval, max_interval]. Without progress the interval grows.
+    """
+    def __init__ (self, client, timeout=TASK_TIMEOUT, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        self.client = client
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.polls = 0
+
+    def __clamp__(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def __schedule__(self, task, percent, now):
+        if task.percent is None or task.changed is None:
+            task.interval = self.min_interval
+            task.changed = now
+        elif percent > task.percent:
+            rate = (percent - task.percent) / max(now - task.changed, 1e-3)
+            task.interval = self.__clamp__((100 - percent) / rate / 4)
+            task.changed = now
+        else:
+            task.interval = self.__clamp__(task.interval * 1.5)
+        task.percent = percent
+        task.due = now + task.interval
+
+    def __poll__(self, task):
+        """
+        Return (decoded reply, None) or (None, error) when the BMC did not
+        reply or the reply could not be decoded
+        """
+        self.polls += 1
+        try:
+            data = self.client.get(task.task_id)
+        except RedfishTransportError as e:
+            return None, str(e)
+        except RedfishError as e:
+            log("- ERROR: {}".format(e))
+            return {}, None
+        if data is None:
+            return None, "{}: reply is not JSON".format(task.task_id)
+        return data, None
+
+    def __update__(self, task, reply, now, start):
+        data, error = reply
+        if error is not None:
+            # Transient: poll again until the task timeout
+            if now - start > self.timeout:
+                log("- ERROR: BMC task {} timeout: {}".format(task.task_id, error))
+                task.errors += 1
+                task.done = True
+            else:
+                if verbose:
+                    log("{}: {}".format(task.task_id, error))
+                task.interval = self.__clamp__(task.interval * 1.5)
+                task.due = now + task.interval
+            return
+        if data:
+            task.data = data
+        percent = data.get('PercentComplete')
+        state = data.get('TaskState')
+        if percent is None:
+            log("- ERROR: There is no task with task id: {}".format(task.task_id))
+            task.errors += 1
+            task.done = True
+        elif percent == 100:
+            task.done = True
+        elif state == 'Exception':
+            log("- ERROR: BMC task {} exception".format(task.task_id))
+            task.errors += 1
+            task.done = True
+        elif state == 'Cancelled':
+            log("- ERROR: BMC task {} cancelled".format(task.task_id))
+            task.errors += 1
+            task.done = True
+        elif state in FINAL_STATES:
+            task.done = True
+        elif now - start > self.timeout:
+            log("- ERROR: BMC task {} timeout".format(task.task_id))
+            task.errors += 1
+            task.done = True
+        else:
+            self.__schedule__(task, percent, now)
+
+    def watch(self, task_ids):
+        """
+        Wait for all tasks. Return list of TaskState
+        """
+        tasks = [TaskState(task_id, self.min_interval) for task_id in task_ids]
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+            while True:
+                pending = [task for task in tasks if not task.done]
+                if not pending:
+                    break
+                now = time.monotonic()
+                due = [task for task in pending if task.due <= now]
+                if not due:
+                    time.sleep(min(task.due for task in pending) - now)
+                    continue
+                for task, reply in zip(due, executor.map(self.__poll__, due)):
+                    self.__update__(task, reply, time.monotonic(), start)
+                    if verbose and not task.done:
+                        log("{}: {}% next poll in {:.1f}s".format(task.task_id, task.percent, task.interval))
+        return tasks
+
+    def wait_copy(self):
+        """
+        Wait for the ERoT background copy. Return number of errors
+        """
+        status = self.client.background_copy_status()
+        if status is None:
+            return 0
+        if status != "Completed":
+            log("BMC background copy is: {}".format(status))
+        start = time.monotonic()
+        interval = self.min_interval
+        while status != "Completed":
+            if time.monotonic() - start > self.timeout:
+                log("- ERROR: BMC copy task timeout")
+                return 1
+            time.sleep(interval)
+            interval = self.__clamp__(interval * 1.5)
+            status = self.client.background_copy_status()
+        return 0
+
+
+def report(tasks, log_file=None):
+    """
+    Print shell variables of the last task. Failed tasks are written to
+    log_file. Return number of errors, counted as in the shell flows.
+    """
+    errors = 0
+    for task in tasks:
+        errors += task.errors
+        data = task.data or {}
+        if "{}{}".format(data.get('TaskState'), data.get('TaskStatus')) != "CompletedOK":
+            errors += 1
+            if log_file:
+                with open(log_file, 'a') as stream:
+                    stream.write("BMC task failed:\n{}\n".format(json.dumps(data, indent=2)))
+
+    if tasks:
+        data = tasks[-1].data or {}
+        print("task_id={}".format(shlex.quote(tasks[-1].task_id)))
+        print("task_state={}".format(shlex.quote(str(data.get('TaskState', "")))))
+        print("task_status={}".format(shlex.quote(str(data.get('TaskStatus', "")))))
+    return errors
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='BMC Redfish client for bf-upgrade. BMC_USER and BMC_PASSWORD are taken from the environment')
+    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS,
+                        help="task_id: print the last BMC task. wait: wait for the tasks, the last BMC task by default")
+    parser.add_argument('--host', help="BMC address", default=os.environ.get('BMC_IP', "192.168.240.1"))
+    parser.add_argument('--port', type=int, help="BMC port", default=int(os.environ.get('BMC_PORT', 443)))
+    parser.add_argument('--scheme', choices=['https', 'http'], help="Protocol", default='https')
+    parser.add_argument('--task', action='append', help="Task URI. Use multiple times to wait for several tasks")
+    parser.add_argument('--copy', action='store_true', help="Wait for the ERoT background copy first", default=False)
+    parser.add_argument('--timeout', type=int, help="Task timeout in seconds", default=int(os.environ.get('BMC_TASK_TIMEOUT', TASK_TIMEOUT)))
+    parser.add_argument('--min_interval', type=float, help="Minimal polling interval in seconds", default=MIN_INTERVAL)
+    parser.add_argument('--max_interval', type=float, help="Maximal polling interval in seconds", default=MAX_INTERVAL)
+    parser.add_argument('--token_cache', help="Session token cache file. Empty to disable", default=token_cache)
+    parser.add_argument('--log', help="Append failed tasks to this file")
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    client = RedfishClient(args.host, args.port, os.environ.get('BMC_USER', ""), os.environ.get('BMC_PASSWORD', ""),
+                           args.scheme, args.token_cache or None)
+    watcher = TaskWatcher(client, args.timeout, args.min_interval, args.max_interval)
+    errors = 0
+    try:
+        if args.op == 'task_id':
+            print(client.latest_task())
+            sys.exit(0)
+
+        if args.copy:
+            errors += watcher.wait_copy()
+
+        task_ids = args.task or [client.latest_task()]
+        task_ids = [task_id for task_id in task_ids if task_id]
+        if not task_ids:
+            log("No active BMC task")
+            sys.exit(min(errors, 255))
+
+        log("Monitoring {}".format(' '.join(task_ids)))
+        tasks = watcher.watch(task_ids)
+        errors += report(tasks, args.log)
+    except RedfishError as e:
+        log("- ERROR: {}".format(e))
+        errors += 1
+    finally:
+        client.close()
+        if verbose:
+            log("requests={} connections={} logins={} polls={}".format(client.requests, client.pool.connections, client.logins, watcher.polls))
+
+    sys.exit(min(errors, 255))
+
+
+if __name__ == '__main__':
+        main()
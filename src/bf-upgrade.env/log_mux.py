@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Log multiplexer for the installer and upgrade scripts.
+
+Reads log records from a FIFO and writes them to the log file, the serial
+consoles and the rshim log. Every sink has its own bounded queue and
+thread. The log file gets every record. Consoles are rate limited. When a
+console queue is full, its records are dropped and counted, and the
+console gets the number of dropped lines once it catches up.
+
+Records, one per line:
+  L <text>    log file and consoles
+  F <text>    log file only
+  R <text>    rshim log
+  B+ <label>  start of a bulk block, B <text> lines, B- <label> end.
+              The log file gets every line. The consoles get the last
+              --bulk_lines lines of the block.
+  S <path>    create <path> after the log file is written and closed
+  Q           write the queued records and exit
+"""
+
+import os
+import sys
+import argparse
+import collections
+import json
+import queue
+import subprocess
+import threading
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+FILE_QUEUE = 65536
+CONSOLE_QUEUE = 512
+RSHIM_QUEUE = 1024
+# 115200 baud, 8N1
+CONSOLE_RATE = 11520
+CONSOLE_BURST = 4096
+BULK_LINES = 10
+DRAIN_TIMEOUT = 5
+READ_SIZE = 1 << 16
+
+verbose = False
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+class Sink:
+    """
+    Bounded queue served by a thread. put() drops the record when the
+    queue is full unless the sink blocks.
+    """
+    def __init__ (self, name, capacity, blocking=False):
+        self.name = name
+        self.queue = queue.Queue(capacity)
+        self.blocking = blocking
+        self.stop = threading.Event()
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.reported = 0
+        self.thread = threading.Thread(target=self.__loop__, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def put(self, item):
+        self.received += 1
+        if self.blocking:
+            self.queue.put(item)
+            return
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def __loop__(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.dropped > self.reported:
+                    self.report_drops()
+                if self.stop.is_set():
+                    break
+                continue
+            if self.dropped > self.reported and self.queue.qsize() < self.queue.maxsize // 2:
+                self.report_drops()
+            try:
+                self.write(item)
+            except OSError as e:
+                if verbose:
+                    log("{}: {}".format(self.name, e))
+                self.dropped += 1
+        self.close()
+
+    def report_drops(self):
+        self.reported = self.dropped
+
+    def write(self, item):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {'sink': self.name, 'received': self.received, 'written': self.written, 'dropped': self.dropped}
+
+
+class FileSink(Sink):
+    """
+    Gets every record. The file is reopened after a sync, so the scripts
+    may edit it in place.
+    """
+    def __init__ (self, path):
+        Sink.__init__(self, 'file', FILE_QUEUE, blocking=True)
+        self.path = path
+        self.stream = None
+
+    def write(self, item):
+        kind, data = item
+        lines = []
+        # Records that are already queued are written with one call
+        while kind != 'S':
+            lines.append(data + b'\n')
+            if len(lines) >= 256:
+                break
+            try:
+                kind, data = self.queue.get_nowait()
+            except queue.Empty:
+                break
+        if lines:
+            if self.stream is None:
+                self.stream = open(self.path, 'ab')
+            self.stream.write(b''.join(lines))
+            self.stream.flush()
+            self.written += len(lines)
+        if kind == 'S':
+            self.close()
+            with open(data, 'w'):
+                pass
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class ConsoleSink(Sink):
+    """
+    Serial console written at most --console_rate bytes per second
+    """
+    def __init__ (self, device, rate, burst, logfile):
+        Sink.__init__(self, device, CONSOLE_QUEUE)
+        self.device = device
+        self.rate = rate
+        self.burst = burst
+        self.logfile = logfile
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.fd = None
+
+    def __throttle__(self, size):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < size:
+            time.sleep((size - self.tokens) / self.rate)
+            self.last = time.monotonic()
+            self.tokens = 0
+        else:
+            self.tokens -= size
+
+    def __output__(self, data):
+        if self.fd is None:
+            self.fd = os.open(self.device, os.O_WRONLY | os.O_NOCTTY)
+        self.__throttle__(len(data))
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+
+    def write(self, item):
+        self.__output__(item + b'\n')
+        self.written += 1
+
+    def report_drops(self):
+        count = self.dropped - self.reported
+        self.reported = self.dropped
+        try:
+            self.__output__("[log_mux] {} lines not shown, see {}\n".format(count, self.logfile).encode())
+        except OSError:
+            pass
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class RshimSink(Sink):
+    """
+    rshim log written with bfrshlog
+    """
+    def __init__ (self, command):
+        Sink.__init__(self, 'rshim', RSHIM_QUEUE)
+        self.command = command
+
+    def write(self, item):
+        subprocess.run([self.command, item.decode('utf-8', 'replace')],
+                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.written += 1
+
+    def report_drops(self):
+        count = self.dropped - self.reported
+        self.reported = self.dropped
+        try:
+            self.write("WARN {} rshim log messages dropped".format(count).encode())
+        except OSError:
+            pass
+
+
+class LogMux:
+    def __init__ (self, fifo, logfile, consoles=[], rshimlog=None,
+                  rate=CONSOLE_RATE, burst=CONSOLE_BURST, bulk_lines=BULK_LINES):
+        self.fifo = fifo
+        self.file = FileSink(logfile)
+        self.consoles = [ConsoleSink(device, rate, burst, logfile) for device in consoles if os.path.exists(device)]
+        self.rshim = RshimSink(rshimlog) if rshimlog else None
+        self.bulk_lines = bulk_lines
+        self.bulk = None
+        self.bulk_count = 0
+        self.records = 0
+
+    def sinks(self):
+        return [self.file] + self.consoles + ([self.rshim] if self.rshim else [])
+
+    def __console__(self, data):
+        for console in self.consoles:
+            console.put(data)
+
+    def __record__(self, line):
+        """
+        Dispatch one record. Return False on Q.
+        """
+        kind, _, data = line.partition(b' ')
+        self.records += 1
+        if kind == b'L':
+            self.file.put(('L', data))
+            self.__console__(data)
+        elif kind == b'F':
+            self.file.put(('F', data))
+        elif kind == b'R':
+            if self.rshim:
+                self.rshim.put(data)
+        elif kind == b'B':
+            self.file.put(('B', data))
+            if self.bulk is not None:
+                self.bulk.append(data)
+                self.bulk_count += 1
+        elif kind == b'B+':
+            self.bulk = collections.deque(maxlen=self.bulk_lines)
+            self.bulk_count = 0
+        elif kind == b'B-':
+            if self.bulk is not None:
+                shown = len(self.bulk)
+                self.__console__("[log_mux] {}: {} lines{}, see {}".format(
+                    data.decode('utf-8', 'replace'), self.bulk_count,
+                    ", last {}:".format(shown) if shown < self.bulk_count else ":",
+                    self.file.path).encode())
+                for text in self.bulk:
+                    self.__console__(text)
+            self.bulk = None
+        elif kind == b'S':
+            self.file.put(('S', data.decode()))
+        elif kind == b'Q':
+            return False
+        else:
+            # Lines without a record type are logged as is
+            self.file.put(('L', line))
+            self.__console__(line)
+        return True
+
+    def run(self, drain_timeout=DRAIN_TIMEOUT):
+        for sink in self.sinks():
+            sink.start()
+        fd = os.open(self.fifo, os.O_RDONLY)
+        pending = b''
+        running = True
+        try:
+            while running:
+                data = os.read(fd, READ_SIZE)
+                if not data:
+                    break
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    if not self.__record__(line):
+                        running = False
+                        break
+            if pending and running:
+                self.__record__(pending)
+        finally:
+            os.close(fd)
+
+        # The log file is always completed. Slow consoles get drain_timeout seconds.
+        for sink in self.sinks():
+            sink.stop.set()
+        self.file.thread.join()
+        deadline = time.monotonic() + drain_timeout
+        for sink in self.sinks()[1:]:
+            sink.thread.join(max(0, deadline - time.monotonic()))
+        return self.stats()
+
+    def stats(self):
+        return {'records': self.records, 'sinks': [sink.stats() for sink in self.sinks()]}
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='Log multiplexer for the installer and upgrade scripts')
+    parser.add_argument('--fifo', required='--version' not in sys.argv, help="FIFO with log records")
+    parser.add_argument('--log', required='--version' not in sys.argv, help="Log file")
+    parser.add_argument('--console', action='append', help="Serial console. May be repeated", default=[])
+    parser.add_argument('--rshimlog', help="bfrshlog command")
+    parser.add_argument('--console_rate', type=int, help="Console rate limit in bytes per second. 0 - unlimited", default=CONSOLE_RATE)
+    parser.add_argument('--console_burst', type=int, help="Console burst in bytes", default=CONSOLE_BURST)
+    parser.add_argument('--bulk_lines', type=int, help="Lines of a bulk block shown on the consoles", default=BULK_LINES)
+    parser.add_argument('--drain_timeout', type=float, help="Seconds to write the queued console records on exit", default=DRAIN_TIMEOUT)
+    parser.add_argument('--stats', help="Write statistics as JSON to this file on exit")
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    mux = LogMux(args.fifo, args.log, args.console, args.rshimlog,
+                 args.console_rate, args.console_burst, args.bulk_lines)
+    try:
+        stats = mux.run(args.drain_timeout)
+    except OSError as e:
+        log("ERR log_mux: {}".format(e))
+        sys.exit(1)
+
+    if args.stats:
+        with open(args.stats, 'w') as stream:
+            json.dump(stats, stream, indent=4)
+    if verbose:
+        log(json.dumps(stats))
+
+    sys.stdout.flush()
+    # Console writes that are still blocked do not delay the exit
+    os._exit(0)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+mlxconfig snapshots for the installer and upgrade scripts.
+
+mlxconfig -e q runs once per device, in parallel for all devices, and
+every parameter is parsed into its default, current and next boot value.
+Later lookups and dumps are served from the snapshot, which is kept in
+/run/bf-upgrade/mlxconfig for the current boot. A set through this tool
+invalidates the snapshots of all devices, since the PCI functions and the
+mst device share the configuration.
+"""
+
+import os
+import sys
+import argparse
+import concurrent.futures
+import json
+import re
+import shlex
+import subprocess
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+SUPPORTED_OPERATIONS = ['snapshot', 'get', 'dump', 'set', 'invalidate']
+
+cache_dir = "/run/bf-upgrade/mlxconfig"
+COLUMNS = ['default', 'current', 'next']
+QUERY_TIMEOUT = 120
+
+PARAMETER = re.compile(r'^([A-Z][A-Z0-9_]*(?:\[[0-9.]+\])?)$')
+
+verbose = False
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def parse(output):
+    """
+    Parse mlxconfig -e q output into {name: {'default', 'current', 'next', 'modified'}}.
+    Without -e only 'next' is set.
+    """
+    params = {}
+    configurations = False
+    for line in output.splitlines():
+        if line.startswith('Configurations:'):
+            configurations = True
+            continue
+        if not configurations:
+            continue
+        fields = line.split()
+        modified = bool(fields) and fields[0] == '*'
+        if modified:
+            fields = fields[1:]
+        if len(fields) < 2 or not PARAMETER.match(fields[0]):
+            continue
+        values = fields[1:4]
+        if len(values) == 3:
+            entry = dict(zip(COLUMNS, values))
+        else:
+            entry = {'default': "", 'current': "", 'next': values[0]}
+        entry['modified'] = modified
+        params[fields[0]] = entry
+    return params
+
+
+class MlxconfigSnapshot:
+    def __init__ (self, cache=cache_dir, tool=None):
+        self.cache = cache
+        self.tool = shlex.split(tool) if tool else [self.default_tool()]
+        self.queries = []
+
+    @staticmethod
+    def default_tool():
+        if os.path.exists('/usr/bin/mlxconfig'):
+            return 'mlxconfig'
+        return 'mstconfig'
+
+    @staticmethod
+    def boot_id():
+        try:
+            with open('/proc/sys/kernel/random/boot_id', 'r') as stream:
+                return stream.read().strip()
+        except OSError:
+            return ""
+
+    def __path__(self, device):
+        return os.path.join(self.cache, device.strip('/').replace('/', '_') + '.json')
+
+    def __run__(self, args):
+        cmd = self.tool + args
+        if verbose:
+            log("Running: {}".format(' '.join(cmd)))
+        try:
+            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  universal_newlines=True, timeout=QUERY_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return 1, "{} failed: {}\n".format(cmd[0], e)
+        return proc.returncode, proc.stdout
+
+    def load(self, device):
+        """
+        Return the snapshot of this boot or None
+        """
+        try:
+            with open(self.__path__(device), 'r') as stream:
+                snapshot = json.load(stream)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get('boot_id') != self.boot_id():
+            return None
+        return snapshot
+
+    def save(self, snapshot):
+        path = self.__path__(snapshot['device'])
+        try:
+            os.makedirs(self.cache, exist_ok=True)
+            tmp = "{}.{}".format(path, os.getpid())
+            with open(tmp, 'w') as stream:
+                json.dump(snapshot, stream, indent=4)
+            os.replace(tmp, path)
+        except OSError as e:
+            if verbose:
+                log("Failed to save {}: {}".format(path, e))
+
+    def query(self, device):
+        """
+        Run mlxconfig -e q. Failed queries are not cached.
+        """
+        self.queries.append(device)
+        rc, output = self.__run__(['-d', device, '-e', 'q'])
+        snapshot = {
+            'boot_id': self.boot_id(),
+            'device': device,
+            'rc': rc,
+            'output': output,
+            'params': parse(output),
+        }
+        if rc == 0:
+            self.save(snapshot)
+        return snapshot
+
+    def get(self, devices, refresh=False):
+        """
+        Return {device: snapshot}. Missing snapshots are queried in parallel.
+        """
+        snapshots = {}
+        missing = []
+        for device in devices:
+            snapshot = None if refresh else self.load(device)
+            if snapshot is None:
+                missing.append(device)
+            else:
+                snapshots[device] = snapshot
+        if missing:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                for snapshot in executor.map(self.query, missing):
+                    snapshots[snapshot['device']] = snapshot
+        return snapshots
+
+    def invalidate(self, devices=None):
+        if devices:
+            paths = [self.__path__(device) for device in devices]
+        else:
+            try:
+                paths = [os.path.join(self.cache, name) for name in os.listdir(self.cache) if name.endswith('.json')]
+            except OSError:
+                paths = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def set(self, device, settings):
+        rc, output = self.__run__(['-y', '-d', device, 'set'] + settings)
+        self.invalidate()
+        return rc, output
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='mlxconfig snapshots')
+    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS,
+                        help="snapshot: query the devices that have no snapshot. get: print parameter values. "
+                             "dump: print the mlxconfig -e q output. set: set parameters and invalidate the snapshots. "
+                             "invalidate: remove the snapshots")
+    parser.add_argument('-d', '--device', action='append', help="Device. May be repeated", default=[])
+    parser.add_argument('--column', choices=COLUMNS, help="Value printed by get", default='current')
+    parser.add_argument('--tool', help="mlxconfig command, e.g. 'chroot /mnt mlxconfig'", default=None)
+    parser.add_argument('--refresh', action='store_true', help="Ignore the snapshots", default=False)
+    parser.add_argument('--cache', help="Cache directory", default=os.environ.get('MLXCONFIG_CACHE', cache_dir))
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+    parser.add_argument('params', nargs='*', help="get: parameter names. set: NAME=VALUE")
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    mlxconfig = MlxconfigSnapshot(args.cache, args.tool)
+
+    if args.op == 'invalidate':
+        mlxconfig.invalidate(args.device)
+        sys.exit(0)
+
+    if not args.device:
+        log("ERR: Device is required")
+        sys.exit(1)
+
+    if args.op == 'set':
+        rc = 0
+        for device in args.device:
+            status, output = mlxconfig.set(device, args.params)
+            sys.stdout.write(output)
+            rc = rc or status
+        sys.exit(rc)
+
+    snapshots = mlxconfig.get(args.device, args.refresh)
+    if verbose:
+        log("Queried: {}".format(', '.join(mlxconfig.queries) if mlxconfig.queries else "none, cached"))
+
+    rc = 0
+    for device in args.device:
+        snapshot = snapshots[device]
+        rc = rc or snapshot['rc']
+        if args.op == 'dump':
+            sys.stdout.write(snapshot['output'])
+        elif args.op == 'get':
+            # Same layout as mlxconfig q: "NAME value", one line per parameter
+            for name in args.params:
+                if name in snapshot['params']:
+                    print("{} {}".format(name, snapshot['params'][name][args.column]))
+                else:
+                    rc = rc or 1
+
+    sys.exit(rc)
+
+
+if __name__ == '__main__':
+        main()
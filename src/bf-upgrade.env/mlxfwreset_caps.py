@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+NIC firmware reset capabilities for bf-upgrade fw_reset.
+
+Runs mlxfwreset q once and parses every reset level, type and sync
+option with its support state. The wait operation repeats the query on a
+backoff schedule until the driver is the owner of the reset sync, and
+returns as soon as it is. The result is printed as shell variables:
+  fwreset_live_patch    live-Patch reset level is supported
+  fwreset_pci_reset     Driver restart and PCI reset level is supported
+  fwreset_driver_owner  Driver is the owner reset sync is supported
+  fwreset_query_s       duration of the last query
+  fwreset_wait_s        time until the driver became the owner
+  fwreset_polls         number of queries
+"""
+
+import os
+import sys
+import argparse
+import glob
+import json
+import re
+import shlex
+import subprocess
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+SUPPORTED_OPERATIONS = ['query', 'wait']
+
+MST_DEVICE = "/dev/mst/mt*_pciconf0"
+QUERY_TIMEOUT = 60
+# bf-upgrade default
+WAIT_TIMEOUT = 60
+FIRST_INTERVAL = 0.1
+MAX_INTERVAL = 1.0
+
+# Capabilities checked by fw_reset, as grep matches them
+CAPABILITIES = {
+    'live_patch': 'live-Patch',
+    'pci_reset': 'Driver restart and PCI reset',
+    'driver_owner': 'Driver is the owner',
+}
+
+ENTRY = re.compile(r'^\s*(\d+)\s*:\s*(.*?)\s+-(Supported|Not Supported)\b(.*)$')
+
+verbose = False
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def parse(output):
+    """
+    Parse mlxfwreset q output into {section: [entry]}. Entries are
+    {'index', 'description', 'supported', 'default'}.
+    """
+    sections = {}
+    section = None
+    for line in output.splitlines():
+        match = ENTRY.match(line)
+        if match:
+            sections.setdefault(section or '', []).append({
+                'index': int(match.group(1)),
+                'description': match.group(2).strip(),
+                'supported': match.group(3) == 'Supported',
+                'default': '(default)' in match.group(4),
+            })
+        elif line.strip().endswith(':') and not line.startswith(' '):
+            # "Reset-levels:", "Reset-sync (relevant only for reset-level 3):"
+            section = line.strip()[:-1].split(' (')[0]
+    return sections
+
+
+def capabilities(sections):
+    """
+    Return {name: supported} for CAPABILITIES
+    """
+    result = dict((name, False) for name in CAPABILITIES)
+    for entries in sections.values():
+        for entry in entries:
+            for name, text in CAPABILITIES.items():
+                if text in entry['description'] and entry['supported']:
+                    result[name] = True
+    return result
+
+
+class ResetQuery:
+    def __init__ (self, device, mlxfwreset="mlxfwreset"):
+        self.device = device
+        self.command = shlex.split(mlxfwreset)
+        self.polls = 0
+
+    def query(self):
+        """
+        Run mlxfwreset q. Return (rc, sections, seconds).
+        """
+        start = time.monotonic()
+        self.polls += 1
+        try:
+            proc = subprocess.run(self.command + ['-d', self.device, 'q'], stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT, universal_newlines=True, timeout=QUERY_TIMEOUT)
+            rc = proc.returncode
+            output = proc.stdout
+        except (OSError, subprocess.TimeoutExpired) as e:
+            rc = 1
+            output = ""
+            if verbose:
+                log("{} failed: {}".format(self.command[0], e))
+        if verbose:
+            log(output)
+        return rc, parse(output), time.monotonic() - start
+
+    def wait_driver_owner(self, timeout, first=FIRST_INTERVAL, maximum=MAX_INTERVAL):
+        """
+        Query until the driver is the owner or timeout. Return rc, sections
+        and duration of the last query and the total wait time.
+        """
+        start = time.monotonic()
+        interval = first
+        while True:
+            rc, sections, seconds = self.query()
+            elapsed = time.monotonic() - start
+            if capabilities(sections)['driver_owner'] or elapsed >= timeout:
+                return rc, sections, seconds, elapsed
+            time.sleep(min(interval, max(0, timeout - elapsed)))
+            interval = min(interval * 2, maximum)
+
+
+def result(rc, sections, query_s, wait_s, polls):
+    caps = capabilities(sections)
+    return {
+        'rc': rc,
+        'live_patch': int(caps['live_patch']),
+        'pci_reset': int(caps['pci_reset']),
+        'driver_owner': int(caps['driver_owner']),
+        'query_s': round(query_s, 3),
+        'wait_s': round(wait_s, 3),
+        'polls': polls,
+        'sections': sections,
+    }
+
+
+def env_format(info):
+    lines = []
+    for name in ['rc', 'live_patch', 'pci_reset', 'driver_owner', 'query_s', 'wait_s', 'polls']:
+        lines.append("fwreset_{}={}".format(name, info[name]))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='NIC firmware reset capabilities')
+    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS,
+                        help="query: query once. wait: query until the driver is the owner of the reset sync")
+    parser.add_argument('-d', '--device', help="mst device", default=None)
+    parser.add_argument('--mlxfwreset', help="mlxfwreset command, e.g. 'chroot /mnt mlxfwreset'", default="mlxfwreset")
+    parser.add_argument('--timeout', type=float, help="Seconds to wait for the driver ownership", default=WAIT_TIMEOUT)
+    parser.add_argument('--max_interval', type=float, help="Longest pause between the queries", default=MAX_INTERVAL)
+    parser.add_argument('--json', action='store_true', help="Print the result as JSON", default=False)
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    device = args.device
+    if not device:
+        devices = sorted(glob.glob(MST_DEVICE))
+        device = devices[0] if devices else MST_DEVICE
+
+    reset = ResetQuery(device, args.mlxfwreset)
+    if args.op == 'query':
+        rc, sections, seconds = reset.query()
+        info = result(rc, sections, seconds, 0, reset.polls)
+    else:
+        rc, sections, seconds, waited = reset.wait_driver_owner(args.timeout, FIRST_INTERVAL, args.max_interval)
+        info = result(rc, sections, seconds, waited, reset.polls)
+
+    if args.json:
+        print(json.dumps(info, indent=4))
+    else:
+        sys.stdout.write(env_format(info))
+
+    sys.exit(info['rc'])
+
+
+if __name__ == '__main__':
+        main()
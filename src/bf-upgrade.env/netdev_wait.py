@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Wait for network interfaces by their names.
+
+Subscribes to the rtnetlink link events and checks /sys/class/net on every
+event, so it returns as soon as the last interface is created or renamed
+by udev. Without netlink it polls every --poll seconds. The latency of
+every interface is logged: present at start, or appeared after N seconds.
+
+The names are given with --ifname or read from an sfc-hbn deferred install
+env file: the bridge ports BR_HBN_UPLINKS, BR_HBN_REPS and BR_HBN_SFS,
+comma separated. A BR_HBN_* variable that is not in the file defaults to
+HBN_UPLINKS, HBN_REPS or HBN_DPU_SFS, an empty one has no interfaces. The
+timeout is HBN_IFNAME_WAIT_TIMEOUT. With --set_remaining the time left of
+the timeout is written back to HBN_IFNAME_WAIT_TIMEOUT, so the install
+that runs next waits at most the original timeout in total.
+"""
+
+import os
+import sys
+import argparse
+import math
+import select
+import socket
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+SUPPORTED_OPERATIONS = ['wait', 'check']
+
+SYS_CLASS_NET = "/sys/class/net"
+RTMGRP_LINK = 0x1
+# Bridge ports of the install and the variables they default to
+ENV_INTERFACES = [('BR_HBN_UPLINKS', 'HBN_UPLINKS'), ('BR_HBN_REPS', 'HBN_REPS'), ('BR_HBN_SFS', 'HBN_DPU_SFS')]
+ENV_TIMEOUT = 'HBN_IFNAME_WAIT_TIMEOUT'
+# sfc-hbn defaults
+HBN_DEFAULTS = {
+    'HBN_UPLINKS': "p0,p1",
+    'HBN_REPS': "c1pf0,c1pf1",
+    'HBN_DPU_SFS': "pf0dpu1,pf0dpu3",
+    'HBN_IFNAME_WAIT_TIMEOUT': "300",
+}
+POLL_INTERVAL = 0.5
+
+verbose = False
+
+
+def log(msg):
+    print("{}: {}".format(prog, msg), flush=True)
+
+
+def read_env(path):
+    """
+    Parse KEY="VALUE" lines
+    """
+    env = {}
+    with open(path, 'r') as stream:
+        for line in stream:
+            key, sep, value = line.strip().partition('=')
+            if sep and not key.startswith('#'):
+                env[key.strip()] = value.strip().strip('"\'')
+    return env
+
+
+def write_env_value(path, key, value):
+    """
+    Set KEY="VALUE" in the env file, replacing it atomically
+    """
+    with open(path, 'r') as stream:
+        lines = stream.readlines()
+    line = '{}="{}"\n'.format(key, value)
+    for index, old in enumerate(lines):
+        if old.strip().partition('=')[0].strip() == key:
+            lines[index] = line
+            break
+    else:
+        lines.append(line)
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, 'w') as stream:
+        stream.writelines(lines)
+    os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+    os.replace(tmp, path)
+
+
+def split_names(value):
+    return [name for name in value.replace(',', ' ').split() if name]
+
+
+def uptime():
+    try:
+        with open('/proc/uptime', 'r') as stream:
+            return float(stream.read().split()[0])
+    except (OSError, ValueError):
+        return 0.0
+
+
+class NetdevWaiter:
+    def __init__ (self, names, sysfs=SYS_CLASS_NET, poll=POLL_INTERVAL):
+        self.names = list(dict.fromkeys(names))
+        self.sysfs = sysfs
+        self.poll = poll
+        self.appeared = {}
+        self.events = 0
+        self.sock = None
+
+    def __subscribe__(self):
+        try:
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            self.sock.bind((0, RTMGRP_LINK))
+            self.sock.setblocking(False)
+        except OSError as e:
+            if verbose:
+                log("netlink is not available, polling every {}s: {}".format(self.poll, e))
+            self.sock = None
+
+    def __drain__(self):
+        while True:
+            try:
+                if not self.sock.recv(65536):
+                    return
+                self.events += 1
+            except BlockingIOError:
+                return
+            except OSError:
+                # ENOBUFS: events were lost, /sys/class/net is read anyway
+                return
+
+    def missing(self):
+        return [name for name in self.names if name not in self.appeared]
+
+    def scan(self, start, initial=False):
+        try:
+            present = set(os.listdir(self.sysfs))
+        except OSError:
+            present = set()
+        now = time.monotonic()
+        for name in self.missing():
+            if name in present:
+                self.appeared[name] = 0 if initial else now - start
+                if initial:
+                    log("{} present".format(name))
+                else:
+                    log("{} appeared after {:.3f}s (uptime {:.1f}s)".format(name, self.appeared[name], uptime()))
+        return not self.missing()
+
+    def wait(self, timeout):
+        """
+        Return True when all interfaces exist, False on timeout
+        """
+        start = time.monotonic()
+        # Subscribe before the first scan, so no link event is missed
+        self.__subscribe__()
+        try:
+            if self.scan(start, initial=True):
+                return True
+            deadline = start + timeout
+            while True:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                if self.sock is not None:
+                    readable, _, _ = select.select([self.sock], [], [], left)
+                    if readable:
+                        self.__drain__()
+                else:
+                    time.sleep(min(self.poll, left))
+                if self.scan(start):
+                    return True
+        finally:
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='Wait for network interfaces')
+    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS,
+                        help="wait: wait until all interfaces exist. check: report the missing interfaces")
+    parser.add_argument('--ifname', action='append', help="Interface name, may be comma separated and repeated", default=[])
+    parser.add_argument('--env', help="sfc-hbn deferred install env file with the interface names and timeout")
+    parser.add_argument('--timeout', type=float, help="Seconds to wait. Default: HBN_IFNAME_WAIT_TIMEOUT or 300")
+    parser.add_argument('--set_remaining', action='store_true', default=False,
+                        help="Write the rest of the timeout to HBN_IFNAME_WAIT_TIMEOUT of the --env file")
+    parser.add_argument('--poll', type=float, help="Poll interval without netlink", default=POLL_INTERVAL)
+    parser.add_argument('--sysfs', help="Directory of the network interfaces", default=SYS_CLASS_NET)
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    names = []
+    for value in args.ifname:
+        names += split_names(value)
+    timeout = args.timeout
+    if args.env:
+        try:
+            staged = read_env(args.env)
+        except OSError as e:
+            log("ERR {}".format(e))
+            sys.exit(1)
+        env = dict(HBN_DEFAULTS)
+        env.update((key, value) for key, value in staged.items() if value)
+        for key, default in ENV_INTERFACES:
+            names += split_names(staged[key] if key in staged else env[default])
+        if timeout is None:
+            try:
+                timeout = float(env[ENV_TIMEOUT])
+            except ValueError:
+                timeout = float(HBN_DEFAULTS[ENV_TIMEOUT])
+    if timeout is None:
+        timeout = float(HBN_DEFAULTS[ENV_TIMEOUT])
+    if not names:
+        if args.env:
+            log("No interfaces to wait for in {}".format(args.env))
+            sys.exit(0)
+        log("ERR No interfaces to wait for")
+        sys.exit(1)
+
+    waiter = NetdevWaiter(names, args.sysfs, args.poll)
+    start = time.monotonic()
+    if args.op == 'check':
+        done = waiter.scan(start, initial=True)
+    else:
+        done = waiter.wait(timeout)
+    elapsed = time.monotonic() - start
+
+    if args.set_remaining and args.env and args.op == 'wait':
+        # At least one check by the install
+        remaining = max(1, int(math.ceil(timeout - elapsed)))
+        try:
+            write_env_value(args.env, ENV_TIMEOUT, remaining)
+            log("{}={}".format(ENV_TIMEOUT, remaining))
+        except OSError as e:
+            log("ERR Failed to update {}: {}".format(args.env, e))
+
+    if done:
+        log("All {} interfaces are present after {:.3f}s, {} link events".format(len(waiter.names), elapsed, waiter.events))
+        sys.exit(0)
+    log("Missing after {:.3f}s: {}".format(elapsed, ' '.join(waiter.missing())))
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+BlueField platform identity probe for the installer and upgrade scripts.
+
+PCI IDs are read from /sys/bus/pci/devices and the SecureBoot state from
+efivars. flint and mokutil run at most once per boot. The result is
+cached in /run/bf-upgrade as a sourceable env file and as JSON:
+  dpu_gen          bf1, bf2, bf3 or bf4
+  cx_pcidev        first BlueField PCI function
+  cx_dev_id        its PCI device ID, decimal
+  pciids           all BlueField PCI functions
+  mst_dev          /dev/mst/mt*_pciconf0
+  is_SecureBoot    0 or 1
+  dpu_part_number  and PSID from flint q full
+The env file does not override variables that are already set.
+"""
+
+import os
+import sys
+import argparse
+import glob
+import json
+import shlex
+import subprocess
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+SUPPORTED_OPERATIONS = ['env', 'json', 'refresh']
+
+cache_dir = "/run/bf-upgrade"
+MELLANOX_VENDOR = 0x15b3
+# In the order the scripts test them
+GENERATIONS = [(0xa2d2, 'bf1'), (0xa2d6, 'bf2'), (0xa2dc, 'bf3'), (0xa2df, 'bf4')]
+# BlueField-1 functions are not used by the scripts
+CX_DEVICES = [0xa2d6, 0xa2dc, 0xa2df]
+SECURE_BOOT_VAR = "SecureBoot-8be4df61-93ca-11d2-aa0d-00e098032b8c"
+TOOL_TIMEOUT = 60
+
+ENV_VARIABLES = ['dpu_gen', 'cx_pcidev', 'cx_dev_id', 'pciids', 'mst_dev',
+                 'is_SecureBoot', 'dpu_part_number', 'PSID']
+
+verbose = False
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+class PlatformProbe:
+    def __init__ (self, sysroot="/", cache=cache_dir):
+        self.sysroot = sysroot
+        self.cache = cache
+        self.env_file = os.path.join(cache, "platform.env")
+        self.json_file = os.path.join(cache, "platform.json")
+        self.tools = []
+
+    def __path__(self, path):
+        return os.path.join(self.sysroot, path.lstrip('/'))
+
+    def __read__(self, path):
+        try:
+            with open(self.__path__(path), 'r') as stream:
+                return stream.read().strip()
+        except OSError:
+            return ""
+
+    def __run__(self, cmd):
+        """
+        Run a tool. Return its output or "" if it fails to start.
+        """
+        self.tools.append(' '.join(cmd))
+        if verbose:
+            log("Running: {}".format(' '.join(cmd)))
+        try:
+            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  universal_newlines=True, timeout=TOOL_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            if verbose:
+                log("{} failed: {}".format(cmd[0], e))
+            return ""
+        return proc.stdout
+
+    def boot_id(self):
+        return self.__read__('/proc/sys/kernel/random/boot_id')
+
+    def pci_devices(self):
+        """
+        Return list of (address, device id) of Mellanox PCI functions sorted by address
+        """
+        devices = []
+        for path in sorted(glob.glob(self.__path__('/sys/bus/pci/devices/*'))):
+            try:
+                vendor = int(self.__read__(os.path.join('/sys/bus/pci/devices', os.path.basename(path), 'vendor')), 16)
+                device = int(self.__read__(os.path.join('/sys/bus/pci/devices', os.path.basename(path), 'device')), 16)
+            except ValueError:
+                continue
+            if vendor == MELLANOX_VENDOR:
+                devices.append((os.path.basename(path), device))
+        return devices
+
+    def mst_devices(self):
+        return sorted(os.path.join('/dev/mst', os.path.basename(path))
+                      for path in glob.glob(self.__path__('/dev/mst/mt*_pciconf0')))
+
+    def secure_boot(self):
+        """
+        SecureBoot state from efivars. mokutil is used when the variable is not readable.
+        """
+        try:
+            with open(self.__path__(os.path.join('/sys/firmware/efi/efivars', SECURE_BOOT_VAR)), 'rb') as stream:
+                data = stream.read()
+            if len(data) >= 5:
+                return 1 if data[4] == 1 else 0
+        except OSError:
+            pass
+        return 1 if "SecureBoot enabled" in self.__run__(['mokutil', '--sb-state']) else 0
+
+    def flint(self):
+        if os.path.exists(self.__path__('/usr/bin/flint')):
+            return 'flint'
+        return 'mstflint'
+
+    def __query__(self, tool, device):
+        """
+        Return (part number, PSID) from flint q full
+        """
+        part_number = ""
+        psid = ""
+        for line in self.__run__([tool, '-d', device, 'q', 'full']).splitlines():
+            if line.startswith('Part Number:') and line.split():
+                part_number = line.split()[-1]
+            elif line.startswith('PSID:') and line.split():
+                psid = line.split()[-1]
+        return part_number, psid
+
+    def __mst_dev__(self):
+        """
+        Return the mst device. Start mst if there is none.
+        """
+        devices = self.mst_devices()
+        if not devices:
+            self.__run__(['mst', 'start'])
+            devices = self.mst_devices()
+        return devices[0] if devices else ""
+
+    def probe(self):
+        devices = self.pci_devices()
+        ids = set(device for address, device in devices)
+        dpu_gen = ""
+        for device, name in GENERATIONS:
+            if device in ids:
+                dpu_gen = name
+                break
+        pciids = [address for address, device in devices if device in CX_DEVICES]
+        cx_pcidev = pciids[0] if pciids else ""
+        cx_dev_id = dict(devices).get(cx_pcidev, "")
+
+        is_secure_boot = self.secure_boot()
+        mst_devices = self.mst_devices()
+        mst_dev = mst_devices[0] if mst_devices else ""
+        part_number = ""
+        psid = ""
+        if cx_pcidev:
+            # SecureBoot blocks mstflint access through the PCI function
+            if is_secure_boot:
+                mst_dev = self.__mst_dev__()
+                if mst_dev:
+                    part_number, psid = self.__query__('flint', mst_dev)
+            else:
+                part_number, psid = self.__query__(self.flint(), cx_pcidev)
+                if not part_number:
+                    mst_dev = self.__mst_dev__()
+                    if mst_dev:
+                        part_number, psid = self.__query__(self.flint(), mst_dev)
+
+        return {
+            'boot_id': self.boot_id(),
+            'dpu_gen': dpu_gen,
+            'cx_pcidev': cx_pcidev,
+            'cx_dev_id': cx_dev_id,
+            'pciids': ' '.join(pciids),
+            'mst_dev': mst_dev,
+            'is_SecureBoot': is_secure_boot,
+            'dpu_part_number': part_number,
+            'PSID': psid,
+            'tools': self.tools,
+        }
+
+    def load(self):
+        """
+        Return the cached result of this boot or None
+        """
+        try:
+            with open(self.json_file, 'r') as stream:
+                info = json.load(stream)
+        except (OSError, ValueError):
+            return None
+        if info.get('boot_id') != self.boot_id() or not os.path.exists(self.env_file):
+            return None
+        return info
+
+    def save(self, info):
+        try:
+            os.makedirs(self.cache, exist_ok=True)
+            for path, data in [(self.env_file, env_format(info)), (self.json_file, json.dumps(info, indent=4) + '\n')]:
+                tmp = "{}.{}".format(path, os.getpid())
+                with open(tmp, 'w') as stream:
+                    stream.write(data)
+                os.replace(tmp, path)
+        except OSError as e:
+            if verbose:
+                log("Failed to save {}: {}".format(self.cache, e))
+
+    def get(self, refresh=False):
+        """
+        Return platform info. Probe and cache it if needed.
+        """
+        info = None if refresh else self.load()
+        if info is not None:
+            return info
+        info = self.probe()
+        # Failed probes are retried by the next caller
+        if info['cx_pcidev'] and info['dpu_part_number']:
+            self.save(info)
+        return info
+
+
+def env_format(info):
+    """
+    Sourceable env. Variables set by the caller take precedence.
+    """
+    lines = ["PLATFORM_PROBED=1"]
+    for name in ENV_VARIABLES:
+        value = str(info.get(name, ""))
+        if value:
+            lines.append("export {0}=${{{0}:-{1}}}".format(name, shlex.quote(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='BlueField platform identity probe')
+    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS,
+                        help="env: print sourceable env. json: print JSON. refresh: probe again and update the cache")
+    parser.add_argument('--refresh', action='store_true', help="Ignore the cached result", default=False)
+    parser.add_argument('--sysroot', help="Root of /sys, /proc and /dev", default=os.environ.get('PLATFORM_SYSROOT', '/'))
+    parser.add_argument('--cache', help="Cache directory", default=os.environ.get('PLATFORM_CACHE', cache_dir))
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    platform = PlatformProbe(args.sysroot, args.cache)
+    info = platform.get(args.refresh or args.op == 'refresh')
+    if verbose:
+        log("Tools run: {}".format(', '.join(platform.tools) if platform.tools else "none, cached"))
+
+    if args.op == 'json':
+        print(json.dumps(info, indent=4))
+    elif args.op == 'env':
+        sys.stdout.write(env_format(info))
+
+    sys.exit(0 if info['cx_pcidev'] else 1)
+
+
+if __name__ == '__main__':
+        main()
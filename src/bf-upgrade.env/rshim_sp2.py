@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+RSHIM scratchpad 2 (RshimSP2R/RshimSP2W EFI variables) codec for bf-upgrade.
+
+The variables hold a 32-bit attributes prefix followed by a little-endian
+UINT64:
+  bit 2       upgrade flow
+  bit 6       activate flow
+  bit 7       cancel flow
+  bits 12:11  status: 1 - in progress, 2 - completed, 3 - failed
+  bits 15:13  progress in 20% steps, 5 - 100%
+Progress updates that do not change the value written last are skipped,
+so only 20% steps and status changes are written to NVRAM.
+"""
+
+import os
+import sys
+import argparse
+import errno
+import fcntl
+import json
+import struct
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = os.path.basename(sys.argv[0])
+
+SUPPORTED_OPERATIONS = ['read', 'decode', 'set', 'write']
+
+efivars = "/sys/firmware/efi/efivars"
+state_file = "/run/bf-upgrade/rshim_sp2.json"
+READ_NAME = "RshimSP2R-f3ce977e-c17f-493e-a3cd-5731d386e505"
+WRITE_NAME = "RshimSP2W-f3ce977e-c17f-493e-a3cd-5731d386e505"
+
+# EFI_VARIABLE_BOOTSERVICE_ACCESS | EFI_VARIABLE_RUNTIME_ACCESS
+ATTRIBUTES = 0x6
+VARIABLE = struct.Struct('<IQ')
+
+MODE_UPGRADE = 1 << 2
+MODE_ACTIVATE = 1 << 6
+MODE_CANCEL = 1 << 7
+STATUS_SHIFT = 11
+STATUS_MASK = 0x3 << STATUS_SHIFT
+PROGRESS_SHIFT = 13
+PROGRESS_MASK = 0x7 << PROGRESS_SHIFT
+
+IN_PROGRESS = 0x1
+COMPLETED = 0x2
+FAILED = 0x3
+STATUS_NAMES = {0: 'idle', IN_PROGRESS: 'in_progress', COMPLETED: 'completed', FAILED: 'failed'}
+
+FS_IOC_GETFLAGS = 0x80086601
+FS_IOC_SETFLAGS = 0x40086602
+FS_IMMUTABLE_FL = 0x10
+
+verbose = False
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def encode_progress(sp2, progress, status):
+    """
+    Return SP2 with the progress and status of set_upgrade_progress
+    """
+    result = sp2 & ~STATUS_MASK & ~PROGRESS_MASK & 0xffffffffffffffff
+    if progress < 100:
+        bucket = max(progress // 20, 0)
+        result |= IN_PROGRESS << STATUS_SHIFT
+    else:
+        bucket = 5
+        result |= (COMPLETED if status == 0 else FAILED) << STATUS_SHIFT
+    return result | (bucket << PROGRESS_SHIFT)
+
+
+def decode(sp2):
+    status = (sp2 & STATUS_MASK) >> STATUS_SHIFT
+    return {
+        'value': sp2,
+        'upgrade': bool(sp2 & MODE_UPGRADE),
+        'activate': bool(sp2 & MODE_ACTIVATE),
+        'cancel': bool(sp2 & MODE_CANCEL),
+        'status': STATUS_NAMES[status],
+        'progress': ((sp2 & PROGRESS_MASK) >> PROGRESS_SHIFT) * 20,
+    }
+
+
+class RshimSP2:
+    def __init__ (self, directory=efivars, state=state_file):
+        self.read_path = os.path.join(directory, READ_NAME)
+        self.write_path = os.path.join(directory, WRITE_NAME)
+        self.state = state
+
+    def read(self):
+        """
+        Return UINT64 value of RshimSP2R. 0 if the variable does not exist.
+        """
+        try:
+            with open(self.read_path, 'rb') as stream:
+                data = stream.read(VARIABLE.size)
+        except OSError:
+            return 0
+        if len(data) < VARIABLE.size:
+            return 0
+        return VARIABLE.unpack(data)[1]
+
+    def __mutable__(self, path):
+        """
+        efivarfs marks vendor variables immutable
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            flags = struct.unpack('i', fcntl.ioctl(fd, FS_IOC_GETFLAGS, struct.pack('i', 0)))[0]
+            if flags & FS_IMMUTABLE_FL:
+                fcntl.ioctl(fd, FS_IOC_SETFLAGS, struct.pack('i', flags & ~FS_IMMUTABLE_FL))
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def write(self, value):
+        """
+        Write RshimSP2W with a single write() and remove it, as the shell flow does
+        """
+        self.__mutable__(self.write_path)
+        try:
+            os.unlink(self.write_path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        fd = os.open(self.write_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, VARIABLE.pack(ATTRIBUTES, value))
+        finally:
+            os.close(fd)
+        self.__mutable__(self.write_path)
+        os.unlink(self.write_path)
+
+    def __boot_id__(self):
+        try:
+            with open('/proc/sys/kernel/random/boot_id', 'r') as stream:
+                return stream.read().strip()
+        except OSError:
+            return ""
+
+    def __load_state__(self):
+        try:
+            with open(self.state, 'r') as stream:
+                state = json.load(stream)
+        except (OSError, ValueError):
+            return {}
+        if state.get('boot_id') != self.__boot_id__():
+            return {}
+        return state
+
+    def __save_state__(self, sp2, value):
+        try:
+            os.makedirs(os.path.dirname(self.state), exist_ok=True)
+            tmp = "{}.{}".format(self.state, os.getpid())
+            with open(tmp, 'w') as stream:
+                json.dump({'boot_id': self.__boot_id__(), 'sp2': sp2, 'value': value}, stream)
+            os.replace(tmp, self.state)
+        except OSError:
+            pass
+
+    def set_progress(self, progress, status, force=False):
+        """
+        Write progress and status. Return the written value or None when
+        the value written last is unchanged.
+        """
+        sp2 = self.read()
+        value = encode_progress(sp2, progress, status)
+        state = self.__load_state__()
+        if not force and state.get('sp2') == sp2 and state.get('value') == value:
+            return None
+        self.write(value)
+        self.__save_state__(sp2, value)
+        return value
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='RSHIM SP2 EFI variables codec')
+    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS,
+                        help="read: print RshimSP2R. decode: print its fields. set: write progress. write: write value")
+    parser.add_argument('--progress', type=int, help="Progress in percent for set", default=0)
+    parser.add_argument('--status', type=int, help="Status for set: 0 - passed, otherwise failed", default=0)
+    parser.add_argument('--value', type=lambda v: int(v, 0), help="Value for write")
+    parser.add_argument('--force', action='store_true', help="Write even if the value is unchanged", default=False)
+    parser.add_argument('--efivars', help="efivars directory", default=os.environ.get('RSHIM_EFIVARS', efivars))
+    parser.add_argument('--state', help="File with the value written last", default=os.environ.get('RSHIM_SP2_STATE', state_file))
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    sp2 = RshimSP2(args.efivars, args.state)
+    try:
+        if args.op == 'read':
+            print(sp2.read())
+        elif args.op == 'decode':
+            print(json.dumps(decode(sp2.read()), indent=4))
+        elif args.op == 'set':
+            value = sp2.set_progress(args.progress, args.status, args.force)
+            if value is not None:
+                log("set_upgrade_progress: {}".format(value))
+            elif verbose:
+                log("set_upgrade_progress: {}% unchanged".format(args.progress))
+        elif args.op == 'write':
+            if args.value is None:
+                parser.error("--value is required for write")
+            sp2.write(args.value)
+    except OSError as e:
+        log("Failed to access RSHIM SP2: {}".format(e))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Run bfb_tool.py and network_admin.py operations on many DPUs concurrently.
+
+Usage example:
+    bf_fleet.py --hosts_file dpus.txt --transport ssh -- bfb_tool --op fw_activate_bfb --bfb /tmp/new.bfb
+
+Every host result is printed as a JSON line when it completes, followed by
+a summary line.
+"""
+
+import os
+import sys
+import argparse
+import asyncio
+import ast
+import json
+import random
+import shlex
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = "bf_fleet"
+
+EXEC_FILES = "/opt/mellanox/mlnx_snap/exec_files"
+TOOLS = {
+    'bfb_tool': os.path.join(EXEC_FILES, 'bfb_tool.py'),
+    'network_admin': os.path.join(EXEC_FILES, 'network_admin.py'),
+}
+# Operations that reboot the DPU are scheduled in rolling waves
+WAVE_OPERATIONS = ['fw_activate_bfb']
+TIMEOUT_RC = 124
+verbose = False
+
+
+class LocalTransport:
+    """
+    Run commands on this machine. The host name is used for reporting only.
+    """
+    def command(self, host, argv):
+        return list(argv)
+
+    async def run(self, host, argv, timeout):
+        """
+        Return exit code, stdout and stderr
+        """
+        cmd = self.command(host, argv)
+        if verbose:
+            print("Running command:", shlex.join(cmd), file=sys.stderr)
+        proc = await asyncio.create_subprocess_exec(*cmd, stdin=asyncio.subprocess.DEVNULL,
+                                                    stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return TIMEOUT_RC, "", "Timeout after {}s".format(timeout)
+
+        return proc.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+
+class SSHTransport(LocalTransport):
+    """
+    Run commands on the target host using ssh
+    """
+    def __init__ (self, user=None, options=None, connect_timeout=10):
+        self.user = user
+        self.options = ['-o', 'BatchMode=yes', '-o', 'ConnectTimeout={}'.format(connect_timeout)]
+        for option in options or []:
+            self.options += ['-o', option]
+
+    def command(self, host, argv):
+        target = "{}@{}".format(self.user, host) if self.user else host
+        return ['ssh'] + self.options + [target, '--', shlex.join(argv)]
+
+
+class FakeTransport:
+    """
+    In-process transport for testing the orchestration without DPUs.
+    handler(host, argv) returns (rc, stdout) or (rc, stdout, stderr).
+    By default every command succeeds with bfb_tool-like output.
+    All calls are recorded in self.calls as (host, argv, start, end).
+    """
+    def __init__ (self, handler=None, latency=0.0, jitter=0.0, fail_hosts=None):
+        self.handler = handler
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_hosts = set(fail_hosts or [])
+        self.calls = []
+
+    async def run(self, host, argv, timeout):
+        start = time.monotonic()
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > timeout:
+            await asyncio.sleep(timeout)
+            self.calls.append((host, list(argv), start, time.monotonic()))
+            return TIMEOUT_RC, "", "Timeout after {}s".format(timeout)
+
+        await asyncio.sleep(delay)
+        if self.handler:
+            reply = self.handler(host, argv)
+        elif host in self.fail_hosts:
+            reply = (1, json.dumps({"success": False, "output": "fake failure"}))
+        else:
+            reply = (0, json.dumps({"success": True, "output": "fake"}))
+        self.calls.append((host, list(argv), start, time.monotonic()))
+        if len(reply) == 2:
+            reply = (reply[0], reply[1], "")
+        return reply
+
+
+class RateLimiter:
+    """
+    Allow at most 'rate' operation starts per second
+    """
+    def __init__ (self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            if self.next > now:
+                await asyncio.sleep(self.next - now)
+                now = self.next
+            self.next = now + self.interval
+
+
+class Fleet:
+    """
+    Run a command on many hosts with a global concurrency limit, a per-host
+    concurrency limit and a start rate limit
+    """
+    def __init__ (self, transport, concurrency=32, per_host=1, rate=0, timeout=3600, output=None):
+        self.transport = transport
+        self.timeout = timeout
+        self.per_host = per_host
+        self.output = output
+        self.slots = asyncio.Semaphore(concurrency)
+        self.host_slots = {}
+        self.limiter = RateLimiter(rate)
+        self.results = []
+
+    def emit(self, record):
+        self.results.append(record)
+        if self.output:
+            self.output.write(json.dumps(record) + '\n')
+            self.output.flush()
+
+    async def run_one(self, host, argv, wave=None):
+        """
+        Run argv on host. Return result record.
+        """
+        host_slot = self.host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with self.slots, host_slot:
+            await self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                rc, stdout, stderr = await self.transport.run(host, argv, self.timeout)
+            except Exception as e:
+                rc, stdout, stderr = 255, "", "{}: {}".format(type(e).__name__, e)
+            latency = time.monotonic() - start
+
+        result = parse_output(stdout)
+        record = {
+            'host': host,
+            'op': operation(argv),
+            'rc': rc,
+            'success': rc == 0 and not (isinstance(result, dict) and result.get('success') is False),
+            'latency': round(latency, 3),
+            'result': result,
+        }
+        if wave is not None:
+            record['wave'] = wave
+        if stderr.strip():
+            record['error'] = stderr.strip()
+        self.emit(record)
+        return record
+
+    async def run(self, hosts, argv, wave=None):
+        return await asyncio.gather(*[self.run_one(host, argv, wave) for host in hosts])
+
+    async def run_waves(self, hosts, argv, wave_size, max_failures=0, wave_delay=0):
+        """
+        Run argv on hosts in waves of wave_size hosts. Next wave starts only
+        if the total number of failures does not exceed max_failures.
+        Hosts of the waves that were not started are reported as skipped.
+        """
+        failures = 0
+        waves = [hosts[i:i + wave_size] for i in range(0, len(hosts), wave_size)]
+        for num, wave in enumerate(waves):
+            if failures > max_failures:
+                for host in wave:
+                    self.emit({'host': host, 'op': operation(argv), 'rc': None, 'success': False,
+                               'latency': 0, 'result': None, 'wave': num, 'skipped': True})
+                continue
+
+            if num and wave_delay:
+                await asyncio.sleep(wave_delay)
+            records = await self.run(wave, argv, num)
+            failures += len([record for record in records if not record['success']])
+
+        return self.results
+
+    def summary(self, elapsed):
+        latencies = sorted(record['latency'] for record in self.results if not record.get('skipped'))
+        summary = {
+            'hosts': len(self.results),
+            'succeeded': len([record for record in self.results if record['success']]),
+            'failed': len([record for record in self.results if not record['success'] and not record.get('skipped')]),
+            'skipped': len([record for record in self.results if record.get('skipped')]),
+            'elapsed': round(elapsed, 3),
+        }
+        if latencies:
+            summary['latency_p50'] = latencies[len(latencies) // 2]
+            summary['latency_max'] = latencies[-1]
+        return summary
+
+
+def operation(argv):
+    """
+    Return '--op' value of the command
+    """
+    if '--op' in argv[:-1]:
+        return argv[argv.index('--op') + 1]
+    return None
+
+
+def parse_output(stdout):
+    """
+    Parse tool output. network_admin prints JSON and bfb_tool prints
+    a Python dict. Return raw text if neither can be parsed.
+    """
+    lines = [line for line in stdout.strip().split('\n') if line.strip()]
+    if not lines:
+        return None
+    for parser in [json.loads, ast.literal_eval]:
+        try:
+            return parser(lines[-1])
+        except (ValueError, SyntaxError):
+            pass
+    return stdout.strip()
+
+
+def tool_command(argv, python='python3'):
+    """
+    Map 'bfb_tool ...' and 'network_admin ...' to the installed scripts
+    """
+    if argv and argv[0] in TOOLS:
+        return [python, TOOLS[argv[0]]] + argv[1:]
+    return argv
+
+
+def read_hosts(path):
+    hosts = []
+    with open(path, 'r') as stream:
+        for line in stream:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                hosts.append(line)
+    return hosts
+
+
+def get_transport(args):
+    if args.transport == 'ssh':
+        return SSHTransport(args.ssh_user, args.ssh_option)
+    if args.transport == 'fake':
+        return FakeTransport(latency=args.fake_latency, jitter=args.fake_latency / 2, fail_hosts=args.fake_fail)
+    return LocalTransport()
+
+
+async def run_fleet(args, hosts, argv):
+    fleet = Fleet(get_transport(args), args.concurrency, args.per_host, args.rate, args.timeout, sys.stdout)
+    start = time.monotonic()
+    wave_size = args.wave_size
+    if not wave_size and operation(argv) in WAVE_OPERATIONS:
+        wave_size = max(1, len(hosts) // 10)
+
+    if wave_size:
+        await fleet.run_waves(hosts, argv, wave_size, args.max_failures, args.wave_delay)
+    else:
+        await fleet.run(hosts, argv)
+
+    summary = fleet.summary(time.monotonic() - start)
+    print(json.dumps({'summary': summary}))
+    return summary
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='Run bfb_tool and network_admin operations on many DPUs',
+                                     epilog="Command follows '--'. 'bfb_tool' and 'network_admin' are mapped to the installed scripts")
+    parser.add_argument('--hosts', nargs='+', help="Target hosts", default=[])
+    parser.add_argument('--hosts_file', help="File with target hosts. One host per line")
+    parser.add_argument('--transport', choices=['local', 'ssh', 'fake'], help="Transport", default='ssh')
+    parser.add_argument('--ssh_user', help="SSH user name")
+    parser.add_argument('--ssh_option', action='append', help="SSH option. Use multiple times", default=[])
+    parser.add_argument('--concurrency', type=int, help="Maximum number of hosts processed in parallel", default=32)
+    parser.add_argument('--per_host', type=int, help="Maximum number of parallel operations per host", default=1)
+    parser.add_argument('--rate', type=float, help="Maximum number of operations started per second. 0 - unlimited", default=0)
+    parser.add_argument('--timeout', type=float, help="Operation timeout in seconds", default=3600)
+    parser.add_argument('--wave_size', type=int, help="Hosts per wave. Default for fw_activate_bfb: 10%% of the hosts", default=0)
+    parser.add_argument('--max_failures', type=int, help="Stop starting new waves after this number of failures", default=0)
+    parser.add_argument('--wave_delay', type=float, help="Delay between waves in seconds", default=0)
+    parser.add_argument('--fake_latency', type=float, help="Fake transport: operation latency in seconds", default=0.1)
+    parser.add_argument('--fake_fail', nargs='+', help="Fake transport: hosts that fail", default=[])
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help="Command to run on each host")
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        hosts += read_hosts(args.hosts_file)
+    if not hosts:
+        sys.exit("ERROR: No hosts provided. Use '--hosts' or '--hosts_file'")
+
+    argv = args.command
+    if argv and argv[0] == '--':
+        argv = argv[1:]
+    if not argv:
+        sys.exit("ERROR: Command is not provided")
+
+    summary = asyncio.run(run_fleet(args, hosts, tool_command(argv)))
+    sys.exit(1 if summary['failed'] or summary['skipped'] else 0)
+
+
+if __name__ == '__main__':
+        main()
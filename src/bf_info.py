@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Parallel implementation of bf-info.
+
+Probes run concurrently. Facts that do not change until reboot, or until
+the related file or package database changes, are cached in /run.
+The output is identical to the bf-info shell script.
+"""
+
+import os
+import sys
+import argparse
+import glob
+import json
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = "bf-info"
+
+BOOTIMG_LOCATION = "/lib/firmware/mellanox/boot/default.bfb"
+DPDK_TESTPMD = "/opt/mellanox/dpdk/bin/dpdk-testpmd"
+FW_UPDATER = "/opt/mellanox/mlnx-fw-updater/firmware/mlxfwmanager_sriov_dis_aarch64_*"
+BOOT_ID = "/proc/sys/kernel/random/boot_id"
+cache_file = "/run/bf-info/cache.json"
+
+MISOC_TYPES = {'ATF': 0, 'UEFI': 1, 'BMC': 2, 'CEC': 3}
+DEVICE_TYPES = [('mt41682', 'bf1', 'BlueField'), ('mt41686', 'bf2', 'BlueField2'),
+                ('mt41692', 'bf3', 'BlueField3'), ('mt41695', 'bf4', 'BlueField4')]
+STORAGE_BF2 = ['mlnx-libsnap', 'mlnx-snap', 'spdk', 'virtio-net-controller']
+STORAGE = ['virtio-net-controller']
+DOCA_PATTERN = 'doca|rxp|dpa-compiler'
+FLEXIO_PATTERN = 'dpacc|flexio|dpaeumgmt|dpa-gdbserver|dpa-stats'
+SOC_PATTERN = 'mlxbf-gige|sdhci-of-dwcmshc|tmfifo|tmfifo|gpio-mlxbf|pinctrl-mlxbf3|i2c-mlxbf|mlx-OpenIPMI|ipmb-dev-int|mlxbf-livefish|ipmb-host|mlxbf-p|pwr-mlxbf|mlx-trio|mmc-utils'
+
+# Parallel mlxreg invocations on the same device
+REGISTER_JOBS = 4
+WORKERS = 16
+
+debian = os.path.exists('/etc/debian_version')
+
+
+def run(cmd, stdin=None, stderr=None):
+    """
+    Run command and return its output like shell command substitution
+    (trailing newlines removed). cmd is a shell command if it is a string.
+    """
+    try:
+        result = subprocess.run(cmd, shell=isinstance(cmd, str), executable='/bin/bash' if isinstance(cmd, str) else None,
+                                input=stdin, stdout=subprocess.PIPE, stderr=stderr,
+                                universal_newlines=True, errors='surrogateescape')
+    except OSError:
+        return ""
+    return result.stdout.rstrip('\n')
+
+
+def file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+def package_db_stamp():
+    if debian:
+        return file_stamp('/var/lib/dpkg/status')
+    return file_stamp('/var/lib/rpm')
+
+
+class ProbeCache:
+    """
+    Probe results cached per boot. Each entry also has a key that
+    invalidates it, e.g. a file stamp.
+    """
+    def __init__ (self, path, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.entries = {}
+        try:
+            with open(BOOT_ID, 'r') as stream:
+                self.boot_id = stream.read().strip()
+        except OSError:
+            self.boot_id = None
+        if not enabled:
+            return
+        try:
+            with open(path, 'r') as stream:
+                data = json.load(stream)
+            if data.get('boot_id') == self.boot_id:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, name, key):
+        with self.lock:
+            entry = self.entries.get(name)
+        if self.enabled and entry and entry['key'] == key:
+            return True, entry['value']
+        return False, None
+
+    def set(self, name, key, value):
+        with self.lock:
+            self.entries[name] = {'key': key, 'value': value}
+            self.dirty = True
+
+    def save(self):
+        if not self.enabled or not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), mode=0o755, exist_ok=True)
+            tmp = "{}.{}".format(self.path, os.getpid())
+            with open(tmp, 'w') as stream:
+                json.dump({'boot_id': self.boot_id, 'entries': self.entries}, stream)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+class Prober:
+    """
+    Run probes in a thread pool, record their latency and use the cache
+    """
+    def __init__ (self, cache, workers=WORKERS):
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.registers = threading.BoundedSemaphore(REGISTER_JOBS)
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def __probe__(self, name, key, func, args):
+        start = time.monotonic()
+        cached, value = (False, None)
+        if key is not False:
+            cached, value = self.cache.get(name, key)
+        if not cached:
+            value = func(*args)
+            if key is not False:
+                self.cache.set(name, key, value)
+        with self.lock:
+            self.timings[name] = (time.monotonic() - start, cached)
+        return value
+
+    def submit(self, name, func, *args, key=False):
+        """
+        Run probe in background. Result is cached if key is not False.
+        """
+        return self.executor.submit(self.__probe__, name, key, func, args)
+
+    def register(self, cmd, stdin=None):
+        with self.registers:
+            return run(cmd, stdin=stdin, stderr=subprocess.STDOUT)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+def parse_register_version(output, field_name='version'):
+    """
+    Decode ASCII string from mlxreg dword fields: '<field>[N] | 0x...'
+    """
+    entries = []
+    for line in output.split('\n'):
+        if not re.match(r'^{}\[[0-9]+\]'.format(re.escape(field_name)), line):
+            continue
+        match = re.match(r'^{}\[([0-9]+)\].*\| *(0x[0-9a-fA-F]+)'.format(re.escape(field_name)), line)
+        if not match:
+            continue
+        entries.append((int(match.group(1)), match.group(2)))
+
+    version = ""
+    for index, hex_value in sorted(entries, key=lambda entry: entry[0]):
+        value = int(hex_value, 16)
+        if value == 0:
+            break
+        char_code = value & 0xFF
+        if 32 <= char_code <= 126:
+            version += chr(char_code)
+    return version
+
+
+def get_misoc_version(prober, component, query_pending, mst_device):
+    output = prober.register(['mlxreg', '-d', mst_device, '--reg_name', 'MISOC', '--get',
+                              '--index', "type={},query_pending={}".format(MISOC_TYPES[component], query_pending)])
+    if re.search(r'query_not_available.*0x00000001', output):
+        return ""
+    return parse_register_version(output, 'version')
+
+
+def get_mcqi_version(prober, query_pending, mst_device):
+    # Answer 'n' to mlxreg's confirmation prompt
+    output = prober.register(['mlxreg', '-d', mst_device, '--reg_name', 'MCQI',
+                              '--set', "info_type=1,data_size=0x34,offset=0",
+                              '--indexes', "component_index=0,device_index=1,read_pending_component={},device_type=0".format(query_pending)],
+                             stdin="n")
+    if re.search(r'Bad parameter|Failed', output):
+        return ""
+    return parse_register_version(output, 'version_string')
+
+
+def get_packaged_nic_fw():
+    binaries = sorted(glob.glob(FW_UPDATER))
+    if not binaries:
+        return ""
+    lines = run([binaries[0], '--list'], stderr=subprocess.DEVNULL).split('\n')
+    line = lines[2] if len(lines) > 2 else lines[-1]
+    fields = line.split()
+    return fields[3] if len(fields) > 3 else ""
+
+
+def read_version_file(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', errors='surrogateescape') as stream:
+                    return stream.read().rstrip('\n')
+            except OSError:
+                return ""
+    return ""
+
+
+def get_bmc_fw():
+    return read_version_file('/lib/firmware/mellanox/bmc/bf2-bmc-fw.version', '/lib/firmware/mellanox/bmc/bf3-bmc-fw.version')
+
+
+def get_cec_fw():
+    return read_version_file('/lib/firmware/mellanox/cec/bf2-cec-fw.version', '/lib/firmware/mellanox/cec/bf3-cec-fw.version')
+
+
+def get_grace_fw():
+    return run(['dmidecode', '-s', 'bios-version'])
+
+
+def get_bootimage_strings(path):
+    """
+    Equivalent of:
+    strings $BFB | grep -m 1 "(\\(release\\|debug\\))"
+    strings -e l $BFB | grep "BlueField" | cut -d':' -f 2
+    """
+    with open(path, 'rb') as stream:
+        data = stream.read()
+
+    atf = ""
+    positions = [pos for pos in [data.find(b'(release)'), data.find(b'(debug)')] if pos >= 0]
+    if positions:
+        pos = min(positions)
+        start = pos
+        while start > 0 and (32 <= data[start - 1] <= 126 or data[start - 1] == 9):
+            start -= 1
+        end = pos
+        while end < len(data) and (32 <= data[end] <= 126 or data[end] == 9):
+            end += 1
+        atf = data[start:end].decode('ascii')
+
+    uefi = []
+    pattern = re.compile(rb'(?:[\x20-\x7e\t]\x00){4,}')
+    pos = 0
+    marker = 'BlueField'.encode('utf-16-le')
+    while True:
+        pos = data.find(marker, pos)
+        if pos < 0:
+            break
+        # Find the 16-bit string containing the marker
+        start = pos
+        while start >= 2 and data[start - 1] == 0 and (32 <= data[start - 2] <= 126 or data[start - 2] == 9):
+            start -= 2
+        match = pattern.match(data, start)
+        if match and match.end() > pos:
+            string = match.group().decode('utf-16-le')
+            fields = string.split(':')
+            uefi.append(fields[1] if len(fields) > 1 else string)
+            pos = match.end() + 2
+        else:
+            pos += len(marker)
+
+    return {'atf': atf, 'uefi': '\n'.join(uefi)}
+
+
+def get_bfver():
+    if not any(os.access(os.path.join(path, 'bfver'), os.X_OK) for path in os.environ.get('PATH', '').split(':')):
+        return ""
+    return run('bfver')
+
+
+def get_ofed():
+    output = run('ofed_info -s', stderr=subprocess.DEVNULL)
+    lines = []
+    for line in output.replace(':', '').split('\n'):
+        if '-' in line:
+            line = '-'.join(line.split('-')[1:])
+        lines.append(line)
+    return '\n'.join(lines).rstrip('\n')
+
+
+def print_ofed():
+    if not debian:
+        return run("ofed_info | sed -n '/^-------------------$/ { :a; n; p; ba; }' | xargs rpm -q --queryformat=\"[- %{NAME} %{VERSION}-%{RELEASE}]\\n\"")
+
+    lines = run('ofed_info').split('\n')
+    if '-------------------' not in lines:
+        return ""
+    output = []
+    for line in lines[lines.index('-------------------') + 1:]:
+        fields = line.split()
+        if fields:
+            output.append("- {} {}".format(fields[1] if len(fields) > 1 else "", fields[2] if len(fields) > 2 else ""))
+    return '\n'.join(output)
+
+
+def get_dpdk_version():
+    # Use --no-huge so testpmd does not take hugepages just to print RTE Version
+    output = run([DPDK_TESTPMD, '-v', '--no-huge'], stderr=subprocess.STDOUT)
+    versions = []
+    for line in output.split('\n'):
+        if 'RTE Version:' in line:
+            fields = line.split(':')
+            versions.append(fields[2] if len(fields) > 2 else "")
+    return '\n'.join(versions)
+
+
+class Packages:
+    """
+    Package versions. On Debian all packages are queried with a single
+    'dpkg --list' instead of one invocation per package.
+    """
+    def __init__ (self, names):
+        self.rows = {}
+        if not debian or not names:
+            return
+        output = run(['dpkg', '--list'] + sorted(set(names)), stderr=subprocess.DEVNULL)
+        in_table = False
+        for line in output.split('\n'):
+            if line.startswith('+++-'):
+                in_table = True
+                continue
+            fields = line.split()
+            if not in_table or len(fields) < 2:
+                continue
+            row = (fields[1], fields[2] if len(fields) > 2 else "")
+            for name in set([fields[1], fields[1].split(':')[0]]):
+                self.rows.setdefault(name, []).append(row)
+
+    def version(self, name):
+        """
+        Same as get_version() of bf-info
+        """
+        if debian:
+            return '\n'.join("{} {}".format(pkg, version) for pkg, version in self.rows.get(name, []))
+        if subprocess.run(['rpm', '-q', '--quiet', name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode:
+            return ""
+        return run(['rpm', '-q', '--queryformat=[%{NAME}-%{VERSION}-%{RELEASE}]', name])
+
+    def version_and_release(self, name):
+        """
+        Same as get_version_and_release() of bf-info
+        """
+        if debian:
+            return '\n'.join(version for pkg, version in self.rows.get(name, []))
+        if subprocess.run(['rpm', '-q', '--quiet', name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode:
+            return ""
+        return run(['rpm', '-q', '--queryformat=[%{VERSION}-%{RELEASE}]', name])
+
+
+def list_packages(pattern):
+    if debian:
+        return run("dpkg --list | grep -E '{}' | awk '{{print $2}}' | sort -n".format(pattern)).split()
+    return run("rpm -qa | grep -E '{}' | sort -n".format(pattern)).split()
+
+
+def get_packages(prober, dev_type):
+    """
+    Collect package versions. Return dict of bf-info variables.
+    """
+    # Own executor: waiting on jobs of the prober pool from a prober job
+    # deadlocks once the pool is full
+    patterns = [('doca', DOCA_PATTERN), ('flexio', FLEXIO_PATTERN), ('soc', SOC_PATTERN)]
+    with ThreadPoolExecutor(max_workers=len(patterns)) as executor:
+        lists = {name: executor.submit(list_packages, pattern) for name, pattern in patterns}
+        lists = {name: future.result() for name, future in lists.items()}
+    storage = STORAGE_BF2 if dev_type == "BlueField2" else STORAGE
+    names = storage + lists['doca'] + lists['flexio'] + lists['soc'] + \
+            ['collectx-clxapi', 'mlxbf-bootimages', 'mft', 'mstflint', 'mlx-regex']
+    packages = Packages(names)
+
+    def items(names, fmt="- {}"):
+        return [fmt.format(packages.version(name)) for name in names if packages.version(name)]
+
+    doca = items(lists['doca'])
+    if packages.version('collectx-clxapi'):
+        doca.append("- collectx-clxapi: {}".format(packages.version('collectx-clxapi')))
+
+    return {
+        'BOOTIMAGE_VER': packages.version('mlxbf-bootimages'),
+        'MFT_VERSION': packages.version_and_release('mft'),
+        'MSTFLINT_VERSION': packages.version_and_release('mstflint'),
+        'MLX_REGEX': packages.version('mlx-regex'),
+        'STORAGE_PACKAGES': '\n'.join(items(storage)),
+        'DOCA_PACKAGES': '\n'.join(doca),
+        'FLEXIO_PACKAGES': '\n'.join(items(lists['flexio'])),
+        'SOC_PACKAGES': '\n'.join(items(lists['soc'])),
+    }
+
+
+def collect(prober):
+    """
+    Run all probes. Return dict of bf-info variables.
+    """
+    info = {}
+    boot = prober.cache.boot_id
+
+    mst_devices = sorted(glob.glob('/dev/mst/*_pciconf0'))
+    mst_device = mst_devices[0] if mst_devices else ""
+    device_gen, dev_type = ("unknown", "")
+    for pattern, gen, name in DEVICE_TYPES:
+        if pattern in mst_device:
+            device_gen, dev_type = (gen, name)
+            break
+    info['DEVICE_GEN'] = device_gen
+    info['DEV_TYPE'] = dev_type
+    if not dev_type:
+        print("Warning: Unknown BlueField device type", file=sys.stderr)
+
+    bootimg = os.path.exists(BOOTIMG_LOCATION)
+    jobs = {}
+    db = package_db_stamp()
+    if bootimg:
+        jobs['bootimage'] = prober.submit('bootimage', get_bootimage_strings, BOOTIMG_LOCATION, key=file_stamp(BOOTIMG_LOCATION))
+        jobs['bfver'] = prober.submit('bfver', get_bfver, key=[boot, file_stamp(BOOTIMG_LOCATION)])
+    jobs['ofed'] = prober.submit('ofed', get_ofed, key=db)
+    jobs['packages'] = prober.submit('packages', get_packages, prober, dev_type, key=[db, dev_type])
+    jobs['dpdk'] = prober.submit('dpdk', get_dpdk_version, key=file_stamp(DPDK_TESTPMD))
+
+    if mst_device:
+        # NIC firmware may be activated by mlxfwreset without an Arm reboot
+        jobs['NIC_FW'] = prober.submit('nic_fw', get_mcqi_version, prober, 0, mst_device)
+        jobs['NIC_FW_PENDING'] = prober.submit('nic_fw_pending', get_mcqi_version, prober, 1, mst_device)
+        if device_gen == "bf3":
+            for component, pending in [('ATF', 'ATF_PENDING'), ('UEFI', 'UEFI_PENDING'), ('BMC', 'BMC_FW_PENDING'), ('CEC', 'CEC_FW_PENDING')]:
+                name = 'misoc_' + component.lower()
+                # BMC and CEC may be updated and rebooted without an Arm reboot
+                key = [boot, mst_device] if component in ['ATF', 'UEFI'] else False
+                jobs[component + '_FW'] = prober.submit(name, get_misoc_version, prober, component, 0, mst_device, key=key)
+                jobs[pending] = prober.submit(name + '_pending', get_misoc_version, prober, component, 1, mst_device)
+        elif device_gen == "bf4":
+            jobs['GRACE_FW'] = prober.submit('grace_fw', get_grace_fw, key=boot)
+
+    packaged_nic_fw = None
+    if 'NIC_FW' not in jobs:
+        packaged_nic_fw = prober.submit('packaged_nic_fw', get_packaged_nic_fw, key=[file_stamp(path) for path in sorted(glob.glob(FW_UPDATER))])
+
+    results = {name: job.result() for name, job in jobs.items()}
+
+    # Boot image and bfver
+    for var in ['BUILD_ATF', 'BUILD_UEFI', 'BUILD_BSP']:
+        info[var] = ""
+    packages = results['packages']
+    info.update(packages)
+    if bootimg:
+        info['BUILD_ATF'] = results['bootimage']['atf']
+        info['BUILD_UEFI'] = results['bootimage']['uefi']
+        info['BUILD_BSP'] = '\n'.join(line.replace('mlxbf-bootimages-', '', 1) for line in packages['BOOTIMAGE_VER'].split('\n'))
+        bfver = results['bfver']
+        if bfver:
+            for var, tag in [('BUILD_ATF', 'ATF'), ('BUILD_UEFI', 'UEFI'), ('BUILD_BSP', 'BSP')]:
+                info[var] = ""
+                for line in bfver.split('\n'):
+                    if tag in line:
+                        fields = line.split()
+                        info[var] = fields[-1] if fields else ""
+                        break
+
+    info['OFED'] = results['ofed'] or "in-box"
+
+    for var in ['ATF_FW', 'ATF_PENDING', 'UEFI_FW', 'UEFI_PENDING', 'NIC_FW', 'NIC_FW_PENDING',
+                'BMC_FW', 'BMC_FW_PENDING', 'CEC_FW', 'CEC_FW_PENDING', 'GRACE_FW']:
+        info[var] = results.get(var, "")
+
+    # Fallbacks if register queries failed
+    if not info['NIC_FW']:
+        if packaged_nic_fw is None:
+            packaged_nic_fw = prober.submit('packaged_nic_fw', get_packaged_nic_fw, key=[file_stamp(path) for path in sorted(glob.glob(FW_UPDATER))])
+        info['NIC_FW'] = packaged_nic_fw.result()
+    if device_gen != "bf4":
+        if not info['ATF_FW']:
+            info['ATF_FW'] = info['BUILD_ATF']
+        if not info['UEFI_FW']:
+            info['UEFI_FW'] = info['BUILD_UEFI']
+        if not info['BMC_FW']:
+            info['BMC_FW'] = get_bmc_fw()
+        if not info['CEC_FW']:
+            info['CEC_FW'] = get_cec_fw()
+
+    info['DPDK_VERSION'] = results['dpdk']
+    info['KERNEL_VERSION'] = os.uname().release
+    info['DPDK_LABEL'] = "mlnx-dpdk" if "MLNX_DPDK" in info['DPDK_VERSION'] else "dpdk"
+
+    info['OFED_PACKAGES'] = ""
+    if info['OFED'] != "in-box":
+        info['OFED_PACKAGES'] = prober.submit('ofed_packages', print_ofed, key=package_db_stamp()).result()
+
+    return info
+
+
+def format_with_pending(running, pending):
+    if pending and pending != running:
+        return "{} (pending: {})".format(running, pending)
+    return running
+
+
+def fw_lines(label, running, pending):
+    lines = ["- {}: {}".format(label, running)]
+    if pending and pending != running:
+        lines.append("- {}: {} (pending)".format(label, pending))
+    return lines
+
+
+def json_escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\t', '\\t').replace('\n', '')
+
+
+def json_item(key, value, is_last):
+    comma = "" if is_last else ","
+    if value and value != " ":
+        return '    "{}": "{}"{}'.format(key, json_escape(value), comma)
+    return '    "{}": null{}'.format(key, comma)
+
+
+def json_array(key, items, is_last):
+    lines = ['    "{}": ['.format(key)]
+    entries = []
+    for line in items.split('\n') if items else []:
+        if line:
+            if line.startswith('- '):
+                line = line[2:]
+            entries.append('      "{}",'.format(json_escape(line)))
+    if entries:
+        entries[-1] = entries[-1][:-1]
+    lines += entries
+    lines.append("    ]" if is_last else "    ],")
+    return lines
+
+
+def format_json(info):
+    lines = ["{", '  "firmware": {']
+    lines.append(json_item("NIC_Firmware", format_with_pending(info['NIC_FW'], info['NIC_FW_PENDING']), False))
+    if info['DEVICE_GEN'] == "bf4":
+        lines.append(json_item("Grace_Firmware", format_with_pending(info['GRACE_FW'], info['GRACE_FW']), True))
+    else:
+        lines.append(json_item("ATF", format_with_pending(info['ATF_FW'], info['ATF_PENDING']), False))
+        lines.append(json_item("UEFI", format_with_pending(info['UEFI_FW'], info['UEFI_PENDING']), False))
+        lines.append(json_item("BSP", info['BUILD_BSP'], False))
+        lines.append(json_item("BMC_Firmware", format_with_pending(info['BMC_FW'], info['BMC_FW_PENDING']), False))
+        lines.append(json_item("CEC_Firmware", format_with_pending(info['CEC_FW'], info['CEC_FW_PENDING']), True))
+    lines.append("  },")
+    lines.append('  "drivers": {')
+    lines.append(json_item(info['DPDK_LABEL'], info['DPDK_VERSION'], False))
+    lines.append(json_item("Kernel", info['KERNEL_VERSION'], True))
+    lines.append("  },")
+    lines.append('  "tools": {')
+    lines.append(json_item("MFT", info['MFT_VERSION'], False))
+    if info['MLX_REGEX']:
+        lines.append(json_item("mstflint", info['MSTFLINT_VERSION'], False))
+        lines.append(json_item("mlx_regex", info['MLX_REGEX'], True))
+    else:
+        lines.append(json_item("mstflint", info['MSTFLINT_VERSION'], True))
+    lines.append("  },")
+    lines += json_array("storage", info['STORAGE_PACKAGES'], False)
+    lines += json_array("doca", info['DOCA_PACKAGES'], False)
+    lines += json_array("flexio", info['FLEXIO_PACKAGES'], False)
+    if info['OFED'] != "in-box":
+        lines += json_array("soc_platform", info['SOC_PACKAGES'], False)
+        lines += json_array("ofed", info['OFED_PACKAGES'], True)
+    else:
+        lines += json_array("soc_platform", info['SOC_PACKAGES'], True)
+    lines.append("}")
+    return '\n'.join(lines) + '\n'
+
+
+def format_yaml(info):
+    lines = ["", "Firmware:"]
+    lines += fw_lines("NIC Firmware", info['NIC_FW'], info['NIC_FW_PENDING'])
+    if info['DEVICE_GEN'] == "bf4":
+        lines += fw_lines("Grace Firmware", info['GRACE_FW'], info['GRACE_FW'])
+    else:
+        lines += fw_lines("ATF", info['ATF_FW'], info['ATF_PENDING'])
+        lines += fw_lines("UEFI", info['UEFI_FW'], info['UEFI_PENDING'])
+        lines.append("- BSP: {}".format(info['BUILD_BSP']))
+        lines += fw_lines("BMC Firmware", info['BMC_FW'], info['BMC_FW_PENDING'])
+        lines += fw_lines("CEC Firmware", info['CEC_FW'], info['CEC_FW_PENDING'])
+    lines.append("")
+    lines += ["Drivers:",
+              "- {}:{}".format(info['DPDK_LABEL'], info['DPDK_VERSION']),
+              "- Kernel: {}".format(info['KERNEL_VERSION']),
+              "",
+              "Tools:",
+              "- MFT: {}".format(info['MFT_VERSION']),
+              "- mstflint: {}".format(info['MSTFLINT_VERSION'])]
+    if info['MLX_REGEX']:
+        lines.append("- mlx-regex: {}".format(info['MLX_REGEX']))
+    lines += ["",
+              "Storage:", info['STORAGE_PACKAGES'], "",
+              "DOCA:", info['DOCA_PACKAGES'], "",
+              "FlexIO:", info['FLEXIO_PACKAGES'], "",
+              "SoC Platform:", info['SOC_PACKAGES']]
+    if info['OFED'] != "in-box":
+        lines += ["", "OFED:", info['OFED_PACKAGES'], ""]
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+
+    parser = argparse.ArgumentParser(prog=prog, description='Show BlueField firmware and software versions')
+    parser.add_argument('--json', action='store_true', help="Output in JSON format (default is YAML-like format)", default=False)
+    parser.add_argument('--timings', action='store_true', help="Print per-probe latency to stderr", default=False)
+    parser.add_argument('--no_cache', action='store_true', help="Do not use cached probe results", default=False)
+
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    cache = ProbeCache(cache_file, not args.no_cache)
+    prober = Prober(cache)
+    try:
+        info = collect(prober)
+    finally:
+        prober.shutdown()
+    cache.save()
+
+    output = format_json(info) if args.json else format_yaml(info)
+    sys.stdout.buffer.write(output.encode(errors='surrogateescape'))
+    sys.stdout.flush()
+
+    if args.timings:
+        for name, (duration, cached) in sorted(prober.timings.items(), key=lambda item: -item[1][0]):
+            print("{:<24} {:>10.1f} ms{}".format(name, duration * 1000, " (cached)" if cached else ""), file=sys.stderr)
+        print("{:<24} {:>10.1f} ms".format("total", (time.monotonic() - start) * 1000), file=sys.stderr)
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Sample port, ECN and PFC counters into a ring buffer and export them
+to the node-exporter textfile collector.
+"""
+
+import os
+import sys
+import argparse
+import array
+import ctypes
+import fcntl
+import re
+import signal
+import socket
+import struct
+import threading
+import time
+import network_admin
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = "bf_telemetry"
+
+textfile_dir = "/var/lib/prometheus/node-exporter"
+textfile_name = "bf_telemetry.prom"
+
+NETDEV_STATS = ['rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets',
+                'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped']
+ECN_COUNTERS = ['np_ecn_marked_roce_packets', 'np_cnp_sent', 'rp_cnp_handled', 'rp_cnp_ignored']
+PFC_STATS = re.compile(r'^(rx|tx)_prio\d_pause$|^(rx|tx)_pause_ctrl_phy$')
+
+SIOCETHTOOL = 0x8946
+ETHTOOL_GDRVINFO = 0x03
+ETHTOOL_GSTRINGS = 0x1b
+ETHTOOL_GSTATS = 0x1d
+ETH_SS_STATS = 1
+ETH_GSTRING_LEN = 32
+# Offset of n_stats in struct ethtool_drvinfo
+DRVINFO_N_STATS = 180
+DRVINFO_LEN = 196
+
+verbose = False
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of samples. Each sample is a timestamp and one float
+    per metric, stored in flat array('d') buffers.
+    """
+    def __init__ (self, metrics, capacity):
+        self.width = metrics
+        self.capacity = capacity
+        self.times = array.array('d', bytes(8 * capacity))
+        self.values = array.array('d', bytes(8 * capacity * metrics))
+        self.count = 0
+
+    def append(self, timestamp, values):
+        slot = self.count % self.capacity
+        self.times[slot] = timestamp
+        self.values[slot * self.width:(slot + 1) * self.width] = array.array('d', values)
+        self.count += 1
+
+    def __len__ (self):
+        return min(self.count, self.capacity)
+
+    def sample(self, age=0):
+        """
+        Return (timestamp, values) of the sample taken 'age' samples ago
+        """
+        slot = (self.count - 1 - age) % self.capacity
+        return self.times[slot], self.values[slot * self.width:(slot + 1) * self.width]
+
+    def rates(self, window=1):
+        """
+        Return per-second rates between the last sample and the one taken
+        'window' samples earlier. Counter resets produce None.
+        """
+        window = min(window, len(self) - 1)
+        if window < 1:
+            return [None] * self.width
+        t1, last = self.sample()
+        t0, first = self.sample(window)
+        elapsed = t1 - t0
+        rates = []
+        for v1, v0 in zip(last, first):
+            rates.append((v1 - v0) / elapsed if v1 >= v0 and elapsed > 0 else None)
+        return rates
+
+
+class EthtoolStats:
+    """
+    Read selected 'ethtool -S' counters of a netdev with a single ioctl
+    """
+    def __init__ (self, device, pattern):
+        self.device = device
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        names = self.__get_strings__()
+        self.indexes = [i for i, name in enumerate(names) if pattern.match(name)]
+        self.names = [names[i] for i in self.indexes]
+        self.stats = ctypes.create_string_buffer(8 + 8 * len(names))
+        struct.pack_into('II', self.stats, 0, ETHTOOL_GSTATS, len(names))
+        self.n_stats = len(names)
+
+    def __ioctl__(self, buf):
+        ifreq = struct.pack('16sP', self.device.encode(), ctypes.addressof(buf))
+        fcntl.ioctl(self.sock.fileno(), SIOCETHTOOL, ifreq)
+
+    def __get_strings__(self):
+        drvinfo = ctypes.create_string_buffer(DRVINFO_LEN)
+        struct.pack_into('I', drvinfo, 0, ETHTOOL_GDRVINFO)
+        self.__ioctl__(drvinfo)
+        n_stats = struct.unpack_from('I', drvinfo, DRVINFO_N_STATS)[0]
+
+        strings = ctypes.create_string_buffer(12 + ETH_GSTRING_LEN * n_stats)
+        struct.pack_into('III', strings, 0, ETHTOOL_GSTRINGS, ETH_SS_STATS, n_stats)
+        self.__ioctl__(strings)
+        names = []
+        for i in range(n_stats):
+            name = strings.raw[12 + i * ETH_GSTRING_LEN:12 + (i + 1) * ETH_GSTRING_LEN]
+            names.append(name.split(b'\0', 1)[0].decode())
+        return names
+
+    def read(self):
+        self.__ioctl__(self.stats)
+        values = struct.unpack_from('{}Q'.format(self.n_stats), self.stats, 8)
+        return [values[i] for i in self.indexes]
+
+    def close(self):
+        self.sock.close()
+
+
+class Sampler:
+    """
+    Collect counters of the given ports. Sysfs attributes are kept open
+    and re-read with pread().
+    """
+    def __init__ (self, ports, capacity=3600):
+        self.metrics = []
+        self.fds = []
+        self.ethtool = []
+        self.cpu = 0.0
+        self.duration = 0.0
+        # Values are read in order: sysfs attributes, then ethtool counters
+        pfc_metrics = []
+
+        for port in ports:
+            topology = port_topology(port)
+            if not topology:
+                continue
+            for device in sorted(set([topology['device'], topology['roce_device']])):
+                for stat in NETDEV_STATS:
+                    self.__add_attr__("/sys/class/net/{}/statistics/{}".format(device, stat),
+                                      "bf_netdev_{}".format(stat), {'port': port, 'device': device})
+            ibdev = "mlx5_{}".format(port)
+            for counter in ECN_COUNTERS:
+                self.__add_attr__("/sys/class/infiniband/{}/ports/1/hw_counters/{}".format(ibdev, counter),
+                                  "bf_roce_{}".format(counter), {'port': port, 'ibdev': ibdev})
+            try:
+                stats = EthtoolStats(topology['roce_device'], PFC_STATS)
+            except OSError as e:
+                network_admin.bf_log ("Failed to read ethtool counters of {}. Exception: {}".format(topology['roce_device'], e), verbose)
+                continue
+            self.ethtool.append(stats)
+            for name in stats.names:
+                pfc_metrics.append(("bf_pfc_{}".format(name), {'port': port, 'device': topology['roce_device']}))
+
+        self.metrics += pfc_metrics
+        self.ring = RingBuffer(len(self.metrics), capacity)
+
+    def __add_attr__(self, path, name, labels):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        self.fds.append(fd)
+        self.metrics.append((name, labels))
+
+    def sample(self):
+        """
+        Read all counters into the ring buffer
+        """
+        start = time.monotonic()
+        cpu = time.process_time()
+        values = []
+        for fd in self.fds:
+            try:
+                values.append(float(os.pread(fd, 32, 0)))
+            except (OSError, ValueError):
+                values.append(float('nan'))
+        for stats in self.ethtool:
+            try:
+                values.extend(stats.read())
+            except OSError:
+                values.extend([float('nan')] * len(stats.names))
+        self.ring.append(time.time(), values)
+        self.cpu += time.process_time() - cpu
+        self.duration = time.monotonic() - start
+
+    def export(self, path, window=1, elapsed=None, loop_cpu=None):
+        """
+        Write node-exporter textfile atomically. Every metric family is
+        written as one block: HELP, TYPE and all its samples.
+        elapsed and loop_cpu are the wall and CPU time of the sampling loop.
+        """
+        timestamp, values = self.ring.sample()
+        rates = self.ring.rates(window)
+        totals = {}
+        rate_samples = {}
+        for (name, labels), value, rate in zip(self.metrics, values, rates):
+            label = ','.join('{}="{}"'.format(key, labels[key]) for key in sorted(labels))
+            totals.setdefault(name, []).append("{}_total{{{}}} {:.0f}".format(name, label, value))
+            if rate is not None:
+                rate_samples.setdefault(name, []).append("{}_rate{{{}}} {:.3f}".format(name, label, rate))
+
+        lines = []
+        for name in totals:
+            lines.append("# HELP {}_total Counter value".format(name))
+            lines.append("# TYPE {}_total counter".format(name))
+            lines += totals[name]
+            if name in rate_samples:
+                lines.append("# HELP {}_rate Per second rate over a window of {} samples".format(name, window))
+                lines.append("# TYPE {}_rate gauge".format(name))
+                lines += rate_samples[name]
+
+        lines.append("# HELP bf_telemetry_sample_seconds Duration of the last sample")
+        lines.append("# TYPE bf_telemetry_sample_seconds gauge")
+        lines.append("bf_telemetry_sample_seconds {:.6f}".format(self.duration))
+        lines.append("# HELP bf_telemetry_cpu_seconds_total CPU time spent reading the counters")
+        lines.append("# TYPE bf_telemetry_cpu_seconds_total counter")
+        lines.append("bf_telemetry_cpu_seconds_total {:.6f}".format(self.cpu))
+        if elapsed and loop_cpu is not None:
+            lines.append("# HELP bf_telemetry_cpu_ratio CPU time of the sampling loop per second of wall time")
+            lines.append("# TYPE bf_telemetry_cpu_ratio gauge")
+            lines.append("bf_telemetry_cpu_ratio {:.6f}".format(loop_cpu / elapsed))
+        lines.append("# HELP bf_telemetry_last_sample_timestamp_seconds Time of the last sample")
+        lines.append("# TYPE bf_telemetry_last_sample_timestamp_seconds gauge")
+        lines.append("bf_telemetry_last_sample_timestamp_seconds {:.3f}".format(timestamp))
+
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, 'w') as stream:
+            stream.write('\n'.join(lines) + '\n')
+        os.replace(tmp, path)
+
+    def close(self):
+        for fd in self.fds:
+            os.close(fd)
+        for stats in self.ethtool:
+            stats.close()
+
+
+def port_topology(port):
+    """
+    Resolve port netdev, RoCE netdev and PCI device using BFCONFIG
+    """
+    argv = ['--op', 'roceconfig', '--action', 'show', '--port', port]
+    try:
+        bfconfig = network_admin.BFCONFIG(network_admin.get_parser(argv).parse_args(argv))
+        return {'device': bfconfig.device, 'roce_device': bfconfig.roce_device, 'pci_device': bfconfig.pci_device}
+    except Exception as e:
+        network_admin.bf_log ("ERR: Failed to discover port {} topology. Exception: {}".format(port, e), verbose)
+        return None
+
+
+def main():
+
+    global verbose
+
+    parser = argparse.ArgumentParser(description='Port and RoCE telemetry sampler')
+    parser.add_argument('--ports', nargs='+', choices=network_admin.SUPPORTED_PORTS, help="HCA ports", default=network_admin.SUPPORTED_PORTS)
+    parser.add_argument('--interval', type=float, help="Sampling interval in seconds", default=1.0)
+    parser.add_argument('--capacity', type=int, help="Number of samples kept in memory", default=3600)
+    parser.add_argument('--rate_window', type=int, help="Number of samples used to calculate rates", default=1)
+    parser.add_argument('--export_interval', type=float, help="Textfile update interval in seconds. Default: sampling interval", default=0)
+    parser.add_argument('--textfile', help="Output textfile", default=os.path.join(textfile_dir, textfile_name))
+    parser.add_argument('--count', type=int, help="Stop after this number of samples. 0 - run until stopped", default=0)
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    sampler = Sampler(args.ports, args.capacity)
+    if not sampler.metrics:
+        sys.exit("ERROR: No counters found for ports {}".format(' '.join(args.ports)))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    os.makedirs(os.path.dirname(args.textfile) or '.', exist_ok=True)
+    export_interval = args.export_interval or args.interval
+    start = time.monotonic()
+    # Startup is not included in bf_telemetry_cpu_ratio
+    start_cpu = time.process_time()
+    next_sample = start
+    next_export = start
+    samples = 0
+    while not stop.is_set():
+        sampler.sample()
+        samples += 1
+        now = time.monotonic()
+        if now >= next_export or samples == args.count:
+            sampler.export(args.textfile, args.rate_window, now - start, time.process_time() - start_cpu)
+            next_export += export_interval
+        if verbose:
+            print("sample {}: {} metrics in {:.6f}s".format(samples, len(sampler.metrics), sampler.duration))
+        if args.count and samples >= args.count:
+            break
+        next_sample += args.interval
+        stop.wait(max(0, next_sample - time.monotonic()))
+
+    sampler.close()
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Span tracing for bfb_tool and network_admin.
+
+Spans are recorded only after start() is called. Otherwise span() returns
+a shared no-op object. The trace is written in Chrome trace-event format
+(chrome://tracing, Perfetto) when the program exits, and the top spans by
+self time are printed to stderr.
+"""
+
+import os
+import sys
+import atexit
+import json
+import re
+import threading
+import time
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+# Number of entries in the summary
+TRACE_TOP = 10
+
+enabled = False
+trace_file = None
+events = []
+epoch = 0
+
+
+class Span:
+    """
+    Complete trace event recorded on exit
+    """
+    __slots__ = ['name', 'cat', 'args', 'start']
+
+    def __init__ (self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        events.append((self.name, self.cat, self.start, end - self.start, threading.get_ident(), self.args))
+        return False
+
+
+class NullSpan:
+    """
+    Span used when tracing is disabled
+    """
+    __slots__ = []
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+null_span = NullSpan()
+
+
+def span(name, cat='phase', **args):
+    """
+    Return context manager recording a span. Categories used:
+    phase, exec, file, yaml.
+    """
+    if not enabled:
+        return null_span
+    return Span(name, cat, args)
+
+
+def command_name(cmd):
+    """
+    Span name of a shell command: the program it starts
+    """
+    for command in re.split(r';|&&|\|\|', cmd):
+        words = [word for word in command.split() if '=' not in word]
+        if len(words) > 2 and words[0] in ['bash', 'sh'] and words[1] == '-c':
+            return command_name(' '.join(words[2:]).strip('\'"'))
+        if words and words[0] not in ['cd', 'sudo', 'env']:
+            return os.path.basename(words[0])
+    return cmd
+
+
+def start(path):
+    """
+    Enable tracing. The trace is written to path at exit.
+    """
+    global enabled, trace_file, epoch
+    trace_file = path
+    epoch = time.perf_counter_ns()
+    enabled = True
+    atexit.register(finish)
+
+
+def summary(top=TRACE_TOP):
+    """
+    Aggregate spans by category and name. Self time excludes the nested
+    spans of the same thread.
+    Return list of (cat, name, count, total_ns, self_ns) sorted by self time.
+    """
+    by_thread = {}
+    for event in events:
+        by_thread.setdefault(event[4], []).append(event)
+
+    stats = {}
+    for thread_events in by_thread.values():
+        thread_events.sort(key=lambda event: (event[2], -event[3]))
+        stack = []
+        for name, cat, ts, dur, tid, args in thread_events:
+            while stack and stack[-1][0] <= ts:
+                stack.pop()
+            if stack:
+                stack[-1][1][2] -= dur
+            entry = stats.setdefault((cat, name), [0, 0, 0])
+            entry[0] += 1
+            entry[1] += dur
+            entry[2] += dur
+            stack.append((ts + dur, entry))
+
+    result = [(cat, name, count, total, self_time) for (cat, name), (count, total, self_time) in stats.items()]
+    result.sort(key=lambda item: -item[4])
+    return result[:top]
+
+
+def format_summary(top=TRACE_TOP):
+    lines = ["{:<8} {:<32} {:>6} {:>12} {:>12}".format('cat', 'name', 'count', 'total_ms', 'self_ms')]
+    for cat, name, count, total, self_time in summary(top):
+        lines.append("{:<8} {:<32} {:>6} {:>12.3f} {:>12.3f}".format(cat, name[:32], count, total / 1e6, self_time / 1e6))
+    return '\n'.join(lines)
+
+
+def write(path):
+    pid = os.getpid()
+    trace = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+              'args': {'name': os.path.basename(sys.argv[0])}}]
+    for name, cat, ts, dur, tid, args in events:
+        trace.append({'name': name, 'cat': cat, 'ph': 'X', 'pid': pid, 'tid': tid,
+                      'ts': (ts - epoch) / 1000, 'dur': dur / 1000, 'args': args})
+    with open(path, 'w') as stream:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, stream)
+
+
+def finish():
+    """
+    Write the trace file and print the summary to stderr
+    """
+    global enabled
+    if not enabled:
+        return
+    enabled = False
+    try:
+        write(trace_file)
+    except OSError as e:
+        print("Failed to write trace file {}: {}".format(trace_file, e), file=sys.stderr)
+    print(format_summary(), file=sys.stderr)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+"""
+Multithreaded xz decompression for BFB image extraction.
+
+xz files compressed with several blocks (xz -T, --block-size) carry the
+size of every block in the stream index. The blocks of a seekable input
+are decoded in parallel, each as a single block stream, and written in
+order. Other input (a pipe, one block, one CPU) is decompressed by the xz
+found later in PATH with 'xz -T0 -d'.
+
+Installed as 'xz' first in PATH it serves 'tar xJf': 'xz -d' from stdin is
+handled here and any other use runs the xz found later in PATH. With
+BF_XZ_STATS set, every parallel run appends its throughput to that file
+as a JSON line. BF_XZ_THREADS overrides the number of threads, by default the number
+of CPUs.
+"""
+
+import os
+import sys
+import argparse
+import collections
+import concurrent.futures
+import json
+import lzma
+import struct
+import time
+import zlib
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = "bf_xz"
+
+SUPPORTED_OPERATIONS = ['decompress', 'list']
+
+XZ_MAGIC = b'\xfd7zXZ\x00'
+FOOTER_MAGIC = b'YZ'
+HEADER_SIZE = 12
+FOOTER_SIZE = 12
+STATS_ENV = 'BF_XZ_STATS'
+THREADS_ENV = 'BF_XZ_THREADS'
+# 'xz -d' options that do not change the output
+COMPAT_OPTIONS = ['-d', '--decompress', '--uncompress', '-c', '--stdout', '--to-stdout',
+                  '-q', '--quiet', '-f', '--force']
+
+verbose = False
+
+
+def log(msg):
+    print("{}: {}".format(prog, msg), file=sys.stderr, flush=True)
+
+
+def round4(size):
+    return (size + 3) & ~3
+
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+        if shift > 63:
+            raise ValueError("Bad xz index")
+
+
+def varint(value):
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def parse_index(index):
+    """
+    Return [(unpadded size, uncompressed size)] of an xz index
+    """
+    if index[0] != 0 or struct.unpack('<I', index[-4:])[0] != zlib.crc32(index[:-4]):
+        raise ValueError("Bad xz index")
+    count, pos = read_varint(index, 1)
+    records = []
+    for _ in range(count):
+        unpadded, pos = read_varint(index, pos)
+        uncompressed, pos = read_varint(index, pos)
+        records.append((unpadded, uncompressed))
+    return records
+
+
+def stream_layout(fd, size):
+    """
+    Return [(stream header, [(offset, unpadded size, uncompressed size)])]
+    of the xz streams in a file, read from the end. None if the file is
+    not a complete xz file.
+    """
+    streams = []
+    pos = size
+    try:
+        while pos > 0:
+            footer = os.pread(fd, FOOTER_SIZE, pos - FOOTER_SIZE)
+            if footer[-4:] == b'\0\0\0\0':
+                # Stream padding
+                pos -= 4
+                continue
+            if len(footer) != FOOTER_SIZE or footer[10:] != FOOTER_MAGIC:
+                return None
+            index_size = (struct.unpack('<I', footer[4:8])[0] + 1) * 4
+            index_start = pos - FOOTER_SIZE - index_size
+            records = parse_index(os.pread(fd, index_size, index_start))
+            stream_start = index_start - sum(round4(unpadded) for unpadded, _ in records) - HEADER_SIZE
+            if stream_start < 0:
+                return None
+            header = os.pread(fd, HEADER_SIZE, stream_start)
+            if header[:6] != XZ_MAGIC or header[6:8] != footer[8:10]:
+                return None
+            blocks = []
+            offset = stream_start + HEADER_SIZE
+            for unpadded, uncompressed in records:
+                blocks.append((offset, unpadded, uncompressed))
+                offset += round4(unpadded)
+            streams.insert(0, (header, blocks))
+            pos = stream_start
+    except (OSError, ValueError, IndexError):
+        return None
+    return streams
+
+
+def block_stream(header, block, unpadded, uncompressed):
+    """
+    Wrap one block into a complete xz stream
+    """
+    index = b'\0' + varint(1) + varint(unpadded) + varint(uncompressed)
+    index += b'\0' * (-len(index) % 4)
+    index += struct.pack('<I', zlib.crc32(index))
+    backward = struct.pack('<I', len(index) // 4 - 1)
+    flags = header[6:8]
+    footer = struct.pack('<I', zlib.crc32(backward + flags)) + backward + flags + FOOTER_MAGIC
+    return header + block + index + footer
+
+
+class XzDecompressor:
+    def __init__ (self, threads=0):
+        self.threads = threads or int(os.environ.get(THREADS_ENV, 0)) or os.cpu_count() or 1
+        self.stats = {
+            'mode': 'parallel',
+            'threads': self.threads,
+            'blocks': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'seconds': 0,
+            'mb_per_s': 0,
+        }
+
+    def __write__(self, out, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(out, view)
+            view = view[written:]
+        self.stats['bytes_out'] += len(data)
+
+    def __block__(self, fd, header, offset, unpadded, uncompressed):
+        block = os.pread(fd, round4(unpadded), offset)
+        data = lzma.decompress(block_stream(header, block, unpadded, uncompressed), format=lzma.FORMAT_XZ)
+        if len(data) != uncompressed:
+            raise lzma.LZMAError("Block at {} decompressed to {} bytes, expected {}".format(offset, len(data), uncompressed))
+        return data
+
+    def __parallel__(self, fd, out, streams):
+        blocks = [(header,) + block for header, stream_blocks in streams for block in stream_blocks]
+        self.stats['blocks'] = len(blocks)
+        # Blocks are written in order. At most two blocks per thread are held in memory.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.threads) as executor:
+            pending = collections.deque()
+            for block in blocks:
+                pending.append(executor.submit(self.__block__, fd, *block))
+                if len(pending) >= self.threads * 2:
+                    self.__write__(out, pending.popleft().result())
+            while pending:
+                self.__write__(out, pending.popleft().result())
+
+    def layout(self, fd):
+        """
+        Return the xz streams of fd if its blocks can be decoded in
+        parallel. None for a pipe, a single block or a single thread.
+        """
+        if self.threads < 2:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if os.lseek(fd, 0, os.SEEK_CUR) or not size:
+                return None
+        except OSError:
+            return None
+        streams = stream_layout(fd, size)
+        if not streams or sum(len(blocks) for header, blocks in streams) < 2:
+            return None
+        self.stats['bytes_in'] = size
+        return streams
+
+    def decompress(self, fd, out, streams):
+        start = time.monotonic()
+        self.__parallel__(fd, out, streams)
+        self.stats['seconds'] = round(time.monotonic() - start, 3)
+        if self.stats['seconds']:
+            self.stats['mb_per_s'] = round(self.stats['bytes_out'] / self.stats['seconds'] / 1000000, 1)
+        return self.stats
+
+
+def save_stats(stats):
+    path = os.environ.get(STATS_ENV)
+    if not path:
+        return
+    try:
+        with open(path, 'a') as stream:
+            stream.write(json.dumps(stats) + '\n')
+    except OSError:
+        pass
+
+
+def read_stats(path):
+    """
+    Sum the runs recorded in a BF_XZ_STATS file. None if there are none.
+    """
+    runs = []
+    try:
+        with open(path, 'r') as stream:
+            runs = [json.loads(line) for line in stream if line.strip()]
+    except (OSError, ValueError):
+        pass
+    if not runs:
+        return None
+    total = {
+        'runs': len(runs),
+        'mode': ','.join(sorted(set(run['mode'] for run in runs))),
+        'threads': max(run['threads'] for run in runs),
+        'blocks': sum(run['blocks'] for run in runs),
+        'bytes_in': sum(run['bytes_in'] for run in runs),
+        'bytes_out': sum(run['bytes_out'] for run in runs),
+        'seconds': round(sum(run['seconds'] for run in runs), 3),
+        'mb_per_s': 0,
+    }
+    if total['seconds']:
+        total['mb_per_s'] = round(total['bytes_out'] / total['seconds'] / 1000000, 1)
+    return total
+
+
+def exec_xz(argv):
+    """
+    Replace this process with the next xz in PATH. Return exit code on failure.
+    """
+    own = os.path.dirname(os.path.abspath(sys.argv[0]))
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        path = os.path.join(directory, 'xz')
+        if os.path.abspath(directory) != own and os.access(path, os.X_OK):
+            if verbose:
+                log("Running {} {}".format(path, ' '.join(argv)))
+            os.execv(path, ['xz'] + argv)
+    log("ERROR: xz was not found")
+    return 1
+
+
+def run(fd, threads=0):
+    """
+    Decompress fd to stdout. Return exit code.
+    """
+    decompressor = XzDecompressor(threads)
+    streams = decompressor.layout(fd)
+    if not streams:
+        # The stream decoder of xz is faster than lzma in Python
+        if fd != sys.stdin.fileno():
+            os.dup2(fd, sys.stdin.fileno())
+        return exec_xz(['-T0', '-d'])
+    try:
+        stats = decompressor.decompress(fd, sys.stdout.fileno(), streams)
+    except BrokenPipeError:
+        # The reader has what it needs, e.g. tar --occurrence
+        return 0
+    except (lzma.LZMAError, OSError) as e:
+        log("ERROR: {}".format(e))
+        return 1
+    save_stats(stats)
+    if verbose:
+        log(json.dumps(stats))
+    return 0
+
+
+def xz_compat(argv):
+    """
+    Behave as 'xz -d' from stdin. Run the next xz in PATH for anything else.
+    """
+    if argv and all(arg in COMPAT_OPTIONS for arg in argv) and ('-d' in argv or '--decompress' in argv or '--uncompress' in argv):
+        return run(sys.stdin.fileno())
+
+    return exec_xz(argv)
+
+
+def main():
+
+    global verbose
+
+    if os.path.basename(sys.argv[0]) == 'xz':
+        sys.exit(xz_compat(sys.argv[1:]))
+
+    parser = argparse.ArgumentParser(description='Multithreaded xz decompression')
+    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS,
+                        help="decompress: write the decompressed file to stdout. list: print the block layout")
+    parser.add_argument('-T', '--threads', type=int, help="Decompression threads. 0 - number of CPUs", default=0)
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+    parser.add_argument('file', nargs='?', help="xz file. Default: stdin")
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    fd = os.open(args.file, os.O_RDONLY) if args.file else sys.stdin.fileno()
+
+    if args.op == 'list':
+        streams = stream_layout(fd, os.fstat(fd).st_size)
+        if streams is None:
+            log("ERROR: Block layout is not available")
+            sys.exit(1)
+        print(json.dumps([{'blocks': [{'offset': offset, 'unpadded': unpadded, 'uncompressed': uncompressed}
+                                      for offset, unpadded, uncompressed in blocks]}
+                          for header, blocks in streams], indent=4))
+        sys.exit(0)
+
+    sys.exit(run(fd, args.threads))
+
+
+if __name__ == '__main__':
+        main()
@@ -37,6 +37,10 @@ import time
 import re
 import hashlib
 import errno
+import struct
+import zlib
+import bf_trace
+import bf_xz
 
 __author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
 __version__ = "1.0"
@@ -45,17 +49,29 @@ os.environ['PATH'] = '/usr/sbin:/usr/bin:/sbin:/bin'
 
 verbose = False
 
+KEXEC_REBOOT = "/sbin/kexec_reboot"
+# Shared by both roots, read after the kexec reboot
+ACTIVATION_FILE = "/common/bfb_activation.json"
+BF_XZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bf_xz.py")
+# BFB image header, as in bf-upgrade.env/bfb_recv.py
+BFB_MAGIC = 0x13026642
+BFB_HEADER_SIZE = 24
+BFB_MAX_PADDING = 1 << 20
+GZIP_MAGIC = b'\x1f\x8b'
+
 def get_status_output(cmd, verbose=False):
     rc, output = (0, '')
 
     if verbose:
         bf_log("Running command:", cmd)
 
-    try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT,
-                                         shell=True, universal_newlines=True)
-    except subprocess.CalledProcessError as e:
-        rc, output = (e.returncode, e.output.strip())
+    with bf_trace.span(bf_trace.command_name(cmd), 'exec', cmd=cmd) as span:
+        try:
+            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT,
+                                             shell=True, universal_newlines=True)
+        except subprocess.CalledProcessError as e:
+            rc, output = (e.returncode, e.output.strip())
+        span.set(rc=rc)
 
     if rc and verbose:
         bf_log("Running {} failed (error[{}])".format(cmd, rc))
@@ -75,10 +91,204 @@ def get_other_root_dev():
         return "2"
 
 
+def get_boot_id():
+    try:
+        with open('/proc/sys/kernel/random/boot_id', 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def nic_fw_reset_required():
+    """
+    True if the burned NIC firmware is not the running one or flint fails
+    """
+    fw = ""
+    running = ""
+    rc, output = get_status_output("flint -d /dev/mst/mt*_pciconf0 -qq q", False)
+    if rc:
+        return True
+    for line in output.splitlines():
+        if line.startswith('FW Version(Running):'):
+            running = line.split()[-1]
+        elif line.startswith('FW Version:'):
+            fw = line.split()[-1]
+    return not fw or (running != "" and running != fw)
+
+
+def kexec_activate(root_dev):
+    """
+    Load the kernel of root_dev and start the kexec reboot into it.
+    Return the activation record or None if the kernel was not loaded.
+    """
+    start = time.time()
+    rc, output = get_status_output("{} -l -r {}".format(KEXEC_REBOOT, root_dev), False)
+    if rc:
+        bf_log("ERROR: kexec load of {} failed: {}".format(root_dev, output))
+        return None
+
+    activation = {
+        "method": "kexec",
+        "root": root_dev,
+        "boot_id": get_boot_id(),
+        "kexec_load_time": round(time.time() - start, 3),
+        "start": time.time(),
+    }
+    try:
+        with open(ACTIVATION_FILE, 'w') as f:
+            json.dump(activation, f)
+    except OSError:
+        pass
+
+    # systemd stops the services and boots the loaded kernel
+    rc, output = get_status_output("systemctl --no-block kexec", False)
+    if rc:
+        bf_log("ERROR: systemctl kexec failed: {}".format(output))
+        get_status_output("kexec -u", False)
+        if os.path.exists(ACTIVATION_FILE):
+            os.remove(ACTIVATION_FILE)
+        return None
+
+    return activation
+
+
+def get_activation():
+    """
+    Return the record of the last kexec activation with the boot to service
+    time on the first boot after it, or None
+    """
+    try:
+        with open(ACTIVATION_FILE, encoding='utf-8') as f:
+            activation = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    boot_id = get_boot_id()
+    if "boot_to_service" in activation:
+        return activation if activation.get("service_boot_id") == boot_id else None
+    if activation.get("boot_id") == boot_id:
+        # Not rebooted yet
+        return activation
+
+    # multi-user.target reached, in microseconds since the boot
+    rc, output = get_status_output("systemctl show -p ActiveEnterTimestampMonotonic --value multi-user.target", False)
+    try:
+        ready = int(output.strip()) / 1000000
+        with open('/proc/uptime', 'r') as f:
+            booted = time.time() - float(f.read().split()[0])
+    except (ValueError, OSError):
+        return activation
+    if rc or not ready:
+        return activation
+
+    activation["service_boot_id"] = boot_id
+    activation["boot_to_service"] = round(booted + ready - activation["start"], 3)
+    try:
+        with open(ACTIVATION_FILE, 'w') as f:
+            json.dump(activation, f)
+    except OSError:
+        pass
+    return activation
+
+
+def xz_env(dirpath):
+    """
+    Shell exports that make tar -J decompress with bf_xz on all CPUs and
+    record its throughput in dirpath/xz.stats
+    """
+    if not os.access(BF_XZ, os.X_OK):
+        return ""
+    bindir = os.path.join(dirpath, "xz-bin")
+    try:
+        os.mkdir(bindir)
+        os.symlink(BF_XZ, os.path.join(bindir, "xz"))
+    except OSError:
+        return ""
+    return "export PATH={}:$PATH {}={}; ".format(bindir, bf_xz.STATS_ENV, os.path.join(dirpath, "xz.stats"))
+
+
+def validate_bfb(filename):
+    """
+    Check the BFB structure by reading only the image headers and the ends
+    of the compressed images: the magic of every header, the image lengths
+    add up to the file size, the gzip trailer and the xz stream footer.
+    Concatenated BFBs are walked one after another.
+    Return None if the BFB is valid, otherwise the error.
+    """
+    with bf_trace.span('validate_bfb', 'file', path=filename), open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        pos = 0
+        images = 0
+        last = False
+        while pos < size:
+            f.seek(pos)
+            header = f.read(BFB_HEADER_SIZE)
+            if last:
+                # Another BFB, e.g. the configuration BFB concatenated to the
+                # install BFB, or zero padding to a block size
+                if len(header) >= 4 and struct.unpack('<I', header[:4])[0] == BFB_MAGIC:
+                    last = False
+                else:
+                    f.seek(pos)
+                    if size - pos > BFB_MAX_PADDING or f.read(size - pos).strip(b'\0'):
+                        return "{} bytes after the last image".format(size - pos)
+                    break
+            if len(header) < BFB_HEADER_SIZE:
+                return "truncated header of image {}".format(images)
+            word0, word1, word2 = struct.unpack('<QQQ', header)
+            if word0 & 0xffffffff != BFB_MAGIC:
+                return "bad magic 0x{:08x} in image {} at {}".format(word0 & 0xffffffff, images, pos)
+            header_len = ((word0 >> 48) & 0xff) * 8
+            if header_len < BFB_HEADER_SIZE:
+                return "bad header length {} in image {}".format(header_len, images)
+            image_len = word1 & 0xffffffff
+            image_id = (word1 >> 32) & 0xff
+            start = pos + header_len
+            if start + image_len > size:
+                return "image {} (id {}) is truncated: {} of {} bytes".format(images, image_id, max(0, size - start), image_len)
+
+            f.seek(start)
+            magic = f.read(len(bf_xz.XZ_MAGIC))
+            if magic.startswith(GZIP_MAGIC):
+                # CRC32 and the size of the uncompressed data
+                f.seek(start + image_len - 8)
+                if image_len < 18 or struct.unpack('<II', f.read(8))[1] == 0:
+                    return "image {} (id {}): bad gzip trailer".format(images, image_id)
+            elif magic == bf_xz.XZ_MAGIC:
+                f.seek(start + image_len - bf_xz.FOOTER_SIZE)
+                footer = f.read(bf_xz.FOOTER_SIZE)
+                if footer[10:] != bf_xz.FOOTER_MAGIC or struct.unpack('<I', footer[:4])[0] != zlib.crc32(footer[4:10]):
+                    return "image {} (id {}): bad xz stream footer".format(images, image_id)
+
+            pos = min(start + ((image_len + 7) & ~7), size)
+            last = word2 == 0
+            images += 1
+        if not images:
+            return "empty file"
+        if not last:
+            return "truncated after image {}".format(images - 1)
+    return None
+
+
+def validate_xz(filename):
+    """
+    Check the stream footers and the index of an xz file. Return None or the error.
+    """
+    with bf_trace.span('validate_xz', 'file', path=filename):
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            streams = bf_xz.stream_layout(fd, os.fstat(fd).st_size)
+        finally:
+            os.close(fd)
+    if not streams:
+        return "{}: xz stream footer or index is missing or corrupt".format(os.path.basename(filename))
+    return None
+
+
 def get_checksum(filename):
     hash = "invalid"
     try:
-        with open(filename, "rb") as f:
+        with bf_trace.span('checksum', 'file', path=filename), open(filename, "rb") as f:
             bytes = f.read()
             hash = hashlib.sha256(bytes).hexdigest()
     except IOError as e:
@@ -142,6 +352,13 @@ def fw_get_bfb_info(filename):
         bf_log("ERROR: File {} does not exist".format(filename))
         return json.dumps(ret)
 
+    # Before hashing and extracting it
+    error = validate_bfb(filename)
+    if error:
+        bf_log("ERROR: {} is not a valid BFB: {}".format(filename, error))
+        ret["error"] = error
+        return json.dumps(ret)
+
     if os.path.exists("/etc/bfb_version.json"):
         with open("/etc/bfb_version.json", encoding='utf-8') as versions:
             current_versions = json.load(versions)
@@ -165,14 +382,14 @@ def fw_get_bfb_info(filename):
 
     if not os.path.exists(filename + ".versions"):
         dirpath = tempfile.mkdtemp()
-        cmd = "cd {d}; \
+        cmd = "{x}cd {d}; \
                 mlx-mkbfb -x {f}; \
                 mkdir initramfs; \
                 cd initramfs; \
                 gzip -d < ../dump-initramfs-v0 | cpio -id; \
                 cd ubuntu; \
-                tar xJf image.tar.xz ./etc/bfb_version.json; \
-                mv ./etc/bfb_version.json {f}.versions".format(d=dirpath, f=filename)
+                tar --occurrence=1 -xJf image.tar.xz ./etc/bfb_version.json; \
+                mv ./etc/bfb_version.json {f}.versions".format(x=xz_env(dirpath), d=dirpath, f=filename)
         rc, output = get_status_output(cmd, False)
         shutil.rmtree(dirpath)
         if rc:
@@ -190,6 +407,9 @@ def fw_get_bfb_info(filename):
                 if "version" in current_versions:
                     if ret["version"] == current_versions["version"]:
                         ret["active"] = True
+                        activation = get_activation()
+                        if activation:
+                            ret["activation"] = activation
                         if "next" in current_versions:
                             ret["next"] = current_versions["next"]
                         return json.dumps(ret)
@@ -219,16 +439,37 @@ def fw_activate_bfb(filename, now):
     if not os.path.exists(filename):
         return json.dumps(ret)
 
+    error = validate_bfb(filename)
+    if error:
+        bf_log("ERROR: {} is not a valid BFB: {}".format(filename, error))
+        ret["error"] = error
+        return json.dumps(ret)
+
     dirpath = tempfile.mkdtemp()
     cmd = "cd {d}; \
             mlx-mkbfb -x {f}; \
             mkdir initramfs; \
             cd initramfs; \
-            gzip -d < ../dump-initramfs-v0 | cpio -id; \
+            gzip -d < ../dump-initramfs-v0 | cpio -id".format(d=dirpath, f=filename)
+    rc, output = get_status_output(cmd, False)
+
+    # install.sh starts writing the standby root before it reaches the end of the image
+    image = os.path.join(dirpath, "initramfs", "ubuntu", "image.tar.xz")
+    if os.path.exists(image):
+        error = validate_xz(image)
+        if error:
+            bf_log("ERROR: {} is not a valid BFB: {}".format(filename, error))
+            shutil.rmtree(dirpath)
+            ret["error"] = error
+            return json.dumps(ret)
+
+    # The image.tar.xz extraction of install.sh runs the xz first in PATH
+    cmd = "{x}cd {d}/initramfs; \
             ln -snf `pwd`/ubuntu /ubuntu; \
             ERASE_EMMC=no ERASE_SSD=no ERASE_PARTITIONS=no /ubuntu/install.sh; \
-            /bin/rm -f /ubuntu".format(d=dirpath, f=filename)
+            /bin/rm -f /ubuntu".format(x=xz_env(dirpath), d=dirpath)
     rc, output = get_status_output(cmd, False)
+    xz_stats = bf_xz.read_stats(os.path.join(dirpath, "xz.stats"))
     shutil.rmtree(dirpath)
     if rc:
         if verbose:
@@ -239,6 +480,8 @@ def fw_activate_bfb(filename, now):
         "success": True,
         "reset_required": True
     }
+    if xz_stats:
+        ret["xz"] = xz_stats
 
     # NIC FW update
     dirpath = tempfile.mkdtemp()
@@ -259,6 +502,20 @@ def fw_activate_bfb(filename, now):
         with open("/etc/bfb_version.json", 'w') as versions:
             json.dump(current_versions, versions)
 
+    if now:
+        # A pending NIC firmware needs the cold boot
+        if nic_fw_reset_required():
+            bf_log("NIC Firmware reset is required. BFB is activated on the next reset")
+            ret["activation"] = "reset"
+        else:
+            activation = kexec_activate("/dev/mmcblk0p{}".format(other_root_dev))
+            if activation:
+                ret["reset_required"] = False
+                ret["activation"] = "kexec"
+                ret["kexec_load_time"] = activation["kexec_load_time"]
+            else:
+                ret["activation"] = "reset"
+
     return json.dumps(ret)
 
 
@@ -37,6 +37,7 @@ import time
 import re
 import errno
 import bfb_admin
+import bf_trace
 
 __author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
 __version__ = "1.0"
@@ -81,6 +82,7 @@ def main():
     parser.add_argument('--op', required=True, choices=SUPPORTED_OPERATIONS, help="Operation")
     parser.add_argument('--bfb', help="path to the BFB file")
     parser.add_argument('--now', action='store_true', help="Activate BFB now", default=False)
+    parser.add_argument('--trace', metavar='FILE', help="Write Chrome trace of the operation to FILE and print the slowest spans")
     parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
     parser.add_argument('--version', action='store_true', help='Display program version information and exit')
 
@@ -94,6 +96,9 @@ def main():
     if verbose:
         print(args)
 
+    if args.trace:
+        bf_trace.start(args.trace)
+
     if args.verbose:
         print ("Operation: ", args.op)
 
@@ -105,17 +110,18 @@ def main():
         bfb_admin.bf_log(ret["output"], prog, rc)
         sys.exit(rc)
 
-    if args.op == 'fw_get_bfb_info':
-        ret = json.loads(bfb_admin.fw_get_bfb_info(args.bfb))
+    with bf_trace.span(args.op):
+        if args.op == 'fw_get_bfb_info':
+            ret = json.loads(bfb_admin.fw_get_bfb_info(args.bfb))
 
-    elif args.op == 'fw_activate_bfb':
-        ret = json.loads(bfb_admin.fw_activate_bfb(args.bfb, args.now))
+        elif args.op == 'fw_activate_bfb':
+            ret = json.loads(bfb_admin.fw_activate_bfb(args.bfb, args.now))
 
-    elif args.op == 'fw_get_caps':
-        ret = json.loads(bfb_admin.fw_get_caps())
+        elif args.op == 'fw_get_caps':
+            ret = json.loads(bfb_admin.fw_get_caps())
 
-    elif args.op == 'fw_recover':
-        ret = json.loads(bfb_admin.fw_recover())
+        elif args.op == 'fw_recover':
+            ret = json.loads(bfb_admin.fw_recover())
 
     if ret["success"] == False:
         rc = 1
@@ -49,13 +49,19 @@ rlog()
 {
     msg=$(echo "$*" | sed 's/INFO://;s/ERROR:/ERR/;s/WARNING:/WARN/')
     if [ -n "$rshimlog" ]; then
+        if [ -n "$LOG_MUX_FD" ] && log_mux_write R "$msg"; then
+            return
+        fi
         $rshimlog "$msg"
     fi
 }
 
 ilog()
 {
-    msg="[$(date +%H:%M:%S)] $*"
+    printf -v msg '[%(%H:%M:%S)T] %s' -1 "$*"
+    if [ -n "$LOG_MUX_FD" ] && log_mux_write L "$msg"; then
+        return
+    fi
     echo "$msg" >> $LOG
     echo "$msg" > /dev/ttyAMA0
     echo "$msg" > /dev/hvc0
@@ -67,9 +73,42 @@ log()
     rlog "$*"
 }
 
+# Log multiplexer of bf-upgrade: consoles at 115200 baud do not slow down the installation
+LOG_MUX_ENV=${LOG_MUX_ENV:-"/etc/acpi/actions/bf-upgrade.env/log-mux"}
+if (bash -n $LOG_MUX_ENV 2>/dev/null); then
+    . $LOG_MUX_ENV
+    log_mux_start
+else
+    # log_file <file|-> [label]
+    log_file()
+    {
+        if [[ -n "$2" && "$1" != "-" ]]; then
+            cat "$1" > /dev/hvc0
+            cat "$1" > /dev/ttyAMA0
+        fi
+        cat "$1" >> $LOG
+    }
+fi
+
+# Start, end and exit status of the installation steps in ${LOG%.log}.timing.jsonl
+STEP_TIMING_ENV=${STEP_TIMING_ENV:-"/etc/acpi/actions/bf-upgrade.env/step-timing"}
+if (bash -n $STEP_TIMING_ENV 2>/dev/null); then
+    . $STEP_TIMING_ENV
+    /bin/rm -f $STEP_TIMING_FILE
+else
+    time_step() { "$@"; }
+    time_cmd() { shift; "$@"; }
+    step_timing_summary() { :; }
+fi
+
 is_bf4()
 {
         # Check if the device is a BF4
+        if [ -n "$dpu_gen" ]; then
+                [ "$dpu_gen" == "bf4" ]
+                return
+        fi
+
         if [ "$(lspci -nD 2> /dev/null | grep -w "15b3:a2df" | awk '{print $1}' | head -1)" != "" ]; then
                 return 0
         fi
@@ -126,7 +165,14 @@ fspath=$(readlink -f "$(dirname $0)")
 ROOTFS=${ROOTFS:-$(findmnt -n -o FSTYPE / 2>/dev/null)}
 ROOTFS=${ROOTFS:-ext4}
 
-export cx_pcidev=$(lspci -nD 2> /dev/null | grep 15b3:a2d[26cf] | awk '{print $1}' | head -1)
+# Platform identity is probed once per boot and cached in /run/bf-upgrade.
+# The lspci, mokutil and flint queries below only run for the values it did not provide.
+PLATFORM_PROBE=${PLATFORM_PROBE:-"/etc/acpi/actions/bf-upgrade.env/platform_probe.py"}
+if [[ -z "$PLATFORM_PROBED" && -e "$PLATFORM_PROBE" ]] && command -v python3 > /dev/null 2>&1; then
+	eval "$(python3 $PLATFORM_PROBE --op env 2> /dev/null)"
+fi
+
+export cx_pcidev=${cx_pcidev:-$(lspci -nD 2> /dev/null | grep 15b3:a2d[26cf] | awk '{print $1}' | head -1)}
 export flint_dev=$cx_pcidev
 
 export FLINT=mstflint
@@ -134,13 +180,15 @@ if [ ! -x /usr/bin/mstflint ]; then
 	FLINT=flint
 fi
 
-is_SecureBoot=0
-if (mokutil --sb-state 2>&1 | grep -q "SecureBoot enabled"); then
-        is_SecureBoot=1
+if [ -z "$is_SecureBoot" ]; then
+	is_SecureBoot=0
+	if (mokutil --sb-state 2>&1 | grep -q "SecureBoot enabled"); then
+		is_SecureBoot=1
+	fi
 fi
 
 if [ $is_SecureBoot -eq 1 ]; then
-        mst_dev=$(/bin/ls -1 /dev/mst/mt*_pciconf0 2> /dev/null)
+        mst_dev=${mst_dev:-$(/bin/ls -1 /dev/mst/mt*_pciconf0 2> /dev/null)}
         if [ ! -n "${mst_dev}" ]; then
                 mst start > /dev/null 2>&1
         fi
@@ -148,12 +196,50 @@ if [ $is_SecureBoot -eq 1 ]; then
         FLINT=flint
 fi
 
-export dpu_part_number=$($FLINT -d $flint_dev q full | grep "Part Number:" | awk '{print $NF}')
+export dpu_part_number=${dpu_part_number:-$($FLINT -d $flint_dev q full | grep "Part Number:" | awk '{print $NF}')}
+
+cx_dev_id=${cx_dev_id:-$(lspci -nD -s ${cx_pcidev} 2> /dev/null | awk -F ':' '{print strtonum("0x" $NF)}')}
+pciids=${pciids:-$(lspci -nD 2> /dev/null | grep 15b3:a2d[26cf] | awk '{print $1}')}
+PSID=${PSID:-$($FLINT -d $flint_dev q | grep PSID | awk '{print $NF}')}
+
+if [ -z "$dpu_gen" ]; then
+	case "$(lspci -n -d 15b3: 2> /dev/null | grep -ow 'a2d[26cf]' | sort | head -1)" in
+	a2d2) dpu_gen="bf1" ;;
+	a2d6) dpu_gen="bf2" ;;
+	a2dc) dpu_gen="bf3" ;;
+	a2df) dpu_gen="bf4" ;;
+	esac
+fi
+
+# mlxconfig -e q runs once per device. The debug dump and configure_sfs read the snapshots.
+MLXCONFIG_SNAPSHOT=${MLXCONFIG_SNAPSHOT:-"/etc/acpi/actions/bf-upgrade.env/mlxconfig_snapshot.py"}
+
+use_mlxconfig_snapshot()
+{
+	[ -e "$MLXCONFIG_SNAPSHOT" ] && command -v python3 > /dev/null 2>&1
+}
+
+# mlxconfig_snapshot <snapshot|get|dump|set|invalidate> [options]
+mlxconfig_snapshot()
+{
+	python3 $MLXCONFIG_SNAPSHOT --op "$@" 2> /dev/null
+}
 
-cx_dev_id=$(lspci -nD -s ${cx_pcidev} 2> /dev/null | awk -F ':' '{print strtonum("0x" $NF)}')
-pciids=$(lspci -nD 2> /dev/null | grep 15b3:a2d[26cf] | awk '{print $1}')
-dpu_part_number=$($FLINT -d $flint_dev q full | grep "Part Number:" | awk '{print $NF}')
-PSID=$($FLINT -d $flint_dev q | grep PSID | awk '{print $NF}')
+mlxconfig_dump()
+{
+	local dev=${mst_dev:-$(/bin/ls -1 /dev/mst/mt*_pciconf0 2> /dev/null | head -1)}
+
+	if use_mlxconfig_snapshot && [ -n "$dev" ]; then
+		# The PCI functions are queried in parallel for configure_sfs
+		mlxconfig_snapshot snapshot -d $dev $(printf -- '-d %s ' $pciids)
+		mlxconfig_snapshot dump -d $dev
+	else
+		mlxconfig -d /dev/mst/mt*_pciconf0 -e q
+	fi
+}
+
+# Link event based wait for the HBN interfaces of the SFC-HBN deferred install
+NETDEV_WAIT=${NETDEV_WAIT:-"/etc/acpi/actions/bf-upgrade.env/netdev_wait.py"}
 
 UPDATE_ATF_UEFI=${UPDATE_ATF_UEFI:-"yes"}
 UPDATE_DPU_OS=${UPDATE_DPU_OS:-"yes"}
@@ -187,11 +273,14 @@ ROOT_PARTITION=${device}p2
 
 save_log()
 {
-cat >> $LOG << EOF
+log_file - << EOF
 
 ########################## DMESG ##########################
 $(dmesg -x)
 EOF
+	if function_exists log_mux_sync; then
+		log_mux_sync
+	fi
 	sync
 	for pw in $(grep "PASSWORD=" $LOG | cut -d '=' -f 2 | sed 's/["'\'']//'g)
 	do
@@ -224,18 +313,18 @@ configure_target_os()
 	echo "PermitRootLogin yes" >> /etc/ssh/sshd_config
 
 	# Update HW-dependant files
-	if (lspci -n -d 15b3: | grep -wq 'a2d2'); then
+	if [ "$dpu_gen" == "bf1" ]; then
 		# BlueField-1
 		ln -snf snap_rpc_init_bf1.conf /etc/mlnx_snap/snap_rpc_init.conf
 		# OOB interface does not exist on BlueField-1
 		sed -i -e '/oob_net0/,+1d' /var/lib/cloud/seed/nocloud-net/network-config
-	elif (lspci -n -d 15b3: | grep -wq 'a2d6'); then
+	elif [ "$dpu_gen" == "bf2" ]; then
 		# BlueField-2
 		ln -snf snap_rpc_init_bf2.conf /etc/mlnx_snap/snap_rpc_init.conf
-	elif (lspci -n -d 15b3: | grep -wq 'a2dc'); then
+	elif [ "$dpu_gen" == "bf3" ]; then
 		# BlueField-3
 		apt remove -y --purge mlnx-snap || true
-	elif (lspci -n -d 15b3: | grep -wq 'a2df'); then
+	elif [ "$dpu_gen" == "bf4" ]; then
 		# BlueField-4
 		apt remove -y --purge mlnx-snap || true
 	fi
@@ -299,7 +388,7 @@ EOF
 configure_network()
 {
 	ilog "Configure network for SF interfaces:"
-	num_ports=$(lspci -nD 2> /dev/null | grep 15b3:a2d[26cf] | wc -l)
+	num_ports=$(echo $pciids | wc -w)
 	if [ $num_ports -lt 1 ]; then
 		ilog "No network interfaces found"
 		return
@@ -603,6 +692,19 @@ EOF
 	# Arm the deferred one-shot. The unit is already installed at
 	# /etc/systemd/system/sfc-hbn-deferred-install.service by the sfc-hbn package.
 	systemctl enable sfc-hbn-deferred-install.service
+
+	# Start the deferred install as soon as the bridge ports exist instead of
+	# at its next HBN_IFNAME_WAIT_INTERVAL check. The waiter writes the rest
+	# of HBN_IFNAME_WAIT_TIMEOUT back to the env file, so both together wait
+	# at most the staged timeout.
+	if [ -e "$NETDEV_WAIT" ]; then
+		mkdir -p /etc/systemd/system/sfc-hbn-deferred-install.service.d
+		cat > /etc/systemd/system/sfc-hbn-deferred-install.service.d/50-netdev-wait.conf << EOF
+[Service]
+ExecStartPre=-/usr/bin/python3 $NETDEV_WAIT --op wait --env /etc/mellanox/sfc-hbn-deferred-install.env --timeout ${HBN_IFNAME_WAIT_TIMEOUT} --set_remaining
+EOF
+		ilog "SFC-HBN deferred install waits for the HBN bridge ports with $(basename $NETDEV_WAIT)"
+	fi
 }
 
 create_initramfs()
@@ -614,7 +716,7 @@ create_initramfs()
 
 	ilog "Updating $distro initramfs"
 	initrd=$(cd /boot; /bin/ls -1 initrd.img-* | tail -1 | sed -e "s/.old-dkms//")
-	ilog "$(dracut --force --add-drivers "mlxbf-bootctl sdhci-of-dwcmshc mlxbf-tmfifo dw_mmc-bluefield mlx5_core mlx5_ib mlxfw ib_umad nvme sbsa_gwdt gpio-mlxbf2 gpio-mlxbf3 mlxbf-gige pinctrl-mlxbf3 8021q" --gzip /boot/$initrd ${kver} 2>&1)"
+	ilog "$(time_cmd dracut dracut --force --add-drivers "mlxbf-bootctl sdhci-of-dwcmshc mlxbf-tmfifo dw_mmc-bluefield mlx5_core mlx5_ib mlxfw ib_umad nvme sbsa_gwdt gpio-mlxbf2 gpio-mlxbf3 mlxbf-gige pinctrl-mlxbf3 8021q" --gzip /boot/$initrd ${kver} 2>&1)"
 }
 
 configure_grub()
@@ -643,8 +745,8 @@ configure_grub()
 	       -e "s@'gnulinux-\$version-\$type-\$boot_device_id'@'gnulinux-\$version-\$type-\$boot_device_id' --users ''@" /etc/grub.d/10_linux
 
 	ilog "Creating GRUB configuration"
-	ilog "$(/usr/sbin/grub-install ${device})"
-	ilog "$(/usr/sbin/grub-mkconfig -o /boot/grub/grub.cfg)"
+	ilog "$(time_cmd grub-install /usr/sbin/grub-install ${device})"
+	ilog "$(time_cmd grub-mkconfig /usr/sbin/grub-mkconfig -o /boot/grub/grub.cfg)"
 	ilog "$(/usr/sbin/grub-set-default 0)"
 }
 
@@ -754,20 +856,16 @@ fw_update()
 		fi
 
 		log "INFO: Updating NIC firmware..."
-		${FW_UPDATER} --log /tmp/mlnx_fw_update.log -v \
+		time_cmd mlnx_fw_updater ${FW_UPDATER} --log /tmp/mlnx_fw_update.log -v \
 			--force-fw-update \
 			--fw-dir ${FW_DIR} > /tmp/mlnx_fw_update.out 2>&1
 		rc=$?
 		sync
 		if [ -e /tmp/mlnx_fw_update.out ]; then
-			cat /tmp/mlnx_fw_update.out > /dev/hvc0
-			cat /tmp/mlnx_fw_update.out > /dev/ttyAMA0
-			cat /tmp/mlnx_fw_update.out >> $LOG
+			log_file /tmp/mlnx_fw_update.out "mlnx_fw_update.out"
 		fi
 		if [ -e /tmp/mlnx_fw_update.log ]; then
-			cat /tmp/mlnx_fw_update.log > /dev/hvc0
-			cat /tmp/mlnx_fw_update.log > /dev/ttyAMA0
-			cat /tmp/mlnx_fw_update.log >> $LOG
+			log_file /tmp/mlnx_fw_update.log "mlnx_fw_update.log"
 		fi
 		NIC_FW_UPDATE_DONE=1
 		if [ $rc -ne 0 ] || (grep -q '\-E- Failed' /tmp/mlnx_fw_update.log); then
@@ -849,7 +947,11 @@ update_nic_firmware()
 {
 	if [ $NIC_FW_UPDATE_DONE -eq 0 ]; then
 		fw_update
-		return $?
+		local rc=$?
+		if use_mlxconfig_snapshot; then
+			mlxconfig_snapshot invalidate
+		fi
+		return $rc
 	fi
 }
 
@@ -873,7 +975,7 @@ configure_sfs()
 	: > /etc/mellanox/mlnx-sf.conf
 
 	# Get all PCI IDs for BlueField devices
-	all_pciids=$(lspci -nD 2> /dev/null | grep 15b3:a2d[26cf] | awk '{print $1}')
+	all_pciids=$pciids
 
 	if [ -z "$all_pciids" ]; then
 		return
@@ -882,11 +984,20 @@ configure_sfs()
 	# Check if Socket Direct mode is active (PF_SD_GROUP=1 in mlxconfig)
 	sd_mode=0
 	local mftcfg=mstconfig
+	local pf_sd_group
 	if [ -x /usr/bin/mlxconfig ]; then
 		mftcfg=mlxconfig
 	fi
+	if use_mlxconfig_snapshot; then
+		mlxconfig_snapshot snapshot $(printf -- '-d %s ' $all_pciids)
+	fi
 	for pciid in $all_pciids; do
-		if ($mftcfg -d ${pciid} -e q PF_SD_GROUP 2>/dev/null | grep -o 'PF_SD_GROUP.*' | awk '{print $3}' | grep -q "^1$"); then
+		if use_mlxconfig_snapshot; then
+			pf_sd_group=$(mlxconfig_snapshot get -d ${pciid} PF_SD_GROUP | awk '{print $2}')
+		else
+			pf_sd_group=$($mftcfg -d ${pciid} -e q PF_SD_GROUP 2>/dev/null | grep -o 'PF_SD_GROUP.*' | awk '{print $3}')
+		fi
+		if [ "$pf_sd_group" == "1" ]; then
 			sd_mode=1
 			break
 		fi
@@ -923,7 +1034,7 @@ EOF
 
 configure_ovs()
 {
-	if (lspci -n -d 15b3: | grep -wq 'a2df'); then
+	if [ "$dpu_gen" == "bf4" ]; then
 		if [ -e /etc/mellanox/mlnx-ovs.conf ]; then
 			ilog "Enable OVS DOCA on BlueField-4"
 			sed -i -e "s/OVS_DOCA=.*/OVS_DOCA=yes/" /etc/mellanox/mlnx-ovs.conf
@@ -968,7 +1079,7 @@ BOOT9=NET-OOB-IPV4-HTTP
 PXE_DHCP_CLASS_ID=$DHCP_CLASS_ID
 EOF
 
-	$BFCFG
+	time_cmd bfcfg $BFCFG
 	rc=$?
 	if [ $rc -ne 0 ]; then
 		if (grep -q "boot: failed to get MAC" /tmp/bfcfg.log > /dev/null 2>&1); then
@@ -977,7 +1088,7 @@ EOF
 	fi
 
 	RC=$((RC+rc))
-	cat >> $LOG << EOF
+	log_file - << EOF
 
 ### Adding PXE boot entries: ###
 $(cat /etc/bf.cfg)
@@ -993,7 +1104,7 @@ EOF
 fi
 
 	if [[ -n "$BFCFG" && -e /etc/bf.cfg ]]; then
-		$BFCFG
+		time_cmd bfcfg $BFCFG
 		rc=$?
 		if [ $rc -ne 0 ]; then
 			if (grep -q "boot: failed to get MAC" /tmp/bfcfg.log > /dev/null 2>&1); then
@@ -1002,7 +1113,7 @@ fi
 		fi
 
 		RC=$((RC+rc))
-		cat >> $LOG << EOF
+		log_file - << EOF
 
 ### Applying original bf.cfg: ###
 $(cat /etc/bf.cfg)
@@ -1047,7 +1158,7 @@ UPDATE_NIC_FW_GOLDEN_IMAGE=${UPDATE_NIC_FW_GOLDEN_IMAGE:-"yes"}
 UPDATE_CERTIFICATES=${UPDATE_CERTIFICATES:-"yes"}
 RESET_BMC_RSHIM_LOG=${RESET_BMC_RSHIM_LOG:-"yes"}
 bmc_pref=""
-if (lspci -n -d 15b3: | grep -wq 'a2dc'); then
+if [ "$dpu_gen" == "bf3" ]; then
 	bmc_pref="bf3"
 	cec_sfx="fwpkg"
 	if [ -d /BF3BMC ]; then
@@ -1061,7 +1172,7 @@ if (lspci -n -d 15b3: | grep -wq 'a2dc'); then
 		BMC_PATH=${BMC_PATH:-"/lib/firmware/mellanox/bmc"}
 		CEC_PATH=${CEC_PATH:-"/lib/firmware/mellanox/cec"}
 	fi
-elif (lspci -n -d 15b3: | grep -wq 'a2d6'); then
+elif [ "$dpu_gen" == "bf2" ]; then
 	bmc_pref="bf2"
 	# BF2 does not support Golden Images
 	UPDATE_DPU_GOLDEN_IMAGE="no"
@@ -1371,8 +1482,10 @@ wait_bmc_task_complete()
 	task_status=$(jq '.TaskStatus' $output | tr -d '"')
 
 	if [ "$task_state$task_status" != "CompletedOK" ]; then
-		echo "BMC task failed:"  >> $LOG
-		cat $output >> $LOG
+		{
+			echo "BMC task failed:"
+			cat $output
+		} | log_file -
 		RC=$((RC+1))
 	fi
 	/bin/rm -f $output
@@ -1432,10 +1545,10 @@ update_bmc_fw()
 
 	if [[ $(echo -e "${BMC_MIN_MULTIPART_VERSION}\n${BMC_INSTALLED_VERSION}" | sort -V | head -n1) == "${BMC_MIN_MULTIPART_VERSION}" ]]; then
 		ilog "curl -sSk -u <BMC_USER:BMC_PASSWORD> https://${BMC_IP}/redfish/v1/UpdateService/update-multipart -F 'UpdateParameters={\"ForceUpdate\":true};type=application/octet-stream' -F UpdateFile=@${image}"
-		output=$(curl -sSk -u $BMC_USER:$BMC_PASSWORD https://${BMC_IP}/redfish/v1/UpdateService/update-multipart -F 'UpdateParameters={"ForceUpdate":true};type=application/octet-stream' -F UpdateFile=@${image} 2>&1)
+		output=$(time_cmd bmc_fw_upload curl -sSk -u $BMC_USER:$BMC_PASSWORD https://${BMC_IP}/redfish/v1/UpdateService/update-multipart -F 'UpdateParameters={"ForceUpdate":true};type=application/octet-stream' -F UpdateFile=@${image} 2>&1)
 	else
 		ilog "curl -sSk -u <BMC_USER:BMC_PASSWORD> -H "Content-Type: application/octet-stream" -X POST -T ${image} https://${BMC_IP}/redfish/v1/UpdateService"
-		output=$(curl -sSk -u $BMC_USER:$BMC_PASSWORD -H "Content-Type: application/octet-stream" -X POST -T ${image} https://${BMC_IP}/redfish/v1/UpdateService 2>&1)
+		output=$(time_cmd bmc_fw_upload curl -sSk -u $BMC_USER:$BMC_PASSWORD -H "Content-Type: application/octet-stream" -X POST -T ${image} https://${BMC_IP}/redfish/v1/UpdateService 2>&1)
 	fi
 	ilog "BMC Firmware update: $output"
 
@@ -1521,10 +1634,10 @@ update_cec_fw()
 
 	if [[ $(echo -e "${BMC_MIN_MULTIPART_VERSION}\n${BMC_INSTALLED_VERSION}" | sort -V | head -n1) == "${BMC_MIN_MULTIPART_VERSION}" ]]; then
 		ilog "curl -sSk -u <BMC_USER:BMC_PASSWORD> https://${BMC_IP}/redfish/v1/UpdateService/update-multipart -F 'UpdateParameters={\"ForceUpdate\":true};type=application/octet-stream' -F UpdateFile=@${image}"
-		output=$(curl -sSk -u $BMC_USER:$BMC_PASSWORD https://${BMC_IP}/redfish/v1/UpdateService/update-multipart -F 'UpdateParameters={"ForceUpdate":true};type=application/octet-stream' -F UpdateFile=@${image} 2>&1)
+		output=$(time_cmd cec_fw_upload curl -sSk -u $BMC_USER:$BMC_PASSWORD https://${BMC_IP}/redfish/v1/UpdateService/update-multipart -F 'UpdateParameters={"ForceUpdate":true};type=application/octet-stream' -F UpdateFile=@${image} 2>&1)
 	else
 		ilog "curl -sSk -u <BMC_USER:BMC_PASSWORD> -H "Content-Type: application/octet-stream" -X POST -T ${image} https://${BMC_IP}/redfish/v1/UpdateService"
-		output=$(curl -sSk -u $BMC_USER:$BMC_PASSWORD -H "Content-Type: application/octet-stream" -X POST -T ${image} https://${BMC_IP}/redfish/v1/UpdateService 2>&1)
+		output=$(time_cmd cec_fw_upload curl -sSk -u $BMC_USER:$BMC_PASSWORD -H "Content-Type: application/octet-stream" -X POST -T ${image} https://${BMC_IP}/redfish/v1/UpdateService 2>&1)
 	fi
 	ilog "CEC Firmware update: $output"
 
@@ -1867,66 +1980,70 @@ global_installation_flow()
 {
 	if function_exists bfb_pre_install; then
 		log "INFO: Running bfb_pre_install from bf.cfg"
-		bfb_pre_install
+		time_step bfb_pre_install
+		# bfb_pre_install may change the NIC configuration
+		if use_mlxconfig_snapshot; then
+			mlxconfig_snapshot invalidate
+		fi
 	fi
 
-	configure_target_os
-	configure_dhcp
-	configure_network
-	configure_sfs
-	configure_ovs
-	configure_services
-	set_root_password
-	configure_rootfs
+	time_step configure_target_os
+	time_step configure_dhcp
+	time_step configure_network
+	time_step configure_sfs
+	time_step configure_ovs
+	time_step configure_services
+	time_step set_root_password
+	time_step configure_rootfs
 	# create_initramfs
 
-	configure_grub
+	time_step configure_grub
 
-	update_uefi_boot_entries
+	time_step update_uefi_boot_entries
 
 	if [ "X$ENABLE_SFC_HBN" == "Xyes" ]; then
-		stage_sfc_hbn_install
+		time_step stage_sfc_hbn_install
 	fi
 
 	if [ "X$ENABLE_BR_HBN" == "Xyes" ]; then
-		stage_sfc_hbn_install
+		time_step stage_sfc_hbn_install
 	fi
 
-	update_efi_bootmgr
+	time_step update_efi_bootmgr
 
 	if function_exists bfb_modify_os; then
 		log "INFO: Running bfb_modify_os from bf.cfg"
-		bfb_modify_os
+		time_step bfb_modify_os
 	fi
 
 	if function_exists bfb_custom_action1; then
 		log "INFO: Running bfb_custom_action1 from bf.cfg"
-		bfb_custom_action1
+		time_step bfb_custom_action1
 	fi
 
 	if [ "$UPDATE_ATF_UEFI" == "yes" ]; then
-		update_atf_uefi
+		time_step update_atf_uefi
 	fi
 
 	if function_exists bmc_components_update; then
-		bmc_components_update
+		time_step bmc_components_update
 	fi
 
 	if [ "$WITH_NIC_FW_UPDATE" == "yes" ]; then
-		update_nic_firmware
+		time_step update_nic_firmware
 	fi
 
 	if function_exists bfb_post_install; then
 		log "INFO: Running bfb_post_install from bf.cfg"
-		bfb_post_install
+		time_step bfb_post_install
 	fi
 
 	log "INFO: Installation finished"
 
-	reset_nic_firmware
+	time_step reset_nic_firmware
 }
 
-cat >> $LOG << EOF
+log_file - << EOF
 
 ############ DEBUG INFO (pre-install) ###############
 KERNEL: $(uname -r)
@@ -1953,7 +2070,7 @@ DPU Part Number:
 $dpu_part_number
 
 MLXCONFIG:
-$(mlxconfig -d /dev/mst/mt*_pciconf0 -e q)
+$(time_cmd mlxconfig mlxconfig_dump)
 ########### DEBUG INFO END ############
 
 EOF
@@ -1967,6 +2084,11 @@ fi
 
 global_installation_flow
 
+summary=$(step_timing_summary 5)
+if [ -n "$summary" ]; then
+	log "INFO: Slowest steps: $summary. See $STEP_TIMING_FILE"
+fi
+
 if [ $RC -eq 0 ]; then
 	rlog "`basename $0` finished successfully"
 else
@@ -35,7 +35,19 @@ import glob
 import time
 import re
 import errno
+import socket
+import threading
+import tempfile
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 from ipaddress import ip_address, IPv4Address
+import bf_trace
+
+# Use libyaml bindings when available
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 
 __author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
 __version__ = "1.0"
@@ -44,36 +56,128 @@ prog = os.path.basename(sys.argv[0])
 os.environ['PATH'] = '/opt/mellanox/iproute2/sbin:/usr/sbin:/usr/bin:/sbin:/bin'
 
 MLXREG = '/usr/bin/mlxreg'
+# Prefix of /sys, /proc and netplan directory paths. Set by the offline benchmark to a fake root
+sysroot = ""
 SUPPORTED_OPERATIONS=['ipconfig', 'mtuconfig', 'gwconfig', 'dnsconfig', 'domainconfig', 'roceconfig', 'vlanconfig']
 SUPPORTED_ACTIONS=['set', 'show']
 EXTENDED_ACTIONS=['set', 'show', 'list', 'remove']
+SUPPORTED_PORTS=['0', '1']
+# 'show --port all' collects these operations
+PORT_OPERATIONS=['ipconfig', 'mtuconfig', 'gwconfig', 'roceconfig']
+VLAN_OPERATIONS=['ipconfig', 'mtuconfig', 'gwconfig', 'vlanconfig']
+GLOBAL_OPERATIONS=['dnsconfig', 'domainconfig']
+SNAPSHOT_WORKERS = 8
 cloud_init_config = "/var/lib/cloud/seed/nocloud-net/network-config"
 netplan_config = "/etc/netplan/60-mlnx.yaml"
 
 network_config = netplan_config
 
 network_config_orig = network_config + ".orig"
-network_config_backup = network_config + ".bak"
+# Staged apply: candidate -> live, previous live -> rollback, applied live -> good
+network_config_candidate = network_config + ".new"
+network_config_rollback = network_config + ".rollback"
+network_config_good = network_config + ".good"
+network_config_bad = network_config + ".bad"
+NETPLAN_DIRS = ['etc/netplan', 'run/netplan', 'lib/netplan']
 
 resolv_conf = "/etc/resolv.conf"
 resolv_conf_orig = "/etc/resolv.conf.orig"
+daemon_socket = "/run/network_admin.sock"
+DAEMON_TIMEOUT = 120
 verbose = 0
 
+# Parsed files: path -> ((st_ino, st_mtime_ns, st_size), data)
+file_cache = {}
+file_cache_lock = threading.Lock()
+
+# VLAN index of the last loaded netplan document: (data, index)
+vlan_index_cache = (None, None)
+
+# Route indexes of the last loaded netplan document: (data, {(network_type, dev): index})
+route_index_cache = (None, None)
+
+# Attributes resolved by BFCONFIG.discover_topology()
+TOPOLOGY_ATTRS = ['pci_devices', 'pci_device', 'offset', 'devices', 'device', 'roce_devices', 'roce_device']
+
+class NetworkState:
+    """
+    In-memory netplan model, resolver state and port topology shared by
+    network_admin_daemon and snapshot(). Files are reloaded only when
+    their inode, mtime or size change.
+    """
+    def __init__ (self):
+        self.lock = threading.Lock()
+        self.topologies = {}
+        self.netdevs = None
+
+    def netplan(self, copy=False):
+        """
+        Return parsed netplan configuration. Use copy=True if the caller
+        is going to modify it.
+        """
+        return load_netplan(network_config, copy)
+
+    def resolv(self):
+        """
+        Return search domains and nameservers from resolv.conf
+        """
+        searchdomains, nameservers = load_cached(resolv_conf, read_resolv_conf)
+        return list(searchdomains), list(nameservers)
+
+    def topology(self, bfconfig):
+        """
+        Resolve port topology for BFCONFIG. The cache is dropped when the
+        list of network devices changes.
+        """
+        netdevs = sorted(os.listdir(sysroot + '/sys/class/net'))
+        key = (bfconfig.port, bfconfig.device)
+        with self.lock:
+            if netdevs != self.netdevs:
+                self.topologies = {}
+                self.netdevs = netdevs
+            cached = self.topologies.get(key)
+
+        if cached:
+            for attr, value in cached.items():
+                setattr(bfconfig, attr, value)
+            return
+
+        bfconfig.discover_topology()
+        cached = {}
+        for attr in TOPOLOGY_ATTRS:
+            if hasattr(bfconfig, attr):
+                cached[attr] = getattr(bfconfig, attr)
+        with self.lock:
+            self.topologies[key] = cached
+
+    def stats(self):
+        with file_cache_lock:
+            files = sorted(file_cache)
+        with self.lock:
+            return {'files': files, 'topologies': len(self.topologies)}
+
+
 class BFCONFIG:
-    def __init__ (self, args):
+    def __init__ (self, args, state=None):
+        self.state = state
         self.device = args.device
         self.port = args.port
         self.op = args.op
         self.action = args.action
         self.verbose = args.verbose
-        self.vlan = args.vlan
+        self.vlans = parse_vlans(args.vlan)
+        self.vlan = self.vlans[0]
         self.vlan_dev = ""
+        self.vlans_by_link = None
         self.vlan_remove = 0
         self.result = {}
         self.result['op'] = self.op
         self.result['action'] = self.action
         self.result['status'] = 0
         self.result['output'] = ""
+        self.timings = []
+        # VLAN links deleted after the new configuration is promoted
+        self.links_remove = []
 
         if self.op == 'vlanconfig' and self.action == 'remove':
             self.op = 'ipconfig'
@@ -83,15 +187,10 @@ class BFCONFIG:
         self.offset = 2
         self.devices = []
         if self.port:
-            self.pci_devices = self.__get_pci_device__()
-            if self.pci_devices:
-                self.pci_device = self.pci_devices[0]
-            if not self.device:
-                self.offset = self.__get_offset__()
-                self.devices = self.__get_device__()
-                self.device = self.devices[0]
-                self.roce_devices = self.__get_roce_device__()
-                self.roce_device = self.roce_devices[0]
+            if self.state:
+                self.state.topology(self)
+            else:
+                self.discover_topology()
 
             self.vlan_dev = "{}.{}".format(self.device, self.vlan)
 
@@ -154,8 +253,26 @@ class BFCONFIG:
             self.ipv6_gateway = args.ipv6_gateway
             self.network = args.network or '0.0.0.0'
             self.network_prefix = args.network_prefix or '0'
-            self.metric = args.metric
+            self.metric = None
+            if args.metric is not None:
+                try:
+                    self.metric = int(args.metric)
+                except ValueError:
+                    self.result['status'] = 1
+                    self.result['output'] = "ERR: Invalid metric {}".format(args.metric)
+                    bf_log (self.result['output'])
             self.mtu = args.mtu
+            self.routes_op = args.routes_op
+            self.routes_file = []
+            self.routes_added = []
+            self.routes_removed = []
+            if args.routes:
+                try:
+                    self.routes_file = read_routes_file(args.routes)
+                except (OSError, ValueError) as e:
+                    self.result['status'] = 1
+                    self.result['output'] = "ERR: Failed to read routes file {}. {}".format(args.routes, e)
+                    bf_log (self.result['output'])
     #        self.nmcontrolled = args.nmcontrolled
     #        self.onboot = args.onboot
 
@@ -195,13 +312,10 @@ class BFCONFIG:
 
             try:
                 # Read current configuration
-                with open(resolv_conf, 'r') as stream:
-                    for line in stream:
-                        line = line.strip()
-                        if line.startswith("search"):
-                            self.searchdomains = line.split(' ')[1:]
-                        elif line.startswith("nameserver"):
-                            self.nameservers.append(line.split(' ')[1])
+                if self.state:
+                    self.searchdomains, self.nameservers = self.state.resolv()
+                else:
+                    self.searchdomains, self.nameservers = read_resolv_conf(resolv_conf)
             except Exception as e:
                 bf_log ("ERR: Failed to read configuration file {}. Exception: {}".format(resolv_conf, e))
                 return None
@@ -301,18 +415,57 @@ class BFCONFIG:
 
         return
 
+    def vlan_name(self, vlan):
+        return "{}.{}".format(self.device, vlan)
+
+    def select_vlan(self, vlan):
+        """
+        Make vlan the current one for single VLAN methods
+        """
+        self.vlan = vlan
+        self.vlan_dev = self.vlan_name(vlan)
+
+    def vlan_index(self):
+        """
+        Return VLAN table indexed by parent link: {link: {id: vlan_dev}}
+        """
+        if self.vlans_by_link is None:
+            if self.action == 'set':
+                self.vlans_by_link = index_vlans(self.data['network'])
+            else:
+                self.vlans_by_link = get_vlan_index(self.data)
+        return self.vlans_by_link
+
     def load_network_data(self):
         """
         Load data from netplan configuration file
         """
         self.data = {}
         try:
-            with open(network_config, 'r') as stream:
-                self.data = yaml.safe_load(stream)
+            # Only 'set' modifies the loaded document
+            if self.state:
+                self.data = self.state.netplan(copy=self.action == 'set')
+            else:
+                self.data = load_netplan(network_config, copy=self.action == 'set')
         except Exception as e:
             bf_log ("ERR: Failed to load configuration file {}. Exception: {}".format(network_config, e))
         return
 
+    def discover_topology(self):
+        """
+        Discover PCI, network and RoCE devices assosiated with the port
+        """
+        with bf_trace.span('discover_topology'):
+            self.pci_devices = self.__get_pci_device__()
+            if self.pci_devices:
+                self.pci_device = self.pci_devices[0]
+            if not self.device:
+                self.offset = self.__get_offset__()
+                self.devices = self.__get_device__()
+                self.device = self.devices[0]
+                self.roce_devices = self.__get_roce_device__()
+                self.roce_device = self.roce_devices[0]
+
     def __get_pci_device__(self):
         """
         Get network device assosiated with the port
@@ -320,9 +473,9 @@ class BFCONFIG:
         devices = []
         try:
             if self.port:
-                cmd = "readlink -f /sys/class/infiniband/mlx5_{}/device".format(self.port)
+                cmd = "readlink -f {}/sys/class/infiniband/mlx5_{}/device".format(sysroot, self.port)
             else:
-                cmd = "readlink -f /sys/class/infiniband/mlx5_*"
+                cmd = "readlink -f {}/sys/class/infiniband/mlx5_*".format(sysroot)
             rc, output = get_status_output(cmd)
             for line in output.split('\n'):
                 if line:
@@ -350,13 +503,13 @@ class BFCONFIG:
         try:
             if self.port:
                 # Map port to SF
-                cmd = "/bin/ls -d /sys/class/net/*/device/infiniband/mlx5_{}".format(str(int(self.port) + int(self.offset)))
+                cmd = "/bin/ls -d {}/sys/class/net/*/device/infiniband/mlx5_{}".format(sysroot, str(int(self.port) + int(self.offset)))
             else:
-                cmd = "/bin/ls -d /sys/class/net/*/device/infiniband/mlx5_*"
+                cmd = "/bin/ls -d {}/sys/class/net/*/device/infiniband/mlx5_*".format(sysroot)
             rc, output = get_status_output(cmd)
             for line in output.split('\n'):
                 if line:
-                    devices.append(line.split('/')[4])
+                    devices.append(line[len(sysroot):].split('/')[4])
         except Exception as e:
             bf_log ("ERR: Port {} does not exist. Exception: {}".format(self.port, e))
             return None
@@ -369,11 +522,11 @@ class BFCONFIG:
         """
         devices = []
         try:
-            cmd = "/bin/ls -d /sys/class/net/*/smart_nic/pf"
+            cmd = "/bin/ls -d {}/sys/class/net/*/smart_nic/pf".format(sysroot)
             rc, output = get_status_output(cmd)
             line = output.split('\n')[int(self.port)]
             if line:
-                devices.append(line.split('/')[4])
+                devices.append(line[len(sysroot):].split('/')[4])
         except Exception as e:
             bf_log ("ERR: Port {} does not exist. Exception: {}".format(self.port, e))
             return None
@@ -446,8 +599,13 @@ class BFCONFIG:
             ipv4_gateway = ""
             ipv6_gateway = ""
             if dev in data[network_type]:
-                if 'routes' in data[network_type][dev]:
-                    self.result['routes'] = data[network_type][dev]['routes']
+                routes = get_route_index(self.data, network_type, dev)
+                if self.network != '0.0.0.0':
+                    # Lookup routes to the requested network
+                    to = "{}/{}".format(self.network, self.network_prefix)
+                    self.result['routes'] = list(routes['to'].get(to, {}).values())
+                elif routes['routes']:
+                    self.result['routes'] = list(routes['routes'].values())
                 if 'gateway4' in data[network_type][dev]:
                     ipv4_gateway = data[network_type][dev]['gateway4']
                 if 'gateway6' in data[network_type][dev]:
@@ -552,16 +710,15 @@ class BFCONFIG:
                     reg_data = line.split('|')[1].strip()
                     roce_accl.append("{}={}".format(reg_name, reg_data))
 
-            for i in range(8):
-                cmd = 'bash -c "cat /sys/class/net/{device}/ecn/roce_np/enable/{prio} 2> /dev/null"'.format(ecn=ecn, device=self.roce_device, prio=i)
-                rc, ecn_output = get_status_output(cmd, verbose)
-                if rc:
-                    self.result['status'] = rc
-                    self.result['output'] = "ERR: Failed to read ECN. RC={}\nOutput:\n{}".format(rc, ecn_output)
-                    bf_log ("ERR: Failed to get ECN. RC={}\nOutput:\n{}".format(rc, ecn_output))
+            ecn_attrs = read_sysfs_attrs([ecn_attr(self.roce_device, 'roce_np', i) for i in range(8)])
+            for path, value in ecn_attrs.items():
+                if value is None:
+                    self.result['status'] = 1
+                    self.result['output'] = "ERR: Failed to read ECN from {}".format(path)
+                    bf_log (self.result['output'])
                     return
 
-                ecn.append(ecn_output.strip())
+                ecn.append(value)
 
             self.result['output'] = "trust={trust}/prio_tc={prio_tc}/ecn={ecn}/pfc={pfc}/cable_len={cable_len}/prio2buffer={prio2buffer}/buffer_size={buffer_size}/dscp2prio={dscp2prio}/ratelimit={ratelimit}/roce_accl={roce_accl}".format(trust=trust,prio_tc=prio_tc,ecn=','.join(ecn),pfc=pfc,cable_len=cable_len,prio2buffer=prio2buffer,buffer_size=buffer_size,dscp2prio=dscp2prio,ratelimit=ratelimit,roce_accl=','.join(roce_accl))
 
@@ -610,7 +767,7 @@ class BFCONFIG:
                     dev_info['mtu'] = data[network_type][dev]['mtu']
             if self.op in ['ipconfig', 'mtuconfig']:
                 if 'routes' in data[network_type][dev]:
-                    dev_info['routes'] = data[network_type][dev]['routes']
+                    dev_info['routes'] = list(route_set(data[network_type][dev]['routes']).values())
                 if 'gateway4' in data[network_type][dev]:
                     dev_info['gateway4'] = data[network_type][dev]['gateway4']
                 if 'gateway6' in data[network_type][dev]:
@@ -640,22 +797,44 @@ class BFCONFIG:
                 dev_info['mtu'] = self.mtu
 
         if self.op == "gwconfig":
+            old_routes = {}
+            if dev in data[network_type]:
+                old_routes = route_set(data[network_type][dev].get('routes', []))
+            # A gateway update replaces the routes and gateways of the device.
+            # A routes file or '--routes_op' updates the existing routes and
+            # keeps the gateways.
+            routes = {}
+            if (self.routes_file or self.routes_op) and dev in data[network_type]:
+                routes = dict(old_routes)
+                for gateway in ['gateway4', 'gateway6']:
+                    if gateway in data[network_type][dev]:
+                        dev_info[gateway] = data[network_type][dev][gateway]
+
+            new_routes = list(self.routes_file)
             if self.ipv4_gateway:
-                if self.metric:
-                    dev_info['routes'].append([{'metric': self.metric, 'to': "{}/{}".format(self.network, self.network_prefix), 'via': self.ipv4_gateway}])
-                # elif self.network != '0.0.0.0' and self.network_prefix != '0':
-                #     dev_info['routes'].append([{'to': "{}/{}".format(self.network, self.network_prefix), 'via': self.ipv4_gateway}])
+                if self.metric is not None:
+                    new_routes.append({'to': "{}/{}".format(self.network, self.network_prefix), 'via': self.ipv4_gateway, 'metric': self.metric})
                 else:
                     dev_info['gateway4'] = self.ipv4_gateway
 
             if self.ipv6_gateway:
-                if self.metric:
-                    dev_info['routes'].append([{'metric': self.metric, 'to': "{}/{}".format(self.network, self.network_prefix), 'via': self.ipv6_gateway}])
-                # elif self.network and self.network_prefix:
-                #     dev_info['routes'].append([{'to': "{}/{}".format(self.network, self.network_prefix), 'via': self.ipv6_gateway}])
+                if self.metric is not None:
+                    new_routes.append({'to': "{}/{}".format(self.network, self.network_prefix), 'via': self.ipv6_gateway, 'metric': self.metric})
                 else:
                     dev_info['gateway6'] = self.ipv6_gateway
 
+            if self.routes_op == 'replace':
+                routes = {}
+            for route in new_routes:
+                if self.routes_op == 'remove':
+                    routes.pop(route_key(route), None)
+                else:
+                    routes[route_key(route)] = route
+
+            dev_info['routes'] = list(routes.values())
+            self.routes_added += [routes[key] for key in routes if key not in old_routes]
+            self.routes_removed += [old_routes[key] for key in old_routes if key not in routes]
+
         # Cleanup empty spaces
         if self.op == "ipconfig":
             if not len(dev_info['addresses']):
@@ -686,12 +865,8 @@ class BFCONFIG:
         addr = None
         prefix = None
         dev = self.device
-        vlan_dev = "{}.{}".format(self.device, self.vlan)
-        conf_vlans = {}
 
         conf = self.data['network']['ethernets']
-        if "vlans" in self.data['network']:
-            conf_vlans = self.data['network']['vlans']
 
         if self.vlan == '-1':
             conf[dev] = self.set_netplan_dev_data()
@@ -701,11 +876,15 @@ class BFCONFIG:
                 if dev in self.data['network']['ethernets']:
                     del self.data['network']['ethernets'][dev]
         else:
-            if 'vlans' not in self.data['network'] or vlan_dev not in self.data['network']['vlans']:
-                if self.op in ['mtuconfig', 'gwconfig']:
-                    self.result['status'] = 1
-                    self.result['output'] = "ERR: VLAN interface {} does not exist".format(vlan_dev)
-                    return 1
+            conf_vlans = self.data['network'].get('vlans', {})
+            missing = [self.vlan_name(vlan) for vlan in self.vlans if self.vlan_name(vlan) not in conf_vlans]
+            if missing and (self.vlan_remove or self.op in ['mtuconfig', 'gwconfig']):
+                self.result['status'] = 1
+                if self.vlan_remove:
+                    self.result['output'] = "ERR: VLAN {} does not exist".format(','.join(missing))
+                else:
+                    self.result['output'] = "ERR: VLAN interface {} does not exist".format(','.join(missing))
+                return 1
 
             if self.op == 'mtuconfig':
                 parent_mtu = get_mtu(self.device)
@@ -714,40 +893,108 @@ class BFCONFIG:
                     self.result['output'] = "ERR: Parent interface MTU should not be less than VLAN's MTU"
                     return 1
 
-            if not self.vlan_remove:
-                conf_vlans[vlan_dev] = self.set_netplan_dev_data()
-
-            # VLAN configuration always includes 'id' and 'link' fields
-            if not self.vlan_remove and len(conf_vlans[vlan_dev]) > 2:
-                self.data['network']['vlans'][vlan_dev] = conf_vlans[vlan_dev]
-            else:
-                if "vlans" not in self.data['network']:
-                    self.result['status'] = 1
-                    self.result['output'] = "ERR: VLAN {} does not exist".format(vlan_dev)
-                    return 1
-                if vlan_dev in self.data['network']['vlans']:
+            index = self.vlan_index()
+            for vlan in self.vlans:
+                self.select_vlan(vlan)
+                vlan_dev = self.vlan_dev
+                dev_info = {}
+                if not self.vlan_remove:
+                    dev_info = self.set_netplan_dev_data()
+
+                # VLAN configuration always includes 'id' and 'link' fields
+                if len(dev_info) > 2:
+                    self.data['network']['vlans'][vlan_dev] = dev_info
+                    index.setdefault(dev, {})[vlan] = vlan_dev
+                elif vlan_dev in self.data['network'].get('vlans', {}):
                     del self.data['network']['vlans'][vlan_dev]
-                    if len(self.data['network']['vlans']) == 0:
-                        del self.data['network']['vlans']
-                    cmd = "ip link delete link {} name {}".format(dev, vlan_dev)
-                    rc, output = get_status_output(cmd, verbose)
-                else:
-                    self.result['status'] = 1
-                    self.result['output'] = "ERR: VLAN {} does not exist".format(vlan_dev)
-                    return 1
+                    index.get(dev, {}).pop(vlan, None)
+                    self.links_remove.append("link delete link {} name {}".format(dev, vlan_dev))
+
+            if 'vlans' in self.data['network'] and len(self.data['network']['vlans']) == 0:
+                del self.data['network']['vlans']
 
         try:
-            with open(network_config, 'w') as stream:
-                output = yaml.dump(self.data, stream, sort_keys=False)
+            with bf_trace.span('yaml.dump', 'yaml', path=network_config_candidate):
+                with open(network_config_candidate, 'w') as stream:
+                    output = yaml.dump(self.data, stream, Dumper=SafeDumper, sort_keys=False)
+            shutil.copymode(network_config, network_config_candidate)
         except:
             self.result['status'] = rc
-            self.result['output'] = "ERR: Failed to write into configuration file {}".format(network_config)
-            bf_log ("ERR: Failed to write into configuration file {}".format(network_config))
+            self.result['output'] = "ERR: Failed to write into configuration file {}".format(network_config_candidate)
+            bf_log ("ERR: Failed to write into configuration file {}".format(network_config_candidate))
 
             return 1
 
         return rc
 
+    def validate_config(self):
+        """
+        Verify candidate configuration using 'netplan generate' on a scratch root
+        """
+        rc, output = validate_netplan(network_config_candidate, network_config)
+        if rc:
+            self.result['status'] = 1
+            self.result['output'] = "ERR: Invalid configuration: {}".format(output)
+            bf_log ("ERR: Candidate configuration validation failed. RC={}\nOutput:\n{}".format(rc, output))
+            if os.path.exists(network_config_candidate):
+                os.unlink(network_config_candidate)
+
+        return rc
+
+    def commit_config(self):
+        """
+        Replace live configuration with the validated candidate.
+        Previous configuration is kept as the rollback generation.
+        """
+        try:
+            if os.path.lexists(network_config_rollback):
+                os.unlink(network_config_rollback)
+            os.link(network_config, network_config_rollback)
+            os.replace(network_config_candidate, network_config)
+        except OSError as e:
+            self.result['status'] = 1
+            self.result['output'] = "ERR: Failed to update configuration file {}. Exception: {}".format(network_config, e)
+            bf_log (self.result['output'])
+            return 1
+
+        return 0
+
+    def promote_config(self):
+        """
+        Mark applied configuration as the known-good generation
+        """
+        try:
+            swap_generation(network_config, network_config_good)
+            if os.path.lexists(network_config_rollback):
+                os.unlink(network_config_rollback)
+        except OSError as e:
+            bf_log ("ERR: Failed to save known-good configuration. Exception: {}".format(e))
+
+        return 0
+
+    def rollback_config(self):
+        """
+        Restore the rollback generation and apply it
+        """
+        shutil.copy2(network_config, network_config_bad)
+        os.replace(network_config_rollback, network_config)
+        return self.apply_config()
+
+    def stage(self, name, func, *args):
+        """
+        Run configuration stage and record its duration
+        """
+        start = time.monotonic()
+        try:
+            with bf_trace.span(name):
+                return func(*args)
+        finally:
+            self.timings.append((name, time.monotonic() - start))
+
+    def log_timings(self):
+        if self.timings:
+            bf_log ("Stage timings: {}".format(' '.join("{}={:.3f}s".format(name, duration) for name, duration in self.timings)), verbose)
+
     def set_resolv_conf(self):
         # DNS configuration
         """
@@ -798,6 +1045,37 @@ class BFCONFIG:
 
         return rc
 
+    def remove_links(self):
+        """
+        Delete links of the removed VLANs using a single 'ip -batch' invocation.
+        Runs only after the configuration without them is promoted, so a
+        rejected or rolled back configuration keeps its links.
+        """
+        if not self.links_remove:
+            return 0
+
+        rc, output = ip_batch(self.links_remove, verbose)
+        if rc:
+            bf_log ("ERR: Failed to delete VLAN interfaces. RC={}\nOutput:\n{}".format(rc, output))
+
+        return rc
+
+    def program_routes(self):
+        """
+        Update kernel routing table using a single 'ip -batch' invocation
+        """
+        dev = self.vlan_dev if self.vlan != '-1' else self.device
+        cmds = ["route del {}".format(route_spec(route, dev)) for route in self.routes_removed]
+        cmds += ["route replace {}".format(route_spec(route, dev)) for route in self.routes_added]
+        if not cmds:
+            return 0
+
+        rc, output = ip_batch(cmds, verbose)
+        if rc:
+            bf_log ("ERR: Failed to update routes for {} interface. RC={}\nOutput:\n{}".format(dev, rc, output))
+
+        return rc
+
     def ip_config(self):
         """
         Construct and apply ip command like:
@@ -843,7 +1121,7 @@ class BFCONFIG:
                 elif self.ipv6_gateway:
                     cmd = "ip route add default gw {}".format(self.ipv6_gateway)
 
-        if self.metric:
+        if self.metric is not None:
             cmd += " metric {}".format(self.metric)
 
         rc, output = get_status_output(cmd, verbose)
@@ -872,19 +1150,22 @@ class BFCONFIG:
             return
 
         mlnx_qos_params = ""
+        ecn_output = None
 
         if self.ecn:
-            i = 0
-            for ecn in self.ecn:
-                cmd = 'bash -c "echo {ecn} > /sys/class/net/{device}/ecn/roce_np/enable/{prio} || true; \
-                                echo {ecn} > /sys/class/net/{device}/ecn/roce_rp/enable/{prio} || true"'.format(ecn=ecn, device=self.roce_device, prio=i)
-                rc, ecn_output = get_status_output(cmd, verbose)
-                if rc:
-                    self.result['status'] = rc
-                    self.result['output'] = "ERR: Failed to set ECN. RC={}\nOutput:\n{}".format(rc, ecn_output)
-                    bf_log (self.result['output'])
-                    return
-                i += 1
+            attrs = {}
+            for prio, ecn in enumerate(self.ecn):
+                for point in ['roce_np', 'roce_rp']:
+                    attrs[ecn_attr(self.roce_device, point, prio)] = ecn
+
+            # As with '|| true' before, the other RoCE settings are applied
+            # even if some ECN attributes were not set. The failure is
+            # reported when they are done.
+            failures = write_sysfs_attrs(attrs)
+            if failures:
+                self.result['failures'] = failures
+                ecn_output = "ERR: Failed to set ECN: {}".format('; '.join("{}: {}".format(path, error) for path, error in failures.items()))
+                bf_log (ecn_output)
 
         if self.type:
             if self.type == "lossy":
@@ -931,32 +1212,32 @@ class BFCONFIG:
                 bf_log (self.result['output'])
                 return
 
+        if ecn_output:
+            self.result['status'] = 1
+            self.result['output'] = ecn_output
+
         return
 
     def set_vlan_config(self):
         """
         Set VLAN configuration
         """
-
-        ip_cmd = "ip link set link {} name {} type vlan id {} ".format(self.device, self.vlan_dev, self.vlan)
-
-        if self.skprio_up_egress:
-            egress_cmd = ip_cmd + "egress-qos-map " + " ".join(["{}:{}".format(i,self.skprio_up_egress[i]) for i in range(len(self.skprio_up_egress))])
-            rc, output = get_status_output(egress_cmd, verbose)
-            if rc:
-                self.result['status'] = rc
-                self.result['output'] = output
-                bf_log ("ERR: Failed to set skprio_up_egress. RC={}\nOutput:\n{}".format(rc, output))
-                return
-
-        if self.up_skprio_ingress:
-            ingress_cmd = ip_cmd + "ingress-qos-map " + " ".join(["{}:{}".format(i,self.up_skprio_ingress[i]) for i in range(len(self.up_skprio_ingress))])
-            rc, output = get_status_output(ingress_cmd, verbose)
-            if rc:
-                self.result['status'] = rc
-                self.result['output'] = output
-                bf_log ("ERR: Failed to set up_skprio_ingress. RC={}\nOutput:\n{}".format(rc, output))
-                return
+        cmds = []
+        for vlan in self.vlans:
+            self.select_vlan(vlan)
+            cmd = "link set link {} name {} type vlan id {}".format(self.device, self.vlan_dev, self.vlan)
+            if self.skprio_up_egress:
+                cmd += " egress-qos-map " + " ".join(["{}:{}".format(i,self.skprio_up_egress[i]) for i in range(len(self.skprio_up_egress))])
+            if self.up_skprio_ingress:
+                cmd += " ingress-qos-map " + " ".join(["{}:{}".format(i,self.up_skprio_ingress[i]) for i in range(len(self.up_skprio_ingress))])
+            cmds.append(cmd)
+
+        rc, output = ip_batch(cmds, verbose)
+        if rc:
+            self.result['status'] = rc
+            self.result['output'] = output
+            bf_log ("ERR: Failed to set VLAN QoS mapping. RC={}\nOutput:\n{}".format(rc, output))
+            return
 
         return
 
@@ -980,7 +1261,7 @@ class BFCONFIG:
         self.result['output'] = 'skprio_up_egress='
         self.result['output'] += ','.join(egress_qos)
 
-        cmd = "grep ^INGRESS /proc/net/vlan/{} | cut -d ':' -f 2- | sed -e 's/[0-9]://g' | sed -e 's/^ *//' | sed -r 's/[[:space:]]+/,/g' | tr -d '\n'".format(self.vlan_dev)
+        cmd = "grep ^INGRESS {}/proc/net/vlan/{} | cut -d ':' -f 2- | sed -e 's/[0-9]://g' | sed -e 's/^ *//' | sed -r 's/[[:space:]]+/,/g' | tr -d '\n'".format(sysroot, self.vlan_dev)
         rc, output = get_status_output(cmd, verbose)
         if rc:
             self.result['status'] = rc
@@ -994,13 +1275,8 @@ class BFCONFIG:
         """
         List VLANs
         """
-        list = []
         if 'vlans' in self.data['network']:
-            for vlan_dev in self.data['network']['vlans']:
-                if self.data['network']['vlans'][vlan_dev]['link'] == self.device:
-                    list.append(self.data['network']['vlans'][vlan_dev]['id'])
-
-            self.result['output'] = ','.join(list)
+            self.result['output'] = ','.join(self.vlan_index().get(self.device, {}))
 
 
 def version():
@@ -1014,11 +1290,13 @@ def get_status_output(cmd, verbose=False):
     if verbose:
         print("Running command:", cmd)
 
-    try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT,
-                                         shell=True, universal_newlines=True)
-    except subprocess.CalledProcessError as e:
-        rc, output = (e.returncode, e.output.strip())
+    with bf_trace.span(bf_trace.command_name(cmd), 'exec', cmd=cmd) as span:
+        try:
+            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT,
+                                             shell=True, universal_newlines=True)
+        except subprocess.CalledProcessError as e:
+            rc, output = (e.returncode, e.output.strip())
+        span.set(rc=rc)
 
     if rc and verbose:
         print("Running {} failed (error[{}])".format(cmd, rc))
@@ -1050,6 +1328,24 @@ def verify_args(args):
     rc = 0
     msg = ""
     supported_actions = SUPPORTED_ACTIONS
+    if args.port == 'all':
+        if args.action != 'show' or args.get_devices:
+            return 1, "ERROR: '--port all' is supported by '--action show' only"
+        if args.vlan != '-1':
+            return 1, "ERROR: '--port all' shows all VLANs. Do not use '--vlan'"
+        return 0, msg
+
+    try:
+        vlans = parse_vlans(args.vlan)
+    except ValueError as e:
+        return 1, "ERROR: Invalid VLAN list {}. {}".format(args.vlan, e)
+
+    if len(vlans) > 1:
+        if args.op not in ['ipconfig', 'mtuconfig', 'vlanconfig'] or args.action not in ['set', 'remove']:
+            return 1, "ERROR: VLAN list is supported by ipconfig, mtuconfig and vlanconfig set/remove only"
+        if args.ipv4_addr not in [None, 'dhcp', '0'] or args.ipv6_addr not in [None, 'dhcp', '0']:
+            return 1, "ERROR: Static IP address cannot be assigned to a VLAN list"
+
     if (args.op not in SUPPORTED_OPERATIONS):
         msg = "ERROR: Operation {} is not supported".format(args.op)
         rc = 1
@@ -1066,6 +1362,17 @@ def verify_args(args):
         msg = "ERROR: Port number have to be provided. Use '--port'"
         rc = 1
 
+    if args.routes and (args.op != 'gwconfig' or args.action != 'set'):
+        msg = "ERROR: '--routes' is supported by gwconfig set only"
+        rc = 1
+
+    if args.routes_op and (args.op != 'gwconfig' or args.action != 'set'):
+        msg = "ERROR: '--routes_op' is supported by gwconfig set only"
+        rc = 1
+    elif args.routes_op and not args.routes and args.metric is None:
+        msg = "ERROR: '--routes_op' needs '--routes' or a gateway with '--metric'"
+        rc = 1
+
     if args.op == 'mtuconfig' and args.action == 'set' and not args.mtu:
         msg = "ERROR: MTU have to be provided. Use '--mtu'"
         rc = 1
@@ -1116,13 +1423,340 @@ def verify_args(args):
     return rc, msg
 
 def get_mtu(dev):
-    cmd = "cat /sys/class/net/{}/mtu".format(dev)
+    cmd = "cat {}/sys/class/net/{}/mtu".format(sysroot, dev)
     rc, mtu = get_status_output(cmd, verbose)
     if rc:
         bf_log ("ERR: Failed to get MTU for {} interface. RC={}".format(dev, rc))
         return 0
     return int(mtu.strip())
 
+def load_cached(path, loader):
+    """
+    Return loader(path). The result is reused while the file inode,
+    mtime and size are unchanged.
+    """
+    st = os.stat(path)
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with file_cache_lock:
+        cached = file_cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    data = loader(path)
+    with file_cache_lock:
+        file_cache[path] = (key, data)
+    return data
+
+
+def read_yaml(path):
+    with bf_trace.span('read', 'file', path=path):
+        with open(path, 'r') as stream:
+            text = stream.read()
+    with bf_trace.span('yaml.load', 'yaml', path=path):
+        return yaml.load(text, Loader=SafeLoader)
+
+
+def load_netplan(path, copy=False):
+    """
+    Load netplan configuration file. Use copy=True if the document
+    is going to be modified.
+    """
+    data = load_cached(path, read_yaml)
+    if copy:
+        return deepcopy(data)
+    return data
+
+
+def parse_vlans(value):
+    """
+    Parse VLAN list like '100-399,500'.
+    Return list of VLAN IDs as strings.
+    """
+    if ',' not in value and '-' not in value.lstrip('-'):
+        return [value]
+
+    vlans = {}
+    for item in value.split(','):
+        first, sep, last = item.strip().partition('-')
+        if not first.isdigit() or (sep and not last.isdigit()):
+            raise ValueError("Illegal VLAN range: {}".format(item))
+        first = int(first)
+        last = int(last) if sep else first
+        if first < 1 or last > 4094 or first > last:
+            raise ValueError("Illegal VLAN range: {}. Legal range 1-4094".format(item))
+        for vlan in range(first, last + 1):
+            vlans[str(vlan)] = None
+
+    return list(vlans)
+
+
+def index_vlans(network):
+    """
+    Build VLAN table indexed by parent link: {link: {id: vlan_dev}}
+    """
+    index = {}
+    for vlan_dev, vlan_data in network.get('vlans', {}).items():
+        index.setdefault(vlan_data.get('link'), {})[str(vlan_data.get('id'))] = vlan_dev
+    return index
+
+
+def get_vlan_index(data):
+    """
+    Return index_vlans() of a loaded netplan document.
+    The index is rebuilt only when the document is reloaded.
+    """
+    global vlan_index_cache
+
+    cached_data, index = vlan_index_cache
+    if cached_data is not data:
+        index = index_vlans(data['network'])
+        vlan_index_cache = (data, index)
+    return index
+
+
+def ecn_attr(device, point, prio):
+    """
+    ECN enable attribute of the reaction (roce_rp) or notification (roce_np) point
+    """
+    return "{}/sys/class/net/{}/ecn/{}/enable/{}".format(sysroot, device, point, prio)
+
+
+def write_sysfs_attrs(attrs):
+    """
+    Write sysfs attributes {path: value} and verify them by reading back.
+    Return {path: error} for the attributes that were not set.
+    """
+    failures = {}
+    for path, value in attrs.items():
+        value = str(value).strip()
+        if verbose:
+            print("Writing {} to {}".format(value, path))
+        try:
+            with bf_trace.span('write_sysfs', 'file', path=path), open(path, 'wb', buffering=0) as stream:
+                stream.write(value.encode())
+        except OSError as e:
+            failures[path] = "write failed: {}".format(e.strerror)
+            continue
+
+        current = read_sysfs_attrs([path])[path]
+        if current is None:
+            failures[path] = "read back failed"
+        elif current != value:
+            failures[path] = "read back '{}' instead of '{}'".format(current, value)
+
+    return failures
+
+
+def read_sysfs_attrs(paths):
+    """
+    Read sysfs attributes. Return {path: value}. The value is None
+    if the attribute cannot be read.
+    """
+    values = {}
+    with bf_trace.span('read_sysfs', 'file', count=len(paths)):
+        for path in paths:
+            try:
+                with open(path, 'r') as stream:
+                    values[path] = stream.read().strip()
+            except OSError:
+                values[path] = None
+
+    return values
+
+
+def route_key(route):
+    """
+    Route identity: (to, via, metric)
+    """
+    metric = route.get('metric')
+    return (route.get('to'), route.get('via'), str(metric) if metric is not None else '')
+
+
+def route_set(routes):
+    """
+    Return routes as an ordered set: {route_key: route}.
+    Duplicates are dropped. Routes stored as one-element lists by the
+    previous versions are unwrapped.
+    """
+    result = {}
+    for route in routes or []:
+        if isinstance(route, list):
+            for entry in route:
+                result.setdefault(route_key(entry), entry)
+        elif isinstance(route, dict):
+            result.setdefault(route_key(route), route)
+    return result
+
+
+def get_route_index(data, network_type, dev):
+    """
+    Return routes of the device from a loaded netplan document as
+    {'routes': {route_key: route}, 'to': {to: {route_key: route}}}.
+    Indexes are rebuilt only when the document is reloaded.
+    """
+    global route_index_cache
+
+    cached_data, indexes = route_index_cache
+    if cached_data is not data:
+        indexes = {}
+        route_index_cache = (data, indexes)
+
+    key = (network_type, dev)
+    if key not in indexes:
+        routes = route_set(data['network'].get(network_type, {}).get(dev, {}).get('routes', []))
+        by_to = {}
+        for rkey, route in routes.items():
+            by_to.setdefault(route.get('to'), {})[rkey] = route
+        indexes[key] = {'routes': routes, 'to': by_to}
+
+    return indexes[key]
+
+
+def read_routes_file(path):
+    """
+    Read routes file. One route per line:
+    <to> via <gateway> [metric <metric>]
+    Empty lines and lines starting with '#' are ignored.
+    """
+    routes = {}
+    with open(path, 'r') as stream:
+        for num, line in enumerate(stream, 1):
+            line = line.split('#', 1)[0].split()
+            if not line:
+                continue
+            route = {'to': line[0]}
+            params = line[1:]
+            if len(params) % 2 or not params:
+                raise ValueError("Line {}: expected '<to> via <gateway> [metric <metric>]'".format(num))
+            for name, value in zip(params[0::2], params[1::2]):
+                if name not in ['via', 'metric']:
+                    raise ValueError("Line {}: unknown parameter {}".format(num, name))
+                route[name] = value
+            if 'via' not in route or validIPAddress(route['via']) == 'Invalid':
+                raise ValueError("Line {}: invalid gateway".format(num))
+            if 'metric' in route:
+                if not route['metric'].isdigit():
+                    raise ValueError("Line {}: invalid metric {}".format(num, route['metric']))
+                route['metric'] = int(route['metric'])
+            routes.setdefault(route_key(route), route)
+
+    return list(routes.values())
+
+
+def route_spec(route, dev):
+    spec = "{} via {} dev {}".format(route['to'], route['via'], dev)
+    if route.get('metric') is not None:
+        spec += " metric {}".format(route['metric'])
+    return spec
+
+
+def ip_batch(cmds, verbose=False):
+    """
+    Run ip commands using a single 'ip -batch' invocation.
+    Commands do not include the leading 'ip'.
+    """
+    if len(cmds) == 1:
+        return get_status_output("ip {}".format(cmds[0]), verbose)
+
+    with tempfile.NamedTemporaryFile('w', prefix='network_admin.', suffix='.batch') as batch:
+        batch.write('\n'.join(cmds) + '\n')
+        batch.flush()
+        return get_status_output("ip -force -batch {}".format(batch.name), verbose)
+
+
+def validate_netplan(candidate, live):
+    """
+    Run 'netplan generate' on a scratch root with the candidate
+    configuration in place of the live one.
+    Return exit code and output.
+    """
+    if not shutil.which('netplan'):
+        bf_log ("netplan is not available. Skipping validation", verbose)
+        return 0, ""
+
+    base = sysroot or '/'
+    root = tempfile.mkdtemp(prefix='network_admin.', dir='/run' if os.path.isdir('/run') else None)
+    try:
+        for netplan_dir in NETPLAN_DIRS:
+            scratch_dir = os.path.join(root, netplan_dir)
+            os.makedirs(scratch_dir, mode=0o700)
+            for path in glob.glob(os.path.join(base, netplan_dir, '*.yaml')):
+                if path != live:
+                    shutil.copy2(path, scratch_dir)
+        scratch_live = os.path.join(root, os.path.relpath(live, base))
+        os.makedirs(os.path.dirname(scratch_live), mode=0o700, exist_ok=True)
+        shutil.copy2(candidate, scratch_live)
+
+        cmd = "netplan generate --root-dir {}".format(root)
+        rc, output = get_status_output(cmd, verbose)
+        if not rc and 'Error' in output:
+            rc = 1
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return rc, output
+
+
+def swap_generation(src, dst):
+    """
+    Atomically make dst a copy of src
+    """
+    tmp = dst + ".tmp"
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def read_resolv_conf(path):
+    """
+    Return search domains and nameservers configured in resolv.conf
+    """
+    searchdomains = []
+    nameservers = []
+    with bf_trace.span('read', 'file', path=path), open(path, 'r') as stream:
+        for line in stream:
+            line = line.strip()
+            if line.startswith("search"):
+                searchdomains = line.split(' ')[1:]
+            elif line.startswith("nameserver"):
+                nameservers.append(line.split(' ')[1])
+    return searchdomains, nameservers
+
+
+class DaemonError(Exception):
+    pass
+
+
+def daemon_call(method, params, path=None):
+    """
+    Send JSON-RPC request to network_admin daemon.
+    Return the result or None if the daemon is not available.
+    Raise DaemonError when the request was sent but did not complete,
+    so the command is not run a second time locally.
+    """
+    request = {'jsonrpc': '2.0', 'id': os.getpid(), 'method': method, 'params': params}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(DAEMON_TIMEOUT)
+        try:
+            sock.connect(path or daemon_socket)
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ECONNREFUSED):
+                return None
+            raise DaemonError("connect failed: {}".format(e))
+        try:
+            sock.sendall((json.dumps(request) + '\n').encode())
+            with sock.makefile('r') as stream:
+                reply = json.loads(stream.readline())
+        except socket.timeout:
+            raise DaemonError("no reply in {} seconds".format(DAEMON_TIMEOUT))
+        except (OSError, ValueError) as e:
+            raise DaemonError(str(e))
+
+    if 'error' in reply:
+        raise DaemonError(reply['error'].get('message'))
+
+    return reply.get('result')
+
+
 def validIPAddress(IP: str) -> str:
     try:
         return "IPv4" if type(ip_address(IP)) is IPv4Address else "IPv6"
@@ -1137,22 +1771,14 @@ def netmask_to_prefix(netmask):
     return(sum([ bin(int(bits)).count("1") for bits in netmask.split(".") ]))
 
 
-def main():
-
-    global verbose
-    rc = 0
-    result = {"status": 0, "output": ""}
-
-    if os.geteuid() != 0:
-        sys.exit('root privileges are required to run this script!')
-
+def get_parser(argv):
     parser = argparse.ArgumentParser(description='Configure network interfaces')
 #    parser.add_argument('--permanent', action='store_true', help="Keep network configuration permanent", default=True)
-    parser.add_argument('--op', required='--version' not in sys.argv, choices=SUPPORTED_OPERATIONS, help="Operation")
+    parser.add_argument('--op', required='--version' not in argv and 'all' not in argv, choices=SUPPORTED_OPERATIONS, help="Operation. Optional with '--port all'")
     parser.add_argument('--device', help="Network device name")
-    parser.add_argument('--action', required='--version' not in sys.argv, choices=EXTENDED_ACTIONS, help="Action")
+    parser.add_argument('--action', required='--version' not in argv, choices=EXTENDED_ACTIONS, help="Action")
     parser.add_argument('--get_devices', action='store_true', help="Print network interface bound to the provided port", default=False)
-    parser.add_argument('--port', required='--get-devices' in sys.argv, choices=['0', '1'], help="HCA port 0|1")
+    parser.add_argument('--port', required='--get-devices' in argv, choices=SUPPORTED_PORTS + ['all'], help="HCA port 0|1. Use 'all' with '--action show' to get configuration of all ports")
     parser.add_argument('--ipv4_addr', help="IPv4 address")
     parser.add_argument('--ipv4_prefix', help="Network prefix for IPv4 address.")
     parser.add_argument('--ipv6_addr', help="IPv6 address")
@@ -1162,6 +1788,8 @@ def main():
     parser.add_argument('--ipv4_gateway', help="IPv4 gateway address")
     parser.add_argument('--ipv6_gateway', help="IPv6 gateway address")
     parser.add_argument('--metric', help="Metric for the default route using ipv4_gateway")
+    parser.add_argument('--routes', help="File with routes to update. One route per line: <to> via <gateway> [metric <metric>]")
+    parser.add_argument('--routes_op', choices=['add', 'remove', 'replace'], help="Routes update mode. Default: add with '--routes', otherwise the gateway replaces the routes")
 #    parser.add_argument('--bootproto', help="BOOTPROTO=none|static|bootp|dhcp")
     parser.add_argument('--mtu', help="Default MTU for this device")
 #    parser.add_argument('--nmcontrolled', help="NMCONTROLLED=yes|no")
@@ -1182,20 +1810,30 @@ def main():
     parser.add_argument('--skprio_up_egress', action='append', nargs='+', help="Outbound sk_prio to UP priority mapping. Use multiple times")
     parser.add_argument('--up_skprio_ingress', action='append', nargs='+', help="Inbound UP priority to sk_prio mapping. Use multiple times")
     parser.add_argument('--show',  help="Show parameter value")
-    parser.add_argument('--vlan', help="vlan id", default='-1')
+    parser.add_argument('--vlan', help="vlan id. set/remove also accept a list of IDs and ranges: 100-399,500", default='-1')
 #    parser.add_argument('--onboot', help="ONBOOT 'yes' or 'no'", default='yes')
+    parser.add_argument('--no_daemon', action='store_true', help="Do not use network_admin daemon even if it is running", default=False)
+    parser.add_argument('--trace', metavar='FILE', help="Write Chrome trace of the operation to FILE and print the slowest spans. Runs without the daemon")
     parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
     parser.add_argument('--version', action='store_true', help='Display program version information and exit')
 
+    return parser
 
-    args = parser.parse_args()
-    if args.version:
-        version()
-        sys.exit(rc)
 
-    verbose = args.verbose
-    if verbose:
-        print(args)
+def is_mutating(args):
+    """
+    Check if the operation modifies the configuration
+    """
+    return args.action in ['set', 'remove']
+
+
+def execute(args, state=None):
+    """
+    Run the requested operation.
+    Return exit code and the output to be printed
+    """
+    rc = 0
+    result = {"status": 0, "output": ""}
 
     rc, msg = verify_args(args)
     if rc:
@@ -1203,24 +1841,24 @@ def main():
         result['action'] = args.action
         result['output'] = msg
         result['status'] = rc
-        print(json.dumps(result, indent=None))
         bf_log(result['output'])
-        sys.exit(rc)
+        return rc, json.dumps(result, indent=None)
+
+    if args.port == 'all':
+        result = snapshot(args, state)
+        return result['status'], json.dumps(result, indent=None)
 
-    bfconfig = BFCONFIG(args)
+    bfconfig = BFCONFIG(args, state)
     if bfconfig.result['status']:
-        print(json.dumps(bfconfig.result, indent=None))
-        sys.exit(bfconfig.result['status'])
+        return bfconfig.result['status'], json.dumps(bfconfig.result, indent=None)
 
     if args.get_devices:
-        print (bfconfig.devices)
-        sys.exit(0)
+        return 0, str(bfconfig.devices)
 
     if bfconfig.action == 'show':
         bfconfig.show()
         result = bfconfig.result
-        print(json.dumps(result, indent=None))
-        sys.exit(result['status'])
+        return result['status'], json.dumps(result, indent=None)
 
     # TBD:
     # Add restore factory default parameter
@@ -1236,14 +1874,12 @@ def main():
         result['action'] = args.action
         result['output'] = "ERROR: network configuration file {} does not exist".format(network_config)
         result['status'] = 1
-        bf_log(result['output'], 1)
-        sys.exit(1)
+        bf_log(result['output'])
+        return 1, result['output']
 
     if not os.path.exists(network_config_orig):
         shutil.copy2(network_config, network_config_orig)
 
-    shutil.copy2(network_config, network_config_backup)
-
     if not os.path.exists(resolv_conf_orig):
         shutil.copy2(resolv_conf, resolv_conf_orig)
 
@@ -1251,24 +1887,30 @@ def main():
         print ("Operation: ", args.op)
 
     if bfconfig.op in ['ipconfig', 'mtuconfig', 'gwconfig']:
-        rc = bfconfig.set_network_config()
-        if rc:
-            result = bfconfig.result
-            print(json.dumps(result, indent=None))
-            sys.exit(result['status'])
+        # Live configuration is not touched until the candidate is rendered and validated
+        for name, func in [('render', bfconfig.set_network_config),
+                           ('validate', bfconfig.validate_config),
+                           ('commit', bfconfig.commit_config)]:
+            rc = bfconfig.stage(name, func)
+            if rc:
+                bfconfig.log_timings()
+                result = bfconfig.result
+                return result['status'], json.dumps(result, indent=None)
 
-        rc = bfconfig.apply_config()
+        rc = bfconfig.stage('apply', bfconfig.apply_config)
         if rc:
             bf_log("Reverting configuration")
-            shutil.copy2(network_config, network_config + ".bad")
-            shutil.copy2(network_config_backup, network_config)
-            rc1 = bfconfig.apply_config()
-            if rc1:
-                bf_log("Restoring factory default configuration")
-                shutil.copy2(network_config_orig, network_config)
-                rc2 = bfconfig.apply_config()
-                if rc2:
-                    bf_log("ERR: Failed to restore factory default configuration")
+            # One rollback apply. The known-good and factory default
+            # generations are left for a manual restore.
+            if bfconfig.stage('rollback', bfconfig.rollback_config):
+                bf_log("ERR: Failed to apply the previous configuration. Known-good configuration: {}, factory default: {}".format(network_config_good, network_config_orig))
+        else:
+            bfconfig.stage('promote', bfconfig.promote_config)
+            bfconfig.stage('links', bfconfig.remove_links)
+            if bfconfig.op == 'gwconfig':
+                bfconfig.stage('routes', bfconfig.program_routes)
+
+        bfconfig.log_timings()
 
     elif bfconfig.op in ['dnsconfig', 'domainconfig']:
         bfconfig.set_resolv_conf()
@@ -1284,10 +1926,123 @@ def main():
             bfconfig.list_vlans()
 
     result = bfconfig.result
-    print(json.dumps(result, indent=None))
     if result['status']:
-        sys.exit(result['status'])
+        return result['status'], json.dumps(result, indent=None)
+
+    return rc, json.dumps(result, indent=None)
+
+
+def snapshot(args, state=None):
+    """
+    Collect 'show' output of every operation for all ports and VLANs.
+    Netplan data, resolv.conf and port topology are loaded once and
+    hardware queries run concurrently.
+    """
+    if state is None:
+        state = NetworkState()
+
+    ops = [args.op] if args.op else SUPPORTED_OPERATIONS
+    result = {'op': args.op or 'all', 'action': 'show', 'status': 0, 'output': {}}
+
+    def bfconfig_show(op, port=None, vlan='-1', show=True):
+        argv = ['--op', op, '--action', 'show', '--vlan', vlan]
+        if port:
+            argv += ['--port', port]
+        try:
+            bfconfig = BFCONFIG(get_parser(argv).parse_args(argv), state)
+            if show and not bfconfig.result['status']:
+                bfconfig.show()
+            return bfconfig
+        except Exception as e:
+            bf_log ("ERR: Failed to show {} for port {} VLAN {}. Exception: {}".format(op, port, vlan, e))
+            return None
+
+    def op_result(op, bfconfig):
+        if bfconfig is None:
+            return {'op': op, 'action': 'show', 'status': 1, 'output': "ERR: Failed to collect configuration"}
+        return bfconfig.result
+
+    ports = [port for port in SUPPORTED_PORTS if os.path.exists("{}/sys/class/infiniband/mlx5_{}".format(sysroot, port))]
+    vlans_by_link = {}
+    try:
+        vlans_by_link = get_vlan_index(state.netplan())
+    except Exception as e:
+        bf_log ("ERR: Failed to load configuration file {}. Exception: {}".format(network_config, e))
+
+    with ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS) as executor:
+        # Resolve ports topology first. It is shared by all operations
+        devices = dict(zip(ports, executor.map(lambda port: bfconfig_show('ipconfig', port, show=False), ports)))
+
+        jobs = {}
+        for op in GLOBAL_OPERATIONS:
+            if op in ops:
+                jobs[(None, None, op)] = executor.submit(bfconfig_show, op)
+
+        for port in ports:
+            if devices[port] is None:
+                continue
+            device = devices[port].device
+            for op in PORT_OPERATIONS:
+                if op in ops:
+                    jobs[(port, None, op)] = executor.submit(bfconfig_show, op, port)
+            for vlan in vlans_by_link.get(device, {}):
+                for op in VLAN_OPERATIONS:
+                    if op in ops:
+                        jobs[(port, vlan, op)] = executor.submit(bfconfig_show, op, port, vlan)
+
+        output = result['output']
+        for port in ports:
+            output.setdefault('ports', {})[port] = {'device': devices[port].device if devices[port] else None, 'vlans': {}}
+
+        for (port, vlan, op), job in jobs.items():
+            op_output = op_result(op, job.result())
+            if op_output['status']:
+                result['status'] = op_output['status']
+            if port is None:
+                output[op] = op_output
+            elif vlan is None:
+                output['ports'][port][op] = op_output
+            else:
+                output['ports'][port]['vlans'].setdefault(vlan, {})[op] = op_output
+
+    return result
 
+
+def main():
+
+    global verbose
+    rc = 0
+
+    if os.geteuid() != 0:
+        sys.exit('root privileges are required to run this script!')
+
+    args = get_parser(sys.argv).parse_args()
+    if args.version:
+        version()
+        sys.exit(rc)
+
+    verbose = args.verbose
+    if verbose:
+        print(args)
+
+    if args.trace:
+        bf_trace.start(args.trace)
+
+    # Use the daemon if it is running. Verbose and trace modes run locally
+    # to print the executed commands.
+    if not args.no_daemon and not verbose and not args.trace and os.path.exists(daemon_socket):
+        try:
+            reply = daemon_call('execute', {'argv': sys.argv[1:]})
+        except DaemonError as e:
+            bf_log ("ERR: network_admin daemon failed to run {}: {}".format(args.op, e), True)
+            sys.exit(1)
+        if reply is not None:
+            print(reply['output'])
+            sys.exit(reply['rc'])
+
+    with bf_trace.span('execute', op=args.op, action=args.action):
+        rc, output = execute(args)
+    print(output)
     sys.exit(rc)
 
 
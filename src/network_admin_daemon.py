@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# ex:ts=4:sw=4:sts=4:et
+# -*- tab-width: 4; c-basic-offset: 4; indent-tabs-mode: nil -*-
+###############################################################################
+#
+# Copyright 2026 NVIDIA Corporation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+###############################################################################
+
+import os
+import sys
+import argparse
+import json
+import queue
+import signal
+import socketserver
+import threading
+from concurrent.futures import Future
+import network_admin
+
+__author__ = "Vladimir Sokolovsky <vlad@nvidia.com>"
+__version__ = "1.0"
+
+prog = "network_admin_daemon"
+verbose = False
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    JSON-RPC 2.0 over Unix socket. One request per line.
+    """
+    def handle(self):
+        for line in self.rfile:
+            reply = {'jsonrpc': '2.0', 'id': None}
+            try:
+                request = json.loads(line)
+                reply['id'] = request.get('id')
+                reply['result'] = self.server.dispatch(request.get('method'), request.get('params') or {})
+            except Exception as e:
+                reply['error'] = {'code': -32000, 'message': "{}: {}".format(type(e).__name__, e)}
+            self.wfile.write((json.dumps(reply) + '\n').encode())
+            self.wfile.flush()
+
+
+class NetworkAdminServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serve 'show' and 'list' queries concurrently. Mutating operations are
+    serialized through a single writer thread.
+    """
+    daemon_threads = True
+
+    def __init__ (self, path, state):
+        self.state = state
+        self.writes = queue.Queue()
+        if os.path.exists(path):
+            os.unlink(path)
+        old_umask = os.umask(0o077)
+        try:
+            socketserver.UnixStreamServer.__init__(self, path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.writer = threading.Thread(target=self.__writer__, daemon=True)
+        self.writer.start()
+
+    def __writer__(self):
+        while True:
+            args, future = self.writes.get()
+            try:
+                future.set_result(self.execute(args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def execute(self, args):
+        rc, output = network_admin.execute(args, self.state)
+        return {'rc': rc, 'output': output}
+
+    def dispatch(self, method, params):
+        if method == 'ping':
+            return {'version': __version__}
+        if method == 'stats':
+            return self.state.stats()
+        if method != 'execute':
+            raise ValueError("Method {} is not supported".format(method))
+
+        argv = params.get('argv', [])
+        try:
+            args = network_admin.get_parser(argv).parse_args(argv)
+        except SystemExit:
+            raise ValueError("Invalid arguments: {}".format(' '.join(argv)))
+
+        if args.verbose or args.version or args.trace:
+            raise ValueError("Verbose, version and trace requests are handled by the client")
+
+        if network_admin.is_mutating(args):
+            future = Future()
+            self.writes.put((args, future))
+            return future.result()
+
+        return self.execute(args)
+
+
+def main():
+
+    global verbose
+
+    if os.geteuid() != 0:
+        sys.exit('root privileges are required to run this script!')
+
+    parser = argparse.ArgumentParser(description='network_admin daemon')
+    parser.add_argument('--socket', help="Unix socket path", default=network_admin.daemon_socket)
+    parser.add_argument('--verbose', action='store_true', help="Print verbose information", default=False)
+    parser.add_argument('--version', action='store_true', help='Display program version information and exit')
+
+    args = parser.parse_args()
+    if args.version:
+        print(prog + ' ' + __version__)
+        sys.exit(0)
+
+    verbose = args.verbose
+
+    server = NetworkAdminServer(args.socket, network_admin.NetworkState())
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    network_admin.bf_log("Listening on {}".format(args.socket), verbose)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+        main()